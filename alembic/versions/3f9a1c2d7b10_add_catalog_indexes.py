@@ -0,0 +1,38 @@
+"""add catalog indexes
+
+Revision ID: 3f9a1c2d7b10
+Revises: 
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9a1c2d7b10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# (name, table, columns) - category listings filtered by price and keyset
+# pagination on (price, id) and (created_at, id)
+INDEXES = [
+    ("ix_products_category_id_price", "products", ["category_id", "price"]),
+    ("ix_products_price_id", "products", ["price", "id"]),
+    ("ix_products_created_at_id", "products", ["created_at", "id"]),
+]
+
+
+def upgrade() -> None:
+    # Build concurrently on PostgreSQL so the catalog stays writable; the
+    # tables may already carry the indexes when they were created from the models
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
@@ -0,0 +1,38 @@
+"""add cart and order indexes
+
+Revision ID: 8b2e4d6f1a35
+Revises: 3f9a1c2d7b10
+Create Date: 2026-10-17 09:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b2e4d6f1a35'
+down_revision = '3f9a1c2d7b10'
+branch_labels = None
+depends_on = None
+
+# (name, table, columns) - cart lookup by user, cart contents and the
+# "already in the cart" check, and order lines by order and by product
+INDEXES = [
+    ("ix_carts_user_id", "carts", ["user_id"]),
+    ("ix_cart_items_cart_id_product_id", "cart_items", ["cart_id", "product_id"]),
+    ("ix_cart_items_product_id", "cart_items", ["product_id"]),
+    ("ix_order_items_order_id", "order_items", ["order_id"]),
+    ("ix_order_items_product_id", "order_items", ["product_id"]),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
@@ -0,0 +1,99 @@
+"""add product search vector
+
+Revision ID: a3e7c1f9d258
+Revises: b6d2f8e4a170
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3e7c1f9d258'
+down_revision = 'b6d2f8e4a170'
+branch_labels = None
+depends_on = None
+
+# Products rewritten per statement while backfilling the search vectors
+BACKFILL_BATCH_SIZE = 10_000
+
+# The document of a product is its name, tags, description and category name,
+# weighted in that order, like the SQLite FTS5 table. A generated column can't
+# read the category, so triggers keep the vector up to date.
+TRIGGERS = [
+    """
+    CREATE OR REPLACE FUNCTION products_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('english', coalesce(NEW.name, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(NEW.tags, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(NEW.description, '')), 'C') ||
+            setweight(to_tsvector('english', coalesce(
+                (SELECT name FROM categories WHERE id = NEW.category_id), ''
+            )), 'D');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER products_search_vector_update
+    BEFORE INSERT OR UPDATE OF name, description, tags, category_id ON products
+    FOR EACH ROW EXECUTE FUNCTION products_search_vector_update()
+    """,
+    """
+    CREATE OR REPLACE FUNCTION categories_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        UPDATE products SET category_id = category_id WHERE category_id = NEW.id;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER categories_search_vector_update
+    AFTER UPDATE OF name ON categories
+    FOR EACH ROW EXECUTE FUNCTION categories_search_vector_update()
+    """,
+]
+
+
+def upgrade() -> None:
+    # SQLite's FTS5 table is created at startup (app.search.fulltext)
+    if op.get_context().dialect.name != "postgresql":
+        return
+
+    # Workers before this migration added a generated column at startup; it
+    # can't be assigned by the trigger, so it is replaced
+    op.execute("ALTER TABLE products DROP COLUMN IF EXISTS search_vector")
+    op.execute("ALTER TABLE products ADD COLUMN search_vector tsvector")
+    for statement in TRIGGERS:
+        op.execute(statement)
+
+    # Backfill in batches, each committed on its own, so no statement holds
+    # row locks on the whole catalog
+    with op.get_context().autocommit_block():
+        max_id = op.get_bind().execute(sa.text("SELECT max(id) FROM products")).scalar() or 0
+        for start in range(0, max_id + 1, BACKFILL_BATCH_SIZE):
+            op.execute(
+                f"UPDATE products SET name = name "
+                f"WHERE id >= {start} AND id < {start + BACKFILL_BATCH_SIZE}"
+            )
+        op.create_index(
+            "ix_products_search_vector", "products", ["search_vector"],
+            postgresql_using="gin", if_not_exists=True, postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    if op.get_context().dialect.name != "postgresql":
+        return
+
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_products_search_vector", table_name="products", if_exists=True, postgresql_concurrently=True
+        )
+    op.execute("DROP TRIGGER IF EXISTS categories_search_vector_update ON categories")
+    op.execute("DROP FUNCTION IF EXISTS categories_search_vector_update()")
+    op.execute("DROP TRIGGER IF EXISTS products_search_vector_update ON products")
+    op.execute("DROP FUNCTION IF EXISTS products_search_vector_update()")
+    op.execute("ALTER TABLE products DROP COLUMN IF EXISTS search_vector")
@@ -0,0 +1,33 @@
+"""add product recommendation index
+
+Revision ID: b6d2f8e4a170
+Revises: 0a7c3e5b9d14
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6d2f8e4a170'
+down_revision = '0a7c3e5b9d14'
+branch_labels = None
+depends_on = None
+
+# (name, table, columns) - a user's precomputed recommendations, best first
+INDEXES = [
+    ("ix_product_recommendations_user_id_score", "product_recommendations", ["user_id", "score"]),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
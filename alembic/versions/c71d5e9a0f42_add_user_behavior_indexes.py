@@ -0,0 +1,39 @@
+"""add user behavior indexes
+
+Revision ID: c71d5e9a0f42
+Revises: 8b2e4d6f1a35
+Create Date: 2026-10-17 09:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c71d5e9a0f42'
+down_revision = '8b2e4d6f1a35'
+branch_labels = None
+depends_on = None
+
+# (name, table, columns) - a user's history filtered by behavior type, and
+# the users who interacted with a set of products (similar-user lookup)
+INDEXES = [
+    (
+        "ix_user_behaviors_user_id_behavior_type_product_id",
+        "user_behaviors",
+        ["user_id", "behavior_type", "product_id"],
+    ),
+    ("ix_user_behaviors_product_id_user_id", "user_behaviors", ["product_id", "user_id"]),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
@@ -0,0 +1,44 @@
+"""add cart totals
+
+Revision ID: d4a8b3e6c215
+Revises: c71d5e9a0f42
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4a8b3e6c215'
+down_revision = 'c71d5e9a0f42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("carts") as batch_op:
+        batch_op.add_column(sa.Column("subtotal", sa.Float(), nullable=False, server_default="0"))
+        batch_op.add_column(sa.Column("item_count", sa.Integer(), nullable=False, server_default="0"))
+
+    # Backfill from the current items and prices
+    op.execute(
+        """
+        UPDATE carts SET
+            subtotal = (
+                SELECT COALESCE(SUM(cart_items.quantity * products.price), 0)
+                FROM cart_items JOIN products ON products.id = cart_items.product_id
+                WHERE cart_items.cart_id = carts.id
+            ),
+            item_count = (
+                SELECT COUNT(cart_items.id) FROM cart_items
+                WHERE cart_items.cart_id = carts.id
+            )
+        """
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("carts") as batch_op:
+        batch_op.drop_column("item_count")
+        batch_op.drop_column("subtotal")
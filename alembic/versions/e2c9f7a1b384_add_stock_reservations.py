@@ -0,0 +1,43 @@
+"""add stock reservations
+
+Revision ID: e2c9f7a1b384
+Revises: d4a8b3e6c215
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2c9f7a1b384'
+down_revision = 'd4a8b3e6c215'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "stock_reservations",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("product_id", sa.Integer(), nullable=False),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["product_id"], ["products.id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("user_id", "product_id", name="uq_stock_reservations_user_id_product_id"),
+    )
+    op.create_index("ix_stock_reservations_id", "stock_reservations", ["id"])
+    op.create_index("ix_stock_reservations_product_id", "stock_reservations", ["product_id"])
+    op.create_index("ix_stock_reservations_expires_at", "stock_reservations", ["expires_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_stock_reservations_expires_at", table_name="stock_reservations")
+    op.drop_index("ix_stock_reservations_product_id", table_name="stock_reservations")
+    op.drop_index("ix_stock_reservations_id", table_name="stock_reservations")
+    op.drop_table("stock_reservations")
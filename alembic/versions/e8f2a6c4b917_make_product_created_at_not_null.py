@@ -0,0 +1,51 @@
+"""make product created_at not null
+
+Revision ID: e8f2a6c4b917
+Revises: a3e7c1f9d258
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8f2a6c4b917'
+down_revision = 'a3e7c1f9d258'
+branch_labels = None
+depends_on = None
+
+# Keyset pages on (created_at, id) skip rows whose created_at is NULL, since
+# the row comparison is never true for them
+CHECK_NAME = "products_created_at_not_null"
+
+
+def upgrade() -> None:
+    backfill = "UPDATE products SET created_at = COALESCE(updated_at, CURRENT_TIMESTAMP) WHERE created_at IS NULL"
+
+    dialect = op.get_context().dialect.name
+    if dialect == "postgresql":
+        # SET NOT NULL scans the table under an exclusive lock unless a
+        # validated check constraint already proves it. Each step commits on
+        # its own: adding the constraint NOT VALID only locks briefly (and
+        # holds new rows to it before the backfill), and validating it
+        # doesn't block reads or writes
+        with op.get_context().autocommit_block():
+            op.execute(f"ALTER TABLE products ADD CONSTRAINT {CHECK_NAME} CHECK (created_at IS NOT NULL) NOT VALID")
+            op.execute(backfill)
+            op.execute(f"ALTER TABLE products VALIDATE CONSTRAINT {CHECK_NAME}")
+            op.alter_column("products", "created_at", existing_type=sa.DateTime(timezone=True), nullable=False)
+            op.execute(f"ALTER TABLE products DROP CONSTRAINT {CHECK_NAME}")
+        return
+
+    op.execute(backfill)
+    # SQLite can only change nullability by rebuilding the table, which its
+    # full-text triggers on products prevent; the backfill is enough there,
+    # and tables created from the models already have the constraint
+    if dialect != "sqlite":
+        op.alter_column("products", "created_at", existing_type=sa.DateTime(timezone=True), nullable=False)
+
+
+def downgrade() -> None:
+    if op.get_context().dialect.name != "sqlite":
+        op.alter_column("products", "created_at", existing_type=sa.DateTime(timezone=True), nullable=True)
@@ -0,0 +1,226 @@
+"""
+Implicit-feedback matrix factorization (alternating least squares).
+
+Follows Hu, Koren & Volinsky: every observed user-item pair is a positive
+preference with confidence ``1 + alpha * log1p(weight)``, where the weight
+sums the user's behaviors on the item (see ``BEHAVIOR_WEIGHTS``), and
+unobserved pairs are weak negatives. User and item factors are solved in
+turn. Each solve runs a few conjugate gradient steps for all rows at once,
+warm-started from the previous factors. The large products are sparse
+matrix and NumPy kernels that release the GIL, so chunks of rows are
+solved on a thread pool.
+
+Factors are stored as float32, and scoring a user against the whole catalog
+is one matrix-vector product.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from app.ai.artifacts import load_arrays, save_arrays
+from app.ai.interactions import InteractionMatrix
+
+# Stored entries handled per solve task; bounds the (entries x factors) temporaries
+CHUNK_ENTRIES = 262_144
+# Scores computed per block when recommending for many users
+SCORE_BLOCK = 1 << 24
+
+
+def _row_chunks(indptr: np.ndarray) -> List[Tuple[int, int]]:
+    """Split rows into consecutive ranges holding about CHUNK_ENTRIES entries each."""
+    rows = len(indptr) - 1
+    bounds = np.searchsorted(indptr, np.arange(0, indptr[-1], CHUNK_ENTRIES), side="right") - 1
+    starts = sorted(set(int(b) for b in bounds) | {0})
+    ends = starts[1:] + [rows]
+    return [(start, end) for start, end in zip(starts, ends) if end > start]
+
+
+def _solve_rows(
+    confidence: sparse.csr_matrix,
+    start: int,
+    end: int,
+    factors: np.ndarray,
+    other: np.ndarray,
+    gram: np.ndarray,
+    cg_steps: int
+) -> None:
+    """
+    Update ``factors[start:end]`` in place with conjugate gradient steps.
+
+    Each row solves ``(YtY + Yt (C_u - I) Y + reg I) x = Yt C_u p_u``; only
+    the row's observed items contribute beyond ``gram`` (``YtY + reg I``).
+    """
+    block = confidence[start:end]
+    entry_rows = np.repeat(np.arange(end - start), np.diff(block.indptr))
+    neighbours = other[block.indices]
+    extra = block.data - 1.0
+
+    def apply(x: np.ndarray) -> np.ndarray:
+        # A x, with the observed-item term computed on stored entries only
+        projected = np.einsum("ij,ij->i", x[entry_rows], neighbours)
+        weighted = sparse.csr_matrix((extra * projected, block.indices, block.indptr), shape=block.shape)
+        return x @ gram + weighted @ other
+
+    x = factors[start:end]
+    residual = block @ other - apply(x)
+    direction = residual.copy()
+    norm = np.einsum("ij,ij->i", residual, residual)
+    for _ in range(cg_steps):
+        if not norm.any():
+            break
+        applied = apply(direction)
+        step = np.divide(norm, np.einsum("ij,ij->i", direction, applied), out=np.zeros_like(norm), where=norm > 0)
+        x += step[:, None] * direction
+        residual -= step[:, None] * applied
+        new_norm = np.einsum("ij,ij->i", residual, residual)
+        ratio = np.divide(new_norm, norm, out=np.zeros_like(norm), where=norm > 0)
+        direction = residual + ratio[:, None] * direction
+        norm = new_norm
+    factors[start:end] = x
+
+
+class ALSModel:
+    """User and item factors of an implicit ALS factorization."""
+
+    def __init__(self, user_ids: np.ndarray, item_ids: np.ndarray, user_factors: np.ndarray, item_factors: np.ndarray):
+        self.user_ids = user_ids
+        self.item_ids = item_ids
+        self.user_factors = user_factors
+        self.item_factors = item_factors
+
+    @classmethod
+    def train(
+        cls,
+        interactions: InteractionMatrix,
+        factors: int = 64,
+        regularization: float = 0.05,
+        alpha: float = 10.0,
+        iterations: int = 15,
+        cg_steps: int = 3,
+        threads: Optional[int] = None,
+        seed: int = 0
+    ) -> "ALSModel":
+        """Factorize the interaction matrix."""
+        confidence = interactions.matrix.astype(np.float32).tocsr()
+        confidence.data = 1.0 + alpha * np.log1p(confidence.data)
+        confidence_t = confidence.T.tocsr()
+
+        rng = np.random.default_rng(seed)
+        user_factors = (rng.standard_normal((confidence.shape[0], factors)) * 0.01).astype(np.float32)
+        item_factors = (rng.standard_normal((confidence.shape[1], factors)) * 0.01).astype(np.float32)
+        identity = regularization * np.eye(factors, dtype=np.float32)
+        user_chunks = _row_chunks(confidence.indptr)
+        item_chunks = _row_chunks(confidence_t.indptr)
+
+        with ThreadPoolExecutor(max_workers=threads or os.cpu_count()) as pool:
+            for _ in range(iterations):
+                for matrix, chunks, solved, fixed in (
+                    (confidence, user_chunks, user_factors, item_factors),
+                    (confidence_t, item_chunks, item_factors, user_factors),
+                ):
+                    gram = fixed.T @ fixed + identity
+                    list(pool.map(
+                        lambda bounds: _solve_rows(matrix, bounds[0], bounds[1], solved, fixed, gram, cg_steps),
+                        chunks
+                    ))
+
+        return cls(interactions.user_ids, interactions.item_ids, user_factors, item_factors)
+
+    def save(self, path: str) -> None:
+        """Write the factors to disk atomically."""
+        save_arrays(
+            path,
+            metadata={"users": len(self.user_ids), "items": len(self.item_ids), "factors": self.item_factors.shape[1]},
+            user_ids=self.user_ids,
+            item_ids=self.item_ids,
+            user_factors=self.user_factors,
+            item_factors=self.item_factors
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "ALSModel":
+        """Memory-map saved factors."""
+        arrays = load_arrays(path)
+        return cls(arrays["user_ids"], arrays["item_ids"], arrays["user_factors"], arrays["item_factors"])
+
+    def _user_position(self, user_id: int) -> Optional[int]:
+        position = int(np.searchsorted(self.user_ids, user_id))
+        if position < len(self.user_ids) and self.user_ids[position] == user_id:
+            return position
+        return None
+
+    def has_user(self, user_id: int) -> bool:
+        return self._user_position(user_id) is not None
+
+    def recommend(self, user_id: int, limit: int, exclude: Optional[Iterable[int]] = None) -> List[Tuple[int, float]]:
+        """Rank the catalog for a user, best first, skipping ``exclude``."""
+        position = self._user_position(user_id)
+        if position is None or not len(self.item_ids):
+            return []
+        scores = self.item_factors @ self.user_factors[position]
+        excluded = np.fromiter(exclude or (), dtype=np.int64)
+        if len(excluded):
+            positions = np.searchsorted(self.item_ids, excluded)
+            positions[positions == len(self.item_ids)] = 0
+            scores[positions[self.item_ids[positions] == excluded]] = -np.inf
+
+        limit = min(limit, len(scores))
+        if not limit:
+            return []
+        best = np.argpartition(-scores, limit - 1)[:limit]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        best = best[np.isfinite(scores[best])]
+        return list(zip(self.item_ids[best].tolist(), scores[best].astype(float).tolist()))
+
+    def recommend_users(
+        self,
+        user_ids: List[int],
+        limit: int,
+        exclude: List[Iterable[int]]
+    ) -> List[List[Tuple[int, float]]]:
+        """
+        ``recommend`` for many users at once, one ``exclude`` per user.
+
+        Users are scored in blocks with a single matrix product per block,
+        sized so a block's scores stay under SCORE_BLOCK floats. Users the
+        model doesn't know get an empty list.
+        """
+        results: List[List[Tuple[int, float]]] = [[] for _ in user_ids]
+        positions = [self._user_position(user_id) for user_id in user_ids]
+        known = [index for index, position in enumerate(positions) if position is not None]
+        limit = min(limit, len(self.item_ids))
+        if not known or not limit:
+            return results
+
+        block_size = max(1, SCORE_BLOCK // len(self.item_ids))
+        for start in range(0, len(known), block_size):
+            block = known[start:start + block_size]
+            scores = self.user_factors[[positions[index] for index in block]] @ self.item_factors.T
+
+            # Mask every (user, excluded item) pair of the block at once
+            rows, items = [], []
+            for row, index in enumerate(block):
+                excluded = np.fromiter(exclude[index] or (), dtype=np.int64)
+                items.append(excluded)
+                rows.append(np.full(len(excluded), row))
+            items, rows = np.concatenate(items), np.concatenate(rows)
+            columns = np.searchsorted(self.item_ids, items)
+            columns[columns == len(self.item_ids)] = 0
+            matched = self.item_ids[columns] == items
+            scores[rows[matched], columns[matched]] = -np.inf
+
+            best = np.argpartition(-scores, limit - 1, axis=1)[:, :limit]
+            best_scores = np.take_along_axis(scores, best, axis=1)
+            order = np.argsort(-best_scores, axis=1, kind="stable")
+            best, best_scores = np.take_along_axis(best, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+            for row, index in enumerate(block):
+                finite = np.isfinite(best_scores[row])
+                results[index] = list(zip(
+                    self.item_ids[best[row][finite]].tolist(),
+                    best_scores[row][finite].astype(float).tolist()
+                ))
+        return results
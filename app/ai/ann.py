@@ -0,0 +1,169 @@
+"""
+Approximate nearest-neighbour index over product embeddings.
+
+An inverted-file (IVF) index: embeddings are L2-normalized and clustered
+with spherical k-means, and stored grouped by cluster, so each cluster's
+vectors are one contiguous slice of the file. A query scores the cluster
+centroids, then only the vectors of the ``nprobe`` best clusters, so a
+lookup touches a few thousand vectors instead of the whole catalog.
+Everything is plain NumPy; the arrays are saved with ``save_arrays`` and
+memory-mapped, so every worker shares one copy of the index.
+"""
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.ai.artifacts import load_arrays, save_arrays
+
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE_PER_LIST = 32
+ASSIGN_CHUNK_SIZE = 16_384
+
+
+def _normalized(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _nearest_centroid(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the most similar centroid of every vector, in chunks."""
+    assignment = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), ASSIGN_CHUNK_SIZE):
+        chunk = vectors[start:start + ASSIGN_CHUNK_SIZE]
+        assignment[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+    return assignment
+
+
+def _spherical_kmeans(vectors: np.ndarray, clusters: int, rng: np.random.Generator) -> np.ndarray:
+    """Cluster unit vectors on a sample; returns unit-length centroids."""
+    sample_size = min(len(vectors), clusters * KMEANS_SAMPLE_PER_LIST)
+    sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+    centroids = sample[rng.choice(sample_size, clusters, replace=False)].copy()
+    for _ in range(KMEANS_ITERATIONS):
+        assignment = _nearest_centroid(sample, centroids)
+        order = np.argsort(assignment, kind="stable")
+        present, starts = np.unique(assignment[order], return_index=True)
+        sums = np.add.reduceat(sample[order], starts, axis=0)
+        # Clusters that lost all their points restart from random sample points
+        centroids = sample[rng.choice(sample_size, clusters, replace=False)].copy()
+        centroids[present] = sums
+        centroids = _normalized(centroids)
+    return centroids
+
+
+class IVFIndex:
+    """Embeddings grouped by cluster, with the cluster centroids."""
+
+    def __init__(
+        self,
+        item_ids: np.ndarray,
+        rows: np.ndarray,
+        row_ids: np.ndarray,
+        vectors: np.ndarray,
+        centroids: np.ndarray,
+        offsets: np.ndarray
+    ):
+        # item_ids are sorted; rows[i] is the row holding item_ids[i]'s vector
+        self.item_ids = item_ids
+        self.rows = rows
+        # Vectors grouped by cluster: cluster c is rows offsets[c]:offsets[c + 1]
+        self.row_ids = row_ids
+        self.vectors = vectors
+        self.centroids = centroids
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.item_ids)
+
+    @classmethod
+    def build(cls, item_ids: np.ndarray, vectors: np.ndarray, lists: Optional[int] = None, seed: int = 0) -> "IVFIndex":
+        """Index one embedding per product id; ``lists`` defaults to 2 * sqrt(n)."""
+        item_ids = np.asarray(item_ids, dtype=np.int64)
+        vectors = _normalized(vectors)
+        if not len(item_ids):
+            return cls(
+                item_ids, np.empty(0, np.int64), item_ids, vectors,
+                np.empty((0, vectors.shape[1]), np.float32), np.zeros(1, np.int64)
+            )
+        lists = min(lists or max(1, int(2 * np.sqrt(len(item_ids)))), len(item_ids))
+        centroids = _spherical_kmeans(vectors, lists, np.random.default_rng(seed))
+
+        assignment = _nearest_centroid(vectors, centroids)
+        order = np.argsort(assignment, kind="stable")
+        offsets = np.searchsorted(assignment[order], np.arange(lists + 1)).astype(np.int64)
+        row_ids = item_ids[order]
+
+        by_id = np.argsort(row_ids, kind="stable")
+        return cls(row_ids[by_id], by_id.astype(np.int64), row_ids, vectors[order], centroids, offsets)
+
+    def save(self, path: str) -> None:
+        """Write the index to disk atomically."""
+        save_arrays(
+            path,
+            metadata={"items": len(self.item_ids), "lists": len(self.centroids)},
+            item_ids=self.item_ids,
+            rows=self.rows,
+            row_ids=self.row_ids,
+            vectors=self.vectors,
+            centroids=self.centroids,
+            offsets=self.offsets
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        """Memory-map a saved index."""
+        arrays = load_arrays(path)
+        return cls(
+            arrays["item_ids"], arrays["rows"], arrays["row_ids"],
+            arrays["vectors"], arrays["centroids"], arrays["offsets"]
+        )
+
+    def vector(self, product_id: int) -> Optional[np.ndarray]:
+        """The stored (normalized) embedding of a product, if indexed."""
+        position = int(np.searchsorted(self.item_ids, product_id))
+        if position < len(self.item_ids) and self.item_ids[position] == product_id:
+            return self.vectors[self.rows[position]]
+        return None
+
+    def search(
+        self,
+        query: np.ndarray,
+        limit: int,
+        nprobe: int,
+        exclude: Tuple[int, ...] = ()
+    ) -> List[Tuple[int, float]]:
+        """Approximate top products by cosine similarity to ``query``, best first."""
+        if not len(self.item_ids) or limit <= 0:
+            return []
+        query = _normalized(np.asarray(query, dtype=np.float32)[None, :])[0]
+        nprobe = min(nprobe, len(self.centroids))
+        probes = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+
+        ids, scores = [], []
+        for probe in probes:
+            start, end = self.offsets[probe], self.offsets[probe + 1]
+            if end > start:
+                ids.append(self.row_ids[start:end])
+                scores.append(self.vectors[start:end] @ query)
+        if not ids:
+            return []
+        ids, scores = np.concatenate(ids), np.concatenate(scores)
+        if exclude:
+            keep = ~np.isin(ids, np.asarray(exclude, dtype=np.int64))
+            ids, scores = ids[keep], scores[keep]
+
+        if len(scores) > limit:
+            best = np.argpartition(-scores, limit - 1)[:limit]
+            ids, scores = ids[best], scores[best]
+        order = np.argsort(-scores, kind="stable")
+        return list(zip(ids[order].tolist(), scores[order].astype(float).tolist()))
+
+    def similar(self, product_id: int, limit: int, nprobe: int) -> List[Tuple[int, float]]:
+        """Approximate most similar products to an indexed product."""
+        vector = self.vector(product_id)
+        if vector is None:
+            return []
+        return self.search(vector, limit, nprobe, exclude=(product_id,))
@@ -0,0 +1,109 @@
+"""
+Model artifacts shared by the recommendation models.
+
+Offline jobs save a model as a set of named NumPy arrays in one file: a
+JSON header followed by the raw arrays, each aligned so it can be mapped
+straight from disk. Loading memory-maps the arrays read-only, so every
+worker process shares a single copy through the page cache. Files are
+replaced atomically; ``ArtifactCache`` notices the new file and reloads it,
+while requests still holding the old arrays keep their old mapping.
+"""
+
+import json
+import logging
+import os
+import struct
+import tempfile
+import threading
+from typing import Any, Callable, Dict, Generic, Optional, TypeVar
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"ECART001"
+ALIGNMENT = 64
+
+T = TypeVar("T")
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def save_arrays(path: str, metadata: Optional[Dict[str, Any]] = None, **arrays: np.ndarray) -> None:
+    """Write named arrays (and JSON metadata) to ``path`` atomically."""
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+
+    # The header holds offsets relative to the end of the header itself
+    entries, offset = {}, 0
+    for name, array in arrays.items():
+        offset = _aligned(offset)
+        entries[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += array.nbytes
+    header = json.dumps({"arrays": entries, "metadata": metadata or {}}).encode()
+    data_start = _aligned(len(MAGIC) + 8 + len(header))
+
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile("wb", dir=directory, delete=False) as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(data_start + entries[name]["offset"])
+            f.write(array.tobytes())
+    os.replace(f.name, path)
+
+
+def load_arrays(path: str, mmap: bool = True) -> Dict[str, Any]:
+    """
+    Load a file written by ``save_arrays``.
+
+    Returns the arrays by name, read-only memory maps unless ``mmap`` is
+    False, plus the saved metadata under ``"metadata"``.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a model artifact")
+        (header_length,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(header_length))
+    data_start = _aligned(len(MAGIC) + 8 + header_length)
+
+    loaded: Dict[str, Any] = {"metadata": header["metadata"]}
+    for name, entry in header["arrays"].items():
+        shape = tuple(entry["shape"])
+        dtype = np.dtype(entry["dtype"])
+        if not np.prod(shape, dtype=np.int64):
+            loaded[name] = np.empty(shape, dtype=dtype)
+        elif mmap:
+            loaded[name] = np.memmap(path, dtype=dtype, mode="r", offset=data_start + entry["offset"], shape=shape)
+        else:
+            loaded[name] = np.fromfile(path, dtype=dtype, count=int(np.prod(shape)), offset=data_start + entry["offset"]).reshape(shape)
+    return loaded
+
+
+class ArtifactCache(Generic[T]):
+    """Loads a model file on first use and again whenever the file is replaced."""
+
+    def __init__(self, path: str, loader: Callable[[str], T]):
+        self.path = path
+        self.loader = loader
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._value: Optional[T] = None
+
+    def get(self) -> Optional[T]:
+        """Get the loaded model, or None if it hasn't been built yet."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        stamp = (stat.st_ino, stat.st_mtime_ns)
+        if stamp != self._stamp:
+            with self._lock:
+                if stamp != self._stamp:
+                    self._value = self.loader(self.path)
+                    self._stamp = stamp
+                    logger.info(f"Loaded model artifact {self.path}")
+        return self._value
@@ -0,0 +1,331 @@
+"""
+Content vectors of products.
+
+Each product's name, description, tags and category name become one
+document, vectorized into a sparse TF-IDF row. The rows are stored twice:
+by product (CSR) and by term (CSC postings), so both "products similar to
+this one" and "products matching this user's profile" are sparse dot
+products that only touch the postings of the query's terms.
+
+The fitted vectorizer is saved next to the vectors. Products added or
+edited since the last build are transformed with it and merged in, without
+refitting; terms first seen in those products are ignored until the next
+full build. Products deleted since are dropped by the same update.
+
+The TF-IDF rows are also projected onto their top singular directions
+(latent semantic analysis) to get dense embeddings for the ANN index.
+"""
+
+import json
+import os
+import pickle
+import tempfile
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+from sklearn.decomposition import TruncatedSVD
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from app.ai.artifacts import load_arrays, save_arrays
+from app.models import Category, Product
+
+FETCH_CHUNK_SIZE = 10_000
+MAX_FEATURES = 262_144
+# Strongest terms of a user's profile that are matched against the catalog
+PROFILE_TERMS = 64
+
+
+def _tags_text(tags) -> str:
+    """Tags are stored as a JSON list; older rows may hold plain text."""
+    if not tags:
+        return ""
+    try:
+        parsed = json.loads(tags)
+    except (TypeError, ValueError):
+        return str(tags)
+    if isinstance(parsed, list):
+        return " ".join(str(tag) for tag in parsed)
+    return str(parsed)
+
+
+def document_text(name: str, description: str, tags: str, category: str) -> str:
+    """The text a product is vectorized from."""
+    return " ".join(part for part in (name, description or "", _tags_text(tags), category or "") if part)
+
+
+def product_documents(db: Session, changed_since: Optional[datetime] = None) -> Tuple[np.ndarray, List[str]]:
+    """Stream product ids and document texts, ordered by id; optionally only recently changed products."""
+    query = (
+        select(Product.id, Product.name, Product.description, Product.tags, Category.name)
+        .outerjoin(Category, Product.category_id == Category.id)
+        .order_by(Product.id)
+        .execution_options(stream_results=True, yield_per=FETCH_CHUNK_SIZE)
+    )
+    if changed_since is not None:
+        query = query.where(or_(Product.created_at >= changed_since, Product.updated_at >= changed_since))
+
+    ids, documents = [], []
+    for product_id, name, description, tags, category in db.execute(query):
+        ids.append(product_id)
+        documents.append(document_text(name, description, tags, category))
+    return np.asarray(ids, dtype=np.int64), documents
+
+
+def catalog_product_ids(db: Session) -> np.ndarray:
+    """Ids of every product currently in the catalog, sorted."""
+    return np.fromiter(db.execute(select(Product.id).order_by(Product.id)).scalars(), dtype=np.int64)
+
+
+def fit_vectorizer(documents: List[str]) -> TfidfVectorizer:
+    """Fit the TF-IDF vocabulary and weights on the whole catalog."""
+    return TfidfVectorizer(sublinear_tf=True, stop_words="english", max_features=MAX_FEATURES).fit(documents)
+
+
+def save_vectorizer(vectorizer: TfidfVectorizer, path: str) -> None:
+    """Write a fitted vectorizer to disk atomically."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile("wb", dir=directory, delete=False) as f:
+        pickle.dump(vectorizer, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(f.name, path)
+
+
+def load_vectorizer(path: str) -> TfidfVectorizer:
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def _gather(indptr: np.ndarray, positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Offsets of every entry of the given compressed rows, and each entry's row number."""
+    starts, lengths = indptr[positions], indptr[positions + 1] - indptr[positions]
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+    return offsets, np.repeat(np.arange(len(positions)), lengths)
+
+
+def _top(ids: np.ndarray, scores: np.ndarray, limit: int) -> List[Tuple[int, float]]:
+    if len(scores) > limit:
+        best = np.argpartition(-scores, limit - 1)[:limit]
+        ids, scores = ids[best], scores[best]
+    order = np.argsort(-scores, kind="stable")
+    return list(zip(ids[order].tolist(), scores[order].astype(float).tolist()))
+
+
+class ContentVectors:
+    """TF-IDF rows of every product, by product and by term."""
+
+    def __init__(
+        self,
+        product_ids: np.ndarray,
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        data: np.ndarray,
+        term_indptr: np.ndarray,
+        term_rows: np.ndarray,
+        term_data: np.ndarray,
+        metadata: Optional[dict] = None
+    ):
+        # Rows follow the sorted product_ids
+        self.product_ids = product_ids
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        # Postings: term t is term_rows/term_data[term_indptr[t]:term_indptr[t + 1]]
+        self.term_indptr = term_indptr
+        self.term_rows = term_rows
+        self.term_data = term_data
+        self.metadata = metadata or {}
+
+    def __len__(self) -> int:
+        return len(self.product_ids)
+
+    @classmethod
+    def from_matrix(cls, product_ids: np.ndarray, matrix: sparse.csr_matrix, metadata: Optional[dict] = None) -> "ContentVectors":
+        """Store a TF-IDF matrix whose rows follow ``product_ids``."""
+        order = np.argsort(product_ids, kind="stable")
+        rows = sparse.csr_matrix(matrix, dtype=np.float32)[order]
+        rows.sort_indices()
+        postings = rows.tocsc()
+        postings.sort_indices()
+        return cls(
+            np.asarray(product_ids, dtype=np.int64)[order],
+            rows.indptr.astype(np.int64), rows.indices.astype(np.int32), rows.data,
+            postings.indptr.astype(np.int64), postings.indices.astype(np.int32), postings.data,
+            metadata
+        )
+
+    @classmethod
+    def build(
+        cls,
+        vectorizer: TfidfVectorizer,
+        product_ids: np.ndarray,
+        documents: List[str],
+        read_at: datetime
+    ) -> "ContentVectors":
+        """Vectorize every product, as read from the database at ``read_at``."""
+        return cls.from_matrix(product_ids, vectorizer.transform(documents), {"read_at": read_at.isoformat()})
+
+    def updated(
+        self,
+        vectorizer: TfidfVectorizer,
+        product_ids: np.ndarray,
+        documents: List[str],
+        read_at: datetime,
+        catalog_ids: Optional[np.ndarray] = None
+    ) -> "ContentVectors":
+        """
+        Vectorize only the given (new or edited) products and merge them in.
+
+        With ``catalog_ids``, products no longer in the catalog are dropped.
+        """
+        if documents:
+            changed = vectorizer.transform(documents)
+        else:
+            changed = sparse.csr_matrix((0, len(self.term_indptr) - 1), dtype=np.float32)
+        keep = ~np.isin(self.product_ids, product_ids)
+        if catalog_ids is not None:
+            keep &= np.isin(self.product_ids, catalog_ids)
+        merged = sparse.vstack([self.matrix()[np.flatnonzero(keep)], changed], format="csr")
+        return ContentVectors.from_matrix(
+            np.concatenate([self.product_ids[keep], np.asarray(product_ids, dtype=np.int64)]),
+            merged,
+            {**self.metadata, "read_at": read_at.isoformat()}
+        )
+
+    @property
+    def read_at(self) -> Optional[datetime]:
+        """When the newest vectorized product data was read; later changes need an update."""
+        read_at = self.metadata.get("read_at")
+        if not read_at:
+            return None
+        read_at = datetime.fromisoformat(read_at)
+        # Vectors saved by older builds hold a naive UTC timestamp
+        return read_at if read_at.tzinfo else read_at.replace(tzinfo=timezone.utc)
+
+    def matrix(self) -> sparse.csr_matrix:
+        """The rows as a SciPy matrix (copied into memory)."""
+        return sparse.csr_matrix(
+            (np.array(self.data), np.array(self.indices), np.array(self.indptr)),
+            shape=(len(self.product_ids), len(self.term_indptr) - 1)
+        )
+
+    def save(self, path: str) -> None:
+        """Write the vectors to disk atomically."""
+        save_arrays(
+            path,
+            metadata={**self.metadata, "products": len(self.product_ids), "terms": len(self.term_indptr) - 1},
+            product_ids=self.product_ids,
+            indptr=self.indptr,
+            indices=self.indices,
+            data=self.data,
+            term_indptr=self.term_indptr,
+            term_rows=self.term_rows,
+            term_data=self.term_data
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "ContentVectors":
+        """Memory-map saved vectors."""
+        arrays = load_arrays(path)
+        return cls(
+            arrays["product_ids"], arrays["indptr"], arrays["indices"], arrays["data"],
+            arrays["term_indptr"], arrays["term_rows"], arrays["term_data"], arrays["metadata"]
+        )
+
+    def _positions(self, product_ids: Iterable[int]) -> np.ndarray:
+        """Row positions of the known products among ``product_ids``."""
+        product_ids = np.fromiter(product_ids, dtype=np.int64)
+        if not len(self.product_ids):
+            return np.empty(0, dtype=np.int64)
+        positions = np.searchsorted(self.product_ids, product_ids)
+        positions[positions == len(self.product_ids)] = 0
+        return positions[self.product_ids[positions] == product_ids]
+
+    def _match(self, terms: np.ndarray, weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Dot product of a sparse query with every product sharing a term with it."""
+        offsets, entry_terms = _gather(self.term_indptr, terms)
+        if not len(offsets):
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        rows, inverse = np.unique(self.term_rows[offsets], return_inverse=True)
+        return rows, np.bincount(inverse, weights=self.term_data[offsets] * weights[entry_terms])
+
+    def similar(
+        self,
+        product_id: int,
+        limit: int,
+        candidates: Optional[Iterable[int]] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        Products with the most similar TF-IDF vector (cosine), best first.
+
+        With ``candidates`` (e.g. from the ANN index) only those products are
+        scored; otherwise every product sharing a term is.
+        """
+        positions = self._positions([product_id])
+        if not len(positions):
+            return []
+        low, high = self.indptr[positions[0]], self.indptr[positions[0] + 1]
+        terms, weights = self.indices[low:high], self.data[low:high]
+
+        if candidates is None:
+            rows, scores = self._match(terms, weights)
+        else:
+            rows = self._positions(candidates)
+            offsets, entry_rows = _gather(self.indptr, rows)
+            # Query terms are sorted, so each candidate entry is a binary search away
+            found = np.searchsorted(terms, self.indices[offsets])
+            found[found == len(terms)] = 0
+            matched = terms[found] == self.indices[offsets] if len(terms) else np.zeros(len(offsets), bool)
+            scores = np.bincount(
+                entry_rows[matched],
+                weights=self.data[offsets][matched] * weights[found[matched]],
+                minlength=len(rows)
+            )
+        keep = rows != positions[0]
+        return _top(self.product_ids[rows[keep]], scores[keep], limit)
+
+    def match_profile(
+        self,
+        history: Dict[int, float],
+        limit: int,
+        exclude: Optional[Iterable[int]] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        Products matching a user's content profile, best first.
+
+        The profile is the sum of the TF-IDF rows of the products in
+        ``history`` (product id to interaction weight), each scaled by its
+        log-damped weight, cut to its PROFILE_TERMS strongest terms.
+        Products in the history (and ``exclude``) aren't returned.
+        """
+        positions = self._positions(history)
+        if not len(positions):
+            return []
+        known = self.product_ids[positions]
+        weights = np.log1p(np.array([history[int(product_id)] for product_id in known], dtype=np.float32))
+        offsets, entry_rows = _gather(self.indptr, positions)
+        terms, inverse = np.unique(self.indices[offsets], return_inverse=True)
+        profile = np.bincount(inverse, weights=self.data[offsets] * weights[entry_rows])
+        if len(terms) > PROFILE_TERMS:
+            strongest = np.argpartition(-profile, PROFILE_TERMS - 1)[:PROFILE_TERMS]
+            terms, profile = terms[strongest], profile[strongest]
+
+        rows, scores = self._match(terms, profile)
+        ids = self.product_ids[rows]
+        excluded = np.fromiter(set(history) | set(exclude or ()), dtype=np.int64)
+        keep = ~np.isin(ids, excluded)
+        return _top(ids[keep], scores[keep], limit)
+
+
+def content_embeddings(vectors: ContentVectors, dimensions: int, seed: int = 0) -> np.ndarray:
+    """Dense LSA embeddings (float32) of the TF-IDF rows, in ``product_ids`` order."""
+    if not len(vectors):
+        return np.empty((0, dimensions), dtype=np.float32)
+    matrix = vectors.matrix()
+    components = min(dimensions, matrix.shape[1] - 1)
+    if components < 1:
+        return matrix.toarray().astype(np.float32)
+    return TruncatedSVD(n_components=components, random_state=seed).fit_transform(matrix).astype(np.float32)
@@ -0,0 +1,105 @@
+"""
+User-item interaction matrix built from ``user_behaviors``.
+
+Each behavior counts towards a user's affinity for a product with a weight
+per behavior type, so a purchase says more than a view. The weights are
+summed in the database and streamed out in chunks straight into NumPy
+arrays, so building the matrix never materializes ORM objects.
+"""
+
+from collections import namedtuple
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+
+from app.models import UserBehavior
+
+# Implicit feedback weight of each behavior type; unknown types count as views
+BEHAVIOR_WEIGHTS: Dict[str, float] = {
+    "view": 1.0,
+    "like": 2.0,
+    "share": 2.0,
+    "wishlist": 3.0,
+    "add_to_cart": 4.0,
+    "review": 4.0,
+    "purchase": 8.0,
+}
+DEFAULT_WEIGHT = 1.0
+
+FETCH_CHUNK_SIZE = 100_000
+
+InteractionMatrix = namedtuple("InteractionMatrix", ["user_ids", "item_ids", "matrix"])
+InteractionMatrix.__doc__ = """
+Users x items CSR matrix of summed behavior weights (float32), with the
+sorted user and product ids its rows and columns stand for.
+"""
+
+
+def behavior_weight():
+    """SQL expression for the weight of a behavior row."""
+    return case(BEHAVIOR_WEIGHTS, value=UserBehavior.behavior_type, else_=DEFAULT_WEIGHT)
+
+
+def user_history(db: Session, user_id: int) -> Dict[int, float]:
+    """Get a user's summed behavior weight per product in one query."""
+    rows = db.execute(
+        select(UserBehavior.product_id, func.sum(behavior_weight()))
+        .where(UserBehavior.user_id == user_id)
+        .group_by(UserBehavior.product_id)
+    )
+    return {product_id: float(weight) for product_id, weight in rows}
+
+
+def user_histories(db: Session, user_ids: List[int]) -> Dict[int, Dict[int, float]]:
+    """``user_history`` for many users in one query; users without behavior are left out."""
+    histories: Dict[int, Dict[int, float]] = {}
+    rows = db.execute(
+        select(UserBehavior.user_id, UserBehavior.product_id, func.sum(behavior_weight()))
+        .where(UserBehavior.user_id.in_(user_ids))
+        .group_by(UserBehavior.user_id, UserBehavior.product_id)
+    )
+    for user_id, product_id, weight in rows:
+        histories.setdefault(user_id, {})[product_id] = float(weight)
+    return histories
+
+
+def _weighted_triples(db: Session) -> Iterable[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    result = db.execute(
+        select(UserBehavior.user_id, UserBehavior.product_id, func.sum(behavior_weight()))
+        .group_by(UserBehavior.user_id, UserBehavior.product_id)
+        .execution_options(stream_results=True, yield_per=FETCH_CHUNK_SIZE)
+    )
+    for rows in result.partitions():
+        chunk = np.array(rows, dtype=np.float64)
+        yield chunk[:, 0].astype(np.int64), chunk[:, 1].astype(np.int64), chunk[:, 2].astype(np.float32)
+
+
+def load_interactions(db: Session) -> InteractionMatrix:
+    """Build the user-item interaction matrix from every recorded behavior."""
+    users, items, weights = [], [], []
+    for chunk_users, chunk_items, chunk_weights in _weighted_triples(db):
+        users.append(chunk_users)
+        items.append(chunk_items)
+        weights.append(chunk_weights)
+    if not users:
+        return InteractionMatrix(
+            np.empty(0, dtype=np.int64),
+            np.empty(0, dtype=np.int64),
+            sparse.csr_matrix((0, 0), dtype=np.float32)
+        )
+    return interaction_matrix(np.concatenate(users), np.concatenate(items), np.concatenate(weights))
+
+
+def interaction_matrix(users: np.ndarray, items: np.ndarray, weights: np.ndarray) -> InteractionMatrix:
+    """Build an interaction matrix from parallel user id, product id and weight arrays."""
+    user_ids, rows = np.unique(users, return_inverse=True)
+    item_ids, columns = np.unique(items, return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (weights.astype(np.float32), (rows, columns)),
+        shape=(len(user_ids), len(item_ids))
+    )
+    matrix.sum_duplicates()
+    return InteractionMatrix(user_ids, item_ids, matrix)
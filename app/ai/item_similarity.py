@@ -0,0 +1,147 @@
+"""
+Item-item collaborative filtering model.
+
+Built offline from the interaction matrix: item vectors (one weight per
+user, log-damped so a single heavy user doesn't dominate) are L2-normalized
+and multiplied in chunks of items, giving the cosine similarity of every
+pair of co-occurring items. Only the ``top_k`` most similar neighbours of
+each item are kept, as a CSR matrix.
+
+Online, recommending for a user is a lookup of the neighbour rows of the
+products in their history and a weighted merge of those rows with NumPy;
+no behavior rows are scanned per request.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from app.ai.artifacts import load_arrays, save_arrays
+from app.ai.interactions import InteractionMatrix
+
+BUILD_CHUNK_SIZE = 1024
+
+
+class ItemSimilarityModel:
+    """Top-K neighbours of every item, stored as CSR arrays."""
+
+    def __init__(self, item_ids: np.ndarray, indptr: np.ndarray, indices: np.ndarray, scores: np.ndarray):
+        self.item_ids = item_ids
+        self.indptr = indptr
+        self.indices = indices
+        self.scores = scores
+
+    def __len__(self) -> int:
+        return len(self.item_ids)
+
+    @classmethod
+    def build(cls, interactions: InteractionMatrix, top_k: int) -> "ItemSimilarityModel":
+        """Compute the top-K cosine neighbours of every item."""
+        items = interactions.matrix.T.tocsr().astype(np.float32)
+        items.data = np.log1p(items.data)
+        norms = np.sqrt(np.asarray(items.multiply(items).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        items = sparse.diags(1.0 / norms).astype(np.float32) @ items
+        items_t = items.T.tocsc()
+
+        indptr = [0]
+        indices: List[np.ndarray] = []
+        scores: List[np.ndarray] = []
+        for start in range(0, items.shape[0], BUILD_CHUNK_SIZE):
+            similarities = (items[start:start + BUILD_CHUNK_SIZE] @ items_t).tocsr()
+            for row in range(similarities.shape[0]):
+                low, high = similarities.indptr[row], similarities.indptr[row + 1]
+                neighbours = similarities.indices[low:high]
+                row_scores = similarities.data[low:high]
+                # An item isn't its own neighbour
+                keep = neighbours != start + row
+                neighbours, row_scores = neighbours[keep], row_scores[keep]
+                if len(row_scores) > top_k:
+                    best = np.argpartition(-row_scores, top_k)[:top_k]
+                    neighbours, row_scores = neighbours[best], row_scores[best]
+                order = np.argsort(-row_scores, kind="stable")
+                indices.append(neighbours[order])
+                scores.append(row_scores[order])
+                indptr.append(indptr[-1] + len(order))
+
+        return cls(
+            interactions.item_ids.astype(np.int64),
+            np.asarray(indptr, dtype=np.int64),
+            np.concatenate(indices).astype(np.int32) if indices else np.empty(0, dtype=np.int32),
+            np.concatenate(scores).astype(np.float32) if scores else np.empty(0, dtype=np.float32)
+        )
+
+    def save(self, path: str) -> None:
+        """Write the model to disk atomically."""
+        save_arrays(
+            path,
+            metadata={"items": len(self.item_ids), "neighbours": len(self.indices)},
+            item_ids=self.item_ids,
+            indptr=self.indptr,
+            indices=self.indices,
+            scores=self.scores
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "ItemSimilarityModel":
+        """Memory-map a saved model."""
+        arrays = load_arrays(path)
+        return cls(arrays["item_ids"], arrays["indptr"], arrays["indices"], arrays["scores"])
+
+    def _positions(self, product_ids: Iterable[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """Map product ids to item positions, returning the positions and which ids were known."""
+        product_ids = np.fromiter(product_ids, dtype=np.int64)
+        positions = np.searchsorted(self.item_ids, product_ids)
+        positions[positions == len(self.item_ids)] = 0
+        known = self.item_ids[positions] == product_ids if len(self.item_ids) else np.zeros(len(product_ids), bool)
+        return positions, known
+
+    def similar(self, product_id: int, limit: int) -> List[Tuple[int, float]]:
+        """Get the most similar products to one product."""
+        positions, known = self._positions([product_id])
+        if not known[0]:
+            return []
+        low, high = self.indptr[positions[0]], self.indptr[positions[0] + 1]
+        high = min(high, low + limit)
+        return list(zip(self.item_ids[self.indices[low:high]].tolist(), self.scores[low:high].tolist()))
+
+    def recommend(
+        self,
+        history: Dict[int, float],
+        limit: int,
+        exclude: Optional[Iterable[int]] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        Rank products by their similarity to a user's history.
+
+        ``history`` maps product id to interaction weight; each history item
+        contributes its neighbours' scores times its log-damped weight.
+        Products in the history (and ``exclude``) aren't recommended.
+        """
+        if not history or not len(self.item_ids):
+            return []
+        positions, known = self._positions(history)
+        weights = np.log1p(np.fromiter(history.values(), dtype=np.float32))[known]
+        positions = positions[known]
+        if not len(positions):
+            return []
+
+        starts, ends = self.indptr[positions], self.indptr[positions + 1]
+        lengths = ends - starts
+        if not lengths.sum():
+            return []
+        # Gather all neighbour rows at once: offsets of every entry of every row
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        candidates, inverse = np.unique(self.indices[offsets], return_inverse=True)
+        totals = np.bincount(inverse, weights=self.scores[offsets] * np.repeat(weights, lengths))
+
+        excluded = set(history) | set(exclude or ())
+        candidate_ids = self.item_ids[candidates]
+        allowed = ~np.isin(candidate_ids, np.fromiter(excluded, dtype=np.int64))
+        candidate_ids, totals = candidate_ids[allowed], totals[allowed]
+        if len(totals) > limit:
+            best = np.argpartition(-totals, limit)[:limit]
+            candidate_ids, totals = candidate_ids[best], totals[best]
+        order = np.argsort(-totals, kind="stable")
+        return list(zip(candidate_ids[order].tolist(), totals[order].astype(float).tolist()))
@@ -14,12 +14,15 @@ import aiohttp
 from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
 from sklearn.cluster import KMeans
 from sklearn.preprocessing import StandardScaler
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.feature_extraction.text import TfidfVectorizer
 import pickle
 import os
 import logging
 
+from app.config import settings
+from app.ai.artifacts import ArtifactCache
+from app.ai.content import ContentVectors
+from app.ai.interactions import BEHAVIOR_WEIGHTS, DEFAULT_WEIGHT
+
 logger = logging.getLogger(__name__)
 
 class ProductGenerator:
@@ -465,6 +468,8 @@ class MLService:
         self.behavior_analyzer = UserBehaviorAnalyzer()
         self.demand_predictor = DemandPredictor()
         self.recommendation_engine = None  # Will be initialized from existing code
+        # TF-IDF vectors built by scripts/build_recommendation_models.py
+        self.content_vectors = ArtifactCache(settings.CONTENT_VECTORS_PATH, ContentVectors.load)
     
     async def generate_limitless_products(self, target_count: int = 10000) -> List[Dict]:
         """Generate a limitless product database."""
@@ -528,19 +533,33 @@ class MLService:
         """Predict demand trends for products."""
         return self.demand_predictor.analyze_trends(sales_data)
     
-    def get_personalized_recommendations(self, user_id: int, user_history: List[Dict]) -> List[Dict]:
-        """Get personalized product recommendations."""
-        # This would integrate with the existing recommendation engine
-        # For now, return mock recommendations
-        recommendations = []
-        for i in range(10):
-            recommendations.append({
-                'product_id': random.randint(1, 1000),
-                'score': random.uniform(0.5, 1.0),
-                'reason': random.choice(['Similar to your purchases', 'Popular in your category', 'Trending now'])
-            })
-        
-        return sorted(recommendations, key=lambda x: x['score'], reverse=True)
+    def get_personalized_recommendations(self, user_id: int, user_history: List[Dict], limit: int = 10) -> List[Dict]:
+        """Get personalized product recommendations from the user's content profile."""
+        vectors = self.content_vectors.get()
+        if vectors is None:
+            logger.warning("Content vectors not built yet; no personalized recommendations")
+            return []
+        
+        # Sum the implicit feedback weight of each product's actions
+        history: Dict[int, float] = {}
+        for event in user_history:
+            weight = BEHAVIOR_WEIGHTS.get(event.get('action'), DEFAULT_WEIGHT)
+            history[event['product_id']] = history.get(event['product_id'], 0.0) + weight
+        
+        return [
+            {'product_id': product_id, 'score': score, 'reason': 'Similar to products you interacted with'}
+            for product_id, score in vectors.match_profile(history, limit)
+        ]
+    
+    def get_similar_products(self, product_id: int, limit: int = 10) -> List[Dict]:
+        """Get products with the most similar TF-IDF vectors."""
+        vectors = self.content_vectors.get()
+        if vectors is None:
+            return []
+        return [
+            {'product_id': similar_id, 'score': score}
+            for similar_id, score in vectors.similar(product_id, limit)
+        ]
     
     def save_models(self, filepath: str = "models/"):
         """Save all trained models."""
@@ -0,0 +1,206 @@
+"""
+Precomputed recommendations.
+
+Recommendations are computed offline and stored as ``ProductRecommendation``
+rows, so serving them is one indexed read. Active users (any behavior in
+the last ``RECOMMENDATION_ACTIVE_DAYS``) are split into chunks that run
+across a process pool. Each chunk loads its users' histories in one query
+and scores the users the ALS model knows with one matrix product per
+block of users, falling back to item-item similarity for newer users. It
+then replaces the chunk's rows with one delete and one bulk insert.
+
+Popular products are stored as rows without a user, for anonymous
+visitors and for users without rows of their own.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from itertools import repeat
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal, engine
+from app.models import ProductRecommendation, UserBehavior
+from app.ai.als import ALSModel
+from app.ai.artifacts import ArtifactCache
+from app.ai.interactions import behavior_weight, user_histories
+from app.ai.item_similarity import ItemSimilarityModel
+
+# Recommendation types of the stored rows
+COLLABORATIVE = "collaborative"
+ITEM_BASED = "item_based"
+POPULAR = "popular"
+
+REASONS = {
+    COLLABORATIVE: "Customers with similar taste liked this",
+    ITEM_BASED: "Similar to products you interacted with",
+    POPULAR: "Popular right now",
+}
+
+# Models of worker processes, memory-mapped on first use
+_als = ArtifactCache(settings.ALS_MODEL_PATH, ALSModel.load)
+_item_similarity = ArtifactCache(settings.ITEM_SIMILARITY_PATH, ItemSimilarityModel.load)
+
+
+def active_user_ids(db: Session, since: datetime) -> List[int]:
+    """Users with any behavior recorded since ``since``."""
+    rows = db.execute(
+        select(UserBehavior.user_id)
+        .where(UserBehavior.created_at >= since)
+        .distinct()
+        .order_by(UserBehavior.user_id)
+    )
+    return [user_id for (user_id,) in rows]
+
+
+def _rows(
+    user_id: Optional[int],
+    product_id: Optional[int],
+    ranked: List[Tuple[int, float]],
+    recommendation_type: str,
+    created_at: datetime
+) -> List[Dict[str, Any]]:
+    """ProductRecommendation rows for a ranking, scores scaled so the best is 1."""
+    if not ranked:
+        return []
+    best = ranked[0][1] if ranked[0][1] > 0 else 1.0
+    return [
+        {
+            "user_id": user_id,
+            "product_id": product_id if product_id is not None else recommended_id,
+            "recommended_product_id": recommended_id,
+            "recommendation_type": recommendation_type,
+            "score": min(1.0, max(0.0, score / best)),
+            "reason": REASONS[recommendation_type],
+            "created_at": created_at
+        }
+        for recommended_id, score in ranked
+    ]
+
+
+def recommend_users(
+    db: Session,
+    user_ids: List[int],
+    limit: int,
+    als: Optional[ALSModel],
+    item_similarity: Optional[ItemSimilarityModel],
+    created_at: datetime
+) -> List[Dict[str, Any]]:
+    """Compute the recommendation rows of a chunk of users."""
+    histories = user_histories(db, user_ids)
+    user_ids = [user_id for user_id in user_ids if user_id in histories]
+    if als is not None:
+        ranked_by_als = als.recommend_users(user_ids, limit, [histories[user_id] for user_id in user_ids])
+    else:
+        ranked_by_als = [[] for _ in user_ids]
+
+    rows = []
+    for user_id, ranked in zip(user_ids, ranked_by_als):
+        history = histories[user_id]
+        # Rows hang off the product the user is most interested in
+        anchor = max(history, key=history.get)
+        if ranked:
+            rows.extend(_rows(user_id, anchor, ranked, COLLABORATIVE, created_at))
+        elif item_similarity is not None:
+            rows.extend(_rows(user_id, anchor, item_similarity.recommend(history, limit), ITEM_BASED, created_at))
+    return rows
+
+
+def precompute_users(
+    db: Session,
+    user_ids: List[int],
+    limit: int,
+    als: Optional[ALSModel],
+    item_similarity: Optional[ItemSimilarityModel],
+    created_at: Optional[datetime] = None
+) -> int:
+    """Recompute and replace the stored rows of some users; the caller commits."""
+    rows = recommend_users(db, user_ids, limit, als, item_similarity, created_at or datetime.utcnow())
+    db.execute(delete(ProductRecommendation).where(ProductRecommendation.user_id.in_(user_ids)))
+    if rows:
+        db.execute(insert(ProductRecommendation), rows)
+    return len(rows)
+
+
+def precompute_popular(db: Session, since: datetime, limit: int, created_at: datetime) -> int:
+    """Replace the stored popular products with the most interacted-with since ``since``."""
+    weight = func.sum(behavior_weight())
+    ranked = db.execute(
+        select(UserBehavior.product_id, weight)
+        .where(UserBehavior.created_at >= since)
+        .group_by(UserBehavior.product_id)
+        .order_by(weight.desc())
+        .limit(limit)
+    ).all()
+    rows = _rows(None, None, [(product_id, float(score)) for product_id, score in ranked], POPULAR, created_at)
+
+    db.execute(delete(ProductRecommendation).where(
+        ProductRecommendation.user_id.is_(None),
+        ProductRecommendation.recommendation_type == POPULAR
+    ))
+    if rows:
+        db.execute(insert(ProductRecommendation), rows)
+    return len(rows)
+
+
+def _init_worker() -> None:
+    # Connections inherited from the parent process must not be shared
+    engine.dispose(close=False)
+
+
+def _precompute_chunk(user_ids: List[int], limit: int, created_at: datetime, session_factory=SessionLocal) -> int:
+    db = session_factory()
+    try:
+        stored = precompute_users(db, user_ids, limit, _als.get(), _item_similarity.get(), created_at)
+        db.commit()
+        return stored
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def precompute_all(
+    limit: int,
+    active_days: int,
+    chunk_size: int,
+    workers: int,
+    session_factory=SessionLocal
+) -> Tuple[int, int]:
+    """
+    Recompute the stored recommendations of every active user and the
+    popular products. Returns the number of users and of rows stored.
+
+    Rows of users who are no longer active are removed at the end.
+    """
+    created_at = datetime.utcnow()
+    since = created_at - timedelta(days=active_days)
+    db = session_factory()
+    try:
+        user_ids = active_user_ids(db, since)
+        precompute_popular(db, since, settings.POPULAR_RECOMMENDATION_LIMIT, created_at)
+        db.commit()
+    finally:
+        db.close()
+
+    chunks = [user_ids[start:start + chunk_size] for start in range(0, len(user_ids), chunk_size)]
+    if workers == 1 or len(chunks) <= 1:
+        stored = sum(_precompute_chunk(chunk, limit, created_at, session_factory) for chunk in chunks)
+    else:
+        with ProcessPoolExecutor(max_workers=workers or None, initializer=_init_worker) as pool:
+            stored = sum(pool.map(_precompute_chunk, chunks, repeat(limit), repeat(created_at)))
+
+    db = session_factory()
+    try:
+        db.execute(delete(ProductRecommendation).where(
+            ProductRecommendation.user_id.isnot(None),
+            ProductRecommendation.created_at < created_at
+        ))
+        db.commit()
+    finally:
+        db.close()
+    return len(user_ids), stored
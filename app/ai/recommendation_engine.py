@@ -3,13 +3,25 @@ AI-powered recommendation engine for product suggestions.
 """
 
 import random
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 import numpy as np
 from datetime import datetime, timedelta
 
-from app.models import Product, User, UserBehavior, ProductRecommendation
+from app.config import settings
+from app.models import Product, UserBehavior, ProductRecommendation
+from app.ai.artifacts import ArtifactCache
+from app.ai.interactions import user_history
+from app.ai.item_similarity import ItemSimilarityModel
+from app.ai.als import ALSModel
+from app.ai.ann import IVFIndex
+from app.ai.content import ContentVectors
+from app.ai.precompute import POPULAR, precompute_users
+from app.utils.catalog import CATALOG_COLUMNS
+
+# ANN candidates re-ranked by exact TF-IDF similarity, per product requested
+CONTENT_CANDIDATE_FACTOR = 5
 
 
 class RecommendationEngine:
@@ -18,6 +30,13 @@ class RecommendationEngine:
         self.content_based_weight = 0.3
         self.popularity_weight = 0.2
         self.recent_weight = 0.1
+        
+        # Built offline by scripts/build_recommendation_models.py
+        self.item_similarity = ArtifactCache(settings.ITEM_SIMILARITY_PATH, ItemSimilarityModel.load)
+        self.als = ArtifactCache(settings.ALS_MODEL_PATH, ALSModel.load)
+        self.item_index = ArtifactCache(settings.ITEM_INDEX_PATH, IVFIndex.load)
+        self.content_index = ArtifactCache(settings.CONTENT_INDEX_PATH, IVFIndex.load)
+        self.content_vectors = ArtifactCache(settings.CONTENT_VECTORS_PATH, ContentVectors.load)
 
     async def get_recommendations(
         self,
@@ -69,78 +88,129 @@ class RecommendationEngine:
         db: Session
     ) -> List[Product]:
         """
-        Collaborative filtering based on similar users' behavior.
+        Collaborative filtering over the precomputed models.
+
+        Users the ALS model was trained on are scored against every product
+        with their factors; newer users fall back to item-item similarity
+        over their history.
         """
         try:
-            # Get user's behavior history
-            user_behaviors = db.query(UserBehavior).filter(
-                UserBehavior.user_id == user_id
-            ).all()
-            
-            if not user_behaviors:
-                return []
-            
-            # Find similar users based on behavior patterns
-            similar_users = await self._find_similar_users(user_id, db)
-            
-            # Get products liked by similar users
-            recommended_products = []
-            for similar_user in similar_users:
-                user_products = db.query(UserBehavior).filter(
-                    UserBehavior.user_id == similar_user.id,
-                    UserBehavior.behavior_type.in_(['view', 'purchase', 'wishlist'])
-                ).all()
-                
-                for behavior in user_products:
-                    product = db.query(Product).filter(
-                        Product.id == behavior.product_id
-                    ).first()
-                    if product:
-                        recommended_products.append(product)
-            
-            return recommended_products
+            history = user_history(db, user_id)
+            als = self.als.get()
+            if als is not None and als.has_user(user_id):
+                ranked = als.recommend(user_id, 20, exclude=history)
+            else:
+                model = self.item_similarity.get()
+                if model is None:
+                    return []
+                # Products similar to what the user interacted with, weighted by how strongly
+                ranked = model.recommend(history, 20)
+            return self._products_in_order([product_id for product_id, _ in ranked], db)
             
         except Exception as e:
             print(f"Error in collaborative filtering: {e}")
             return []
 
+    def _products_in_order(
+        self,
+        product_ids: List[int],
+        db: Session
+    ) -> List[Product]:
+        """
+        Load products by id in one query, keeping the given order.
+        """
+        if not product_ids:
+            return []
+        products = {
+            product.id: product
+            for product in db.query(Product).filter(Product.id.in_(product_ids))
+        }
+        return [products[product_id] for product_id in product_ids if product_id in products]
+
+    def get_item_based_recommendations(
+        self,
+        product_id: int,
+        limit: int = 10,
+        db: Session = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Products bought and browsed by the same people, from the ANN index
+        over the ALS item factors.
+        """
+        index = self.item_index.get()
+        if index is None:
+            return []
+        return self._similar_products(index.similar(product_id, limit, settings.ANN_NPROBE), db)
+
+    def get_content_based_recommendations(
+        self,
+        product_id: int,
+        limit: int = 10,
+        db: Session = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Products with similar names, descriptions, tags and category.
+
+        Candidates come from the ANN index over the content embeddings and are
+        re-ranked by their TF-IDF cosine similarity. Products vectorized since
+        the index was built aren't in it yet; they are matched against every
+        product sharing a term.
+        """
+        vectors = self.content_vectors.get()
+        index = self.content_index.get()
+        if vectors is None:
+            if index is None:
+                return []
+            return self._similar_products(index.similar(product_id, limit, settings.ANN_NPROBE), db)
+
+        candidates = None
+        if index is not None and index.vector(product_id) is not None:
+            candidates = [
+                candidate for candidate, _ in
+                index.similar(product_id, limit * CONTENT_CANDIDATE_FACTOR, settings.ANN_NPROBE)
+            ]
+        return self._similar_products(vectors.similar(product_id, limit, candidates), db)
+
+    def _similar_products(
+        self,
+        ranked: List[Tuple[int, float]],
+        db: Session
+    ) -> List[Dict[str, Any]]:
+        """
+        Summaries of ranked products with their similarity, best first.
+        """
+        scores = dict(ranked)
+        if db is None:
+            return [{"product_id": product_id, "score": score} for product_id, score in ranked]
+        return [
+            {
+                "product_id": product.id,
+                "name": product.name,
+                "price": product.price,
+                "image_url": product.image_url,
+                "score": scores[product.id]
+            }
+            for product in self._products_in_order(list(scores), db)
+        ]
+
     async def _content_based_filtering(
         self,
         user_id: Optional[int],
         db: Session
     ) -> List[Product]:
         """
-        Content-based filtering based on product categories and features.
+        Products matching the TF-IDF profile of what the user interacted with.
         """
         try:
             if not user_id:
                 return []
             
-            # Get user's preferred categories
-            user_categories = db.query(
-                Product.category,
-                func.count(UserBehavior.id).label('interaction_count')
-            ).join(
-                UserBehavior, Product.id == UserBehavior.product_id
-            ).filter(
-                UserBehavior.user_id == user_id,
-                UserBehavior.behavior_type.in_(['view', 'purchase'])
-            ).group_by(
-                Product.category
-            ).order_by(
-                func.count(UserBehavior.id).desc()
-            ).limit(3).all()
-            
-            if not user_categories:
+            vectors = self.content_vectors.get()
+            if vectors is None:
                 return []
             
-            # Get products from preferred categories
-            preferred_categories = [cat[0] for cat in user_categories]
-            recommended_products = db.query(Product).filter(
-                Product.category.in_(preferred_categories)
-            ).limit(20).all()
-            
-            return recommended_products
+            ranked = vectors.match_profile(user_history(db, user_id), 20)
+            return self._products_in_order([product_id for product_id, _ in ranked], db)
             
         except Exception as e:
             print(f"Error in content-based filtering: {e}")
@@ -191,39 +261,6 @@ class RecommendationEngine:
             print(f"Error in recent products: {e}")
             return []
 
-    async def _find_similar_users(
-        self,
-        user_id: int,
-        db: Session
-    ) -> List[User]:
-        """
-        Find users with similar behavior patterns.
-        """
-        try:
-            # Get current user's behavior
-            user_behaviors = db.query(UserBehavior).filter(
-                UserBehavior.user_id == user_id
-            ).all()
-            
-            if not user_behaviors:
-                return []
-            
-            # Find users who interacted with similar products
-            user_product_ids = [b.product_id for b in user_behaviors]
-            
-            similar_users = db.query(User).join(
-                UserBehavior, User.id == UserBehavior.user_id
-            ).filter(
-                UserBehavior.product_id.in_(user_product_ids),
-                User.id != user_id
-            ).distinct().limit(10).all()
-            
-            return similar_users
-            
-        except Exception as e:
-            print(f"Error finding similar users: {e}")
-            return []
-
     def _score_and_rank_products(
         self,
         products: List[Product],
@@ -330,6 +367,50 @@ class RecommendationEngine:
         except Exception as e:
             print(f"Error recording user behavior: {e}")
 
+    def get_stored_recommendations(
+        self,
+        user_id: Optional[int],
+        limit: int,
+        db: Session
+    ) -> List[Any]:
+        """
+        Precomputed recommendations, best first, as catalog rows with their
+        ``score`` and ``reason``; one indexed read. Without a user, the
+        stored popular products.
+        """
+        query = db.query(
+            *CATALOG_COLUMNS,
+            ProductRecommendation.score,
+            ProductRecommendation.reason
+        ).join(
+            Product, Product.id == ProductRecommendation.recommended_product_id
+        )
+        if user_id is None:
+            query = query.filter(
+                ProductRecommendation.user_id.is_(None),
+                ProductRecommendation.recommendation_type == POPULAR
+            )
+        else:
+            query = query.filter(ProductRecommendation.user_id == user_id)
+        return query.order_by(ProductRecommendation.score.desc()).limit(limit).all()
+
+    def store_recommendations(
+        self,
+        user_ids: List[int],
+        db: Session
+    ) -> int:
+        """
+        Recompute and replace the stored recommendations of some users,
+        without committing. Returns the number of rows stored.
+        """
+        return precompute_users(
+            db,
+            user_ids,
+            settings.STORED_RECOMMENDATION_LIMIT,
+            self.als.get(),
+            self.item_similarity.get()
+        )
+
     async def update_recommendations(
         self,
         user_id: int,
@@ -339,27 +420,11 @@ class RecommendationEngine:
         Update stored recommendations for a user.
         """
         try:
-            # Get fresh recommendations
-            recommendations = await self.get_recommendations(user_id, 20, db)
-            
-            # Clear old recommendations
-            db.query(ProductRecommendation).filter(
-                ProductRecommendation.user_id == user_id
-            ).delete()
-            
-            # Store new recommendations
-            for i, product in enumerate(recommendations):
-                recommendation = ProductRecommendation(
-                    user_id=user_id,
-                    product_id=product.id,
-                    score=1.0 - (i * 0.05),  # Decreasing score
-                    created_at=datetime.utcnow()
-                )
-                db.add(recommendation)
-            
+            self.store_recommendations([user_id], db)
             db.commit()
             
         except Exception as e:
+            db.rollback()
             print(f"Error updating recommendations: {e}")
 
 
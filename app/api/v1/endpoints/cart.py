@@ -1,65 +1,51 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from redis import Redis
 from sqlalchemy.orm import Session
-from typing import List
-from datetime import datetime
+from typing import Optional
 
-from app.database import get_db
-from app.models import Cart, CartItem, Product, User
-from app.schemas.cart import CartItemCreate, CartItemResponse, CartResponse
-from app.core.security import get_current_user
+from app.database import get_db, get_redis
+from app.models import Product
+from app.schemas.cart import CartBatchRequest, CartItemCreate, CartItemResponse, CartResponse
+from app.schemas.order import OrderCreate
+from app.core.idempotency import run_idempotent
+from app.cart.store import get_cart_store
+from app.inventory.reservations import InsufficientStockError, hold_stock, release_holds
+from app.api.v1.endpoints.orders import place_cart_order
+from app.utils.cart import fold_cart_operations, serialize_cart
 
 router = APIRouter()
 
+# Upper bound on operations accepted by one bulk cart mutation
+MAX_BATCH_OPERATIONS = 100
+
+# Billing details for demo checkouts that don't send any
+DEMO_BILLING = {
+    "billing_first_name": "Demo",
+    "billing_last_name": "Customer",
+    "billing_email": "demo@example.com",
+    "billing_address": "1 Demo Street",
+    "billing_city": "Demo City",
+    "billing_state": "Demo State",
+    "billing_country": "US",
+    "billing_postal_code": "00000",
+}
+
 @router.get("/", response_model=CartResponse)
 async def get_cart(
-    db: Session = Depends(get_db)
+    store = Depends(get_cart_store)
 ):
     """Get user's cart with all items."""
-    cart = db.query(Cart).filter(Cart.user_id == 1).first()
-    
-    if not cart:
-        # Create new cart if it doesn't exist (Demo mode - use user_id 1)
-        cart = Cart(user_id=1, created_at=datetime.utcnow())
-        db.add(cart)
-        db.commit()
-        db.refresh(cart)
-    
-    # Get cart items with product details
-    cart_items = db.query(CartItem).filter(CartItem.cart_id == cart.id).all()
-    
-    total = 0
-    items = []
-    
-    for item in cart_items:
-        product = db.query(Product).filter(Product.id == item.product_id).first()
-        if product:
-            item_total = product.price * item.quantity
-            total += item_total
-            
-            items.append({
-                "id": item.id,
-                "product_id": item.product_id,
-                "product_name": product.name,
-                "product_price": product.price,
-                "quantity": item.quantity,
-                "total": item_total
-            })
-    
-    return {
-        "cart_id": cart.id,
-        "user_id": cart.user_id,
-        "items": items,
-        "total": total,
-        "item_count": len(items)
-    }
+    # Demo mode - use user_id 1; the cart is created if it doesn't exist
+    cart_id, lines = store.get_cart(1)
+    return serialize_cart(cart_id, 1, lines)
 
 @router.post("/add", response_model=CartItemResponse)
 async def add_to_cart(
     item: CartItemCreate,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    store = Depends(get_cart_store)
 ):
     """Add product to cart (Demo mode - no auth required)."""
-    """Add product to cart."""
     # Verify product exists
     product = db.query(Product).filter(Product.id == item.product_id).first()
     if not product:
@@ -68,40 +54,22 @@ async def add_to_cart(
             detail="Product not found"
         )
     
-    # Check stock availability
-    if product.stock_quantity < item.quantity:
+    # Check if item already exists in cart (Demo mode - use user_id 1)
+    existing_item = store.find_item(1, item.product_id)
+    new_quantity = item.quantity + (existing_item.quantity if existing_item else 0)
+    
+    # Hold the stock for the cart
+    try:
+        hold_stock(db, 1, {item.product_id: new_quantity})
+    except InsufficientStockError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Insufficient stock"
+            detail="Insufficient stock for requested quantity" if existing_item else "Insufficient stock"
         )
     
-    # Get or create cart (Demo mode - use user_id 1)
-    cart = db.query(Cart).filter(Cart.user_id == 1).first()
-    if not cart:
-        cart = Cart(user_id=1, created_at=datetime.utcnow())
-        db.add(cart)
-        db.commit()
-        db.refresh(cart)
-    
-    # Check if item already exists in cart
-    existing_item = db.query(CartItem).filter(
-        CartItem.cart_id == cart.id,
-        CartItem.product_id == item.product_id
-    ).first()
-    
     if existing_item:
         # Update quantity
-        new_quantity = existing_item.quantity + item.quantity
-        if product.stock_quantity < new_quantity:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Insufficient stock for requested quantity"
-            )
-        
-        existing_item.quantity = new_quantity
-        existing_item.updated_at = datetime.utcnow()
-        db.commit()
-        db.refresh(existing_item)
+        existing_item = store.set_quantity(1, existing_item, new_quantity)
         
         return {
             "id": existing_item.id,
@@ -111,15 +79,7 @@ async def add_to_cart(
         }
     else:
         # Add new item
-        cart_item = CartItem(
-            cart_id=cart.id,
-            product_id=item.product_id,
-            quantity=item.quantity,
-            created_at=datetime.utcnow()
-        )
-        db.add(cart_item)
-        db.commit()
-        db.refresh(cart_item)
+        cart_item = store.add_item(1, item.product_id, item.quantity)
         
         return {
             "id": cart_item.id,
@@ -128,11 +88,71 @@ async def add_to_cart(
             "created_at": cart_item.created_at
         }
 
+@router.post("/items:batch", response_model=CartResponse)
+async def batch_update_cart(
+    batch: CartBatchRequest,
+    db: Session = Depends(get_db),
+    store = Depends(get_cart_store)
+):
+    """
+    Apply a list of add/update/remove operations to the cart (Demo mode).
+
+    Operations apply in order and are all-or-nothing: stock for every
+    product touched is held in one transaction and the cart is written in a
+    single transaction. Returns the updated cart.
+    """
+    if not batch.operations:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No operations given"
+        )
+    if len(batch.operations) > MAX_BATCH_OPERATIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_BATCH_OPERATIONS} operations are allowed per batch"
+        )
+    
+    try:
+        changes = fold_cart_operations(store.get_quantities(1), batch.operations)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    # Every product that ends up in the cart must exist
+    wanted = [product_id for product_id, quantity in changes.items() if quantity > 0]
+    found = {
+        product_id for (product_id,) in db.query(Product.id).filter(Product.id.in_(wanted))
+    } if wanted else set()
+    
+    missing = sorted(set(wanted) - found)
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Products not found: {missing}"
+        )
+    
+    # Hold (or release) the stock for every product touched
+    try:
+        hold_stock(db, 1, changes)
+    except InsufficientStockError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    store.apply_quantities(1, changes)
+    
+    cart_id, lines = store.get_cart(1)
+    return serialize_cart(cart_id, 1, lines)
+
 @router.put("/items/{item_id}", response_model=CartItemResponse)
 async def update_cart_item(
     item_id: int,
     quantity: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    store = Depends(get_cart_store)
 ):
     """Update cart item quantity."""
     if quantity <= 0:
@@ -142,10 +162,7 @@ async def update_cart_item(
         )
     
     # Get cart item (Demo mode - use user_id 1)
-    cart_item = db.query(CartItem).join(Cart).filter(
-        CartItem.id == item_id,
-        Cart.user_id == 1
-    ).first()
+    cart_item = store.get_item(1, item_id)
     
     if not cart_item:
         raise HTTPException(
@@ -153,19 +170,17 @@ async def update_cart_item(
             detail="Cart item not found"
         )
     
-    # Check stock availability
-    product = db.query(Product).filter(Product.id == cart_item.product_id).first()
-    if product and product.stock_quantity < quantity:
+    # Hold the stock for the new quantity
+    try:
+        hold_stock(db, 1, {cart_item.product_id: quantity})
+    except InsufficientStockError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Insufficient stock"
         )
     
     # Update quantity
-    cart_item.quantity = quantity
-    cart_item.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(cart_item)
+    cart_item = store.set_quantity(1, cart_item, quantity)
     
     return {
         "id": cart_item.id,
@@ -177,13 +192,11 @@ async def update_cart_item(
 @router.delete("/items/{item_id}")
 async def remove_from_cart(
     item_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    store = Depends(get_cart_store)
 ):
     """Remove item from cart."""
-    cart_item = db.query(CartItem).join(Cart).filter(
-        CartItem.id == item_id,
-        Cart.user_id == 1
-    ).first()
+    cart_item = store.get_item(1, item_id)
     
     if not cart_item:
         raise HTTPException(
@@ -191,89 +204,61 @@ async def remove_from_cart(
             detail="Cart item not found"
         )
     
-    db.delete(cart_item)
-    db.commit()
+    store.remove_item(1, cart_item)
+    hold_stock(db, 1, {cart_item.product_id: 0})
     
     return {"message": "Item removed from cart"}
 
 @router.delete("/clear")
 async def clear_cart(
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    store = Depends(get_cart_store)
 ):
     """Clear all items from cart (Demo mode)."""
-    cart = db.query(Cart).filter(Cart.user_id == 1).first()
-    
-    if cart:
-        db.query(CartItem).filter(CartItem.cart_id == cart.id).delete()
-        db.commit()
+    store.clear(1)
+    release_holds(db, 1)
     
     return {"message": "Cart cleared"}
 
+@router.get("/summary")
+async def get_cart_summary(
+    store = Depends(get_cart_store)
+):
+    """Get the cart subtotal and item count without loading its items (Demo mode)."""
+    return store.summary(1)
+
 @router.get("/count")
 async def get_cart_count(
-    db: Session = Depends(get_db)
+    store = Depends(get_cart_store)
 ):
     """Get total number of items in cart (Demo mode)."""
-    cart = db.query(Cart).filter(Cart.user_id == 1).first()
-    
-    if not cart:
-        return {"count": 0}
-    
-    count = db.query(CartItem).filter(CartItem.cart_id == cart.id).count()
-    return {"count": count}
+    return {"count": store.count(1)}
 
 @router.post("/checkout")
 async def checkout(
-    db: Session = Depends(get_db)
+    request: Request,
+    order: Optional[OrderCreate] = None,
+    db: Session = Depends(get_db),
+    redis: Redis = Depends(get_redis),
+    store = Depends(get_cart_store)
 ):
-    """Process cart checkout (Demo mode)."""
-    cart = db.query(Cart).filter(Cart.user_id == 1).first()
+    """
+    Process cart checkout (Demo mode).
     
-    if not cart:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Cart is empty"
-        )
-    
-    cart_items = db.query(CartItem).filter(CartItem.cart_id == cart.id).all()
-    
-    if not cart_items:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Cart is empty"
-        )
+    Retries sent with the same Idempotency-Key get the first response back
+    instead of placing another order.
+    """
+    details = order.model_dump() if order else DEMO_BILLING
     
-    # Validate stock and calculate total
-    total = 0
-    for item in cart_items:
-        product = db.query(Product).filter(Product.id == item.product_id).first()
-        if not product:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Product {item.product_id} not found"
-            )
-        
-        if product.stock < item.quantity:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Insufficient stock for {product.name}"
-            )
+    def place():
+        # Payment is taken separately through the payment endpoints; the
+        # confirmation email goes out through the outbox
+        placed = place_cart_order(db, store, 1, details)
         
-        total += product.price * item.quantity
-    
-    # In a real implementation, you would:
-    # 1. Create an order
-    # 2. Process payment
-    # 3. Update product stock
-    # 4. Clear cart
-    # 5. Send confirmation email
-    
-    # For now, just clear the cart
-    db.query(CartItem).filter(CartItem.cart_id == cart.id).delete()
-    db.commit()
+        return {
+            "message": "Checkout successful",
+            "total": placed.total_amount,
+            "order_id": placed.order_number
+        }
     
-    return {
-        "message": "Checkout successful",
-        "total": total,
-        "order_id": f"ORD-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}"
-    } 
\ No newline at end of file
+    return await run_idempotent(request, redis, db, "checkout", 1, place)
@@ -3,16 +3,20 @@ ML-powered product generation and management endpoints.
 """
 
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from redis import Redis
 from sqlalchemy.orm import Session
 from typing import List, Dict, Optional
 import asyncio
 import json
 
-from app.database import get_db
+from app.database import get_db, get_redis
 from app.ai.ml_service import MLService
-from app.schemas.product import ProductCreate, ProductResponse, MLProductResponse
+from app.ai.recommendation_engine import recommendation_engine
+from app.schemas.product import ProductCreate, MLProductResponse
 from app.models.product import Product
 from app.core.security import get_current_user
+from app.core.cache import bump_catalog_version, cached_count
+from app.utils.catalog import serialize_catalog_row
 
 router = APIRouter()
 ml_service = MLService()
@@ -23,6 +27,7 @@ async def generate_products(
     category: Optional[str] = None,
     background_tasks: BackgroundTasks = None,
     db: Session = Depends(get_db),
+    redis: Redis = Depends(get_redis),
     current_user = Depends(get_current_user)
 ):
     """Generate AI-powered products."""
@@ -59,6 +64,7 @@ async def generate_products(
             stored_products.append(db_product)
         
         db.commit()
+        bump_catalog_version(redis)
         
         return {
             "message": f"Successfully generated {len(stored_products)} products",
@@ -78,7 +84,9 @@ async def get_limitless_products(
     search: Optional[str] = None,
     sort_by: Optional[str] = "created_at",
     sort_order: Optional[str] = "desc",
-    db: Session = Depends(get_db)
+    approximate: bool = False,
+    db: Session = Depends(get_db),
+    redis: Redis = Depends(get_redis)
 ):
     """Get limitless products with advanced filtering."""
     try:
@@ -121,7 +129,13 @@ async def get_limitless_products(
                 query = query.order_by(Product.created_at.desc())
         
         # Apply pagination
-        total = query.count()
+        total = cached_count(
+            query,
+            redis,
+            "ml_products",
+            {"category": category, "search": search},
+            approximate=approximate
+        )
         products = query.offset((page - 1) * limit).limit(limit).all()
         
         # Convert to ML response format
@@ -172,6 +186,7 @@ async def get_limitless_products(
 async def optimize_product_prices(
     background_tasks: BackgroundTasks = None,
     db: Session = Depends(get_db),
+    redis: Redis = Depends(get_redis),
     current_user = Depends(get_current_user)
 ):
     """Optimize product prices using ML."""
@@ -224,6 +239,7 @@ async def optimize_product_prices(
                 updated_count += 1
         
         db.commit()
+        bump_catalog_version(redis)
         
         return {
             "message": f"Successfully optimized prices for {updated_count} products",
@@ -242,54 +258,18 @@ async def get_personalized_recommendations(
 ):
     """Get personalized product recommendations."""
     try:
-        # Mock user history (in real app, this would come from database)
-        user_history = [
-            {"product_id": 1, "action": "purchase", "timestamp": "2024-01-01"},
-            {"product_id": 5, "action": "view", "timestamp": "2024-01-02"},
-            {"product_id": 10, "action": "add_to_cart", "timestamp": "2024-01-03"}
-        ]
-        
-        # Get recommendations
-        recommendations = ml_service.get_personalized_recommendations(user_id, user_history)
-        
-        # Get product details for recommendations
-        recommended_products = []
-        for rec in recommendations[:limit]:
-            product = db.query(Product).filter(Product.id == rec["product_id"]).first()
-            if product:
-                recommended_products.append({
-                    "product": ProductResponse(
-                        id=product.id,
-                        name=product.name,
-                        description=product.description,
-                        short_description=product.short_description,
-                        price=product.price,
-                        original_price=product.original_price,
-                        category=product.category,
-                        subcategory=product.subcategory,
-                        brand=product.brand,
-                        rating=product.rating,
-                        reviews=product.reviews,
-                        stock_quantity=product.stock_quantity,
-                        is_featured=product.is_featured,
-                        is_bestseller=product.is_bestseller,
-                        is_new=product.is_new,
-                        is_on_sale=product.is_on_sale,
-                        discount_percentage=product.discount_percentage,
-                        tags=product.tags,
-                        images=product.images,
-                        features=product.features,
-                        specifications=product.specifications,
-                        created_at=product.created_at,
-                        updated_at=product.updated_at
-                    ),
-                    "score": rec["score"],
-                    "reason": rec["reason"]
-                })
+        # Precomputed by scripts/precompute_recommendations.py, else popular products
+        recommendations = (
+            recommendation_engine.get_stored_recommendations(user_id, limit, db)
+            or recommendation_engine.get_stored_recommendations(None, limit, db)
+        )
         
         return {
             "user_id": user_id,
-            "recommendations": recommended_products
+            "recommendations": [
+                {"product": serialize_catalog_row(row), "score": row.score, "reason": row.reason}
+                for row in recommendations
+            ]
         }
         
     except Exception as e:
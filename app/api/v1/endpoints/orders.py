@@ -2,18 +2,78 @@
 Order endpoints for order management.
 """
 
-from fastapi import APIRouter
+from typing import Any, Dict, List
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from redis import Redis
+from sqlalchemy.orm import Session, selectinload
+
+from app.database import get_db, get_redis
+from app.models import Order
+from app.schemas.order import OrderCreate, OrderResponse
+from app.core.idempotency import run_idempotent
+from app.cart.store import get_cart_store
+from app.inventory.reservations import InsufficientStockError
+from app.orders.pipeline import EmptyCartError, MissingProductsError, checkout_cart
 
 router = APIRouter()
 
 
-@router.get("/")
-async def get_orders():
-    """Get all orders."""
-    return {"message": "Orders endpoint - to be implemented"}
+def place_cart_order(db: Session, store, user_id: int, details: Dict[str, Any]) -> Order:
+    """Check out the user's cart, turning pipeline errors into 400 responses."""
+    try:
+        return checkout_cart(db, store, user_id, details)
+    except EmptyCartError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cart is empty"
+        )
+    except MissingProductsError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Product {e.product_ids[0]} not found"
+        )
+    except InsufficientStockError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Insufficient stock for products {', '.join(map(str, e.product_ids))}"
+        )
+
+
+@router.get("/", response_model=List[OrderResponse])
+async def get_orders(
+    skip: int = 0,
+    limit: int = 20,
+    db: Session = Depends(get_db)
+):
+    """Get the user's orders, newest first (Demo mode)."""
+    return (
+        db.query(Order)
+        .options(selectinload(Order.items))
+        .filter(Order.user_id == 1)
+        .order_by(Order.id.desc())
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
 
 
-@router.post("/")
-async def create_order():
-    """Create a new order."""
-    return {"message": "Create order - to be implemented"} 
\ No newline at end of file
+@router.post("/", response_model=OrderResponse, status_code=status.HTTP_201_CREATED)
+async def create_order(
+    request: Request,
+    order: OrderCreate,
+    db: Session = Depends(get_db),
+    redis: Redis = Depends(get_redis),
+    store = Depends(get_cart_store)
+):
+    """Create an order from the user's cart (Demo mode); honours Idempotency-Key."""
+    def place():
+        placed = place_cart_order(db, store, 1, order.model_dump())
+        return OrderResponse.model_validate(
+            db.query(Order)
+            .options(selectinload(Order.items))
+            .filter(Order.id == placed.id)
+            .one()
+        )
+    
+    return await run_idempotent(request, redis, db, "orders", 1, place, status.HTTP_201_CREATED)
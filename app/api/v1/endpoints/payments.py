@@ -1,25 +1,54 @@
 """
 Payment endpoints for payment processing.
+
+Payments honour the Idempotency-Key header, so a retried request is
+answered with the first response instead of charging again.
 """
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, Request
+from redis import Redis
+from sqlalchemy.orm import Session
+
+from app.core.idempotency import run_idempotent
+from app.database import get_db, get_redis
 
 router = APIRouter()
 
 
 @router.post("/stripe")
-async def process_stripe_payment():
+async def process_stripe_payment(
+    request: Request,
+    db: Session = Depends(get_db),
+    redis: Redis = Depends(get_redis)
+):
     """Process Stripe payment."""
-    return {"message": "Stripe payment - to be implemented"}
+    return await run_idempotent(
+        request, redis, db, "payments:stripe", 1,
+        lambda: {"message": "Stripe payment - to be implemented"}
+    )
 
 
 @router.post("/paypal")
-async def process_paypal_payment():
+async def process_paypal_payment(
+    request: Request,
+    db: Session = Depends(get_db),
+    redis: Redis = Depends(get_redis)
+):
     """Process PayPal payment."""
-    return {"message": "PayPal payment - to be implemented"}
+    return await run_idempotent(
+        request, redis, db, "payments:paypal", 1,
+        lambda: {"message": "PayPal payment - to be implemented"}
+    )
 
 
 @router.post("/crypto")
-async def process_crypto_payment():
+async def process_crypto_payment(
+    request: Request,
+    db: Session = Depends(get_db),
+    redis: Redis = Depends(get_redis)
+):
     """Process cryptocurrency payment."""
-    return {"message": "Crypto payment - to be implemented"} 
\ No newline at end of file
+    return await run_idempotent(
+        request, redis, db, "payments:crypto", 1,
+        lambda: {"message": "Crypto payment - to be implemented"}
+    )
@@ -2,96 +2,201 @@
 Product endpoints for product management.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Security
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Security
+from redis import Redis
 from sqlalchemy.orm import Session
 from typing import List, Optional
+import logging
 import random
 import string
 
-from app.database import get_db
+from app.config import settings
+from app.database import get_db, get_redis
 from app.models import Product, Category, User
 from app.schemas.product import ProductCreate, ProductResponse, ProductUpdate, SimpleProductResponse
 from app.core.security import get_current_user
-from app.ai.recommendation_engine import get_product_recommendations
+from app.core.cache import bump_catalog_version, cache_response, cached_count, get_cached_response
+from app.ai.recommendation_engine import recommendation_engine
+from app.search.fulltext import apply_search
+from app.search.product_index import product_search_index
+from app.search.facets import facet_engine
+from app.search.suggest import suggestion_index
+from app.utils.catalog import (
+    CatalogFilters,
+    apply_catalog_filters,
+    cache_catalog_response,
+    catalog_query,
+    fetch_catalog_rows,
+    get_cached_catalog_response,
+    serialize_catalog_row,
+    serialize_catalog_rows,
+)
+from app.utils.pagination import InvalidCursorError, apply_keyset, decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Columns that keyset pagination can sort on; each is paired with Product.id
+# as a tie-breaker so the cursor position is unique.
+SORT_COLUMNS = {
+    "id": Product.id,
+    "price": Product.price,
+    "created_at": Product.created_at,
+}
+
 @router.get("/")
 async def get_products(
+    request: Request,
     skip: int = Query(0, ge=0, description="Number of products to skip"),
     limit: int = Query(50, ge=1, le=100, description="Number of products to return"),
-    category: Optional[str] = Query(None, description="Filter by category"),
-    search: Optional[str] = Query(None, description="Search in product names and descriptions"),
-    min_price: Optional[float] = Query(None, ge=0, description="Minimum price filter"),
-    max_price: Optional[float] = Query(None, ge=0, description="Maximum price filter"),
-    db: Session = Depends(get_db)
+    filters: CatalogFilters = Depends(),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page; pass an empty value to start cursor pagination"),
+    sort_by: str = Query("id", pattern="^(id|price|created_at)$", description="Sort column for cursor pagination"),
+    sort_order: str = Query("asc", pattern="^(asc|desc)$", description="Sort direction for cursor pagination"),
+    approximate: bool = Query(False, description="Use a planner estimate for the total count"),
+    db: Session = Depends(get_db),
+    redis: Redis = Depends(get_redis)
 ):
     """
     Get products with pagination and filtering.
     Supports limitless product database with efficient querying.
+
+    When ``cursor`` is supplied the endpoint switches to keyset pagination and
+    returns ``{"items": [...], "next_cursor": ...}``; otherwise it keeps the
+    original ``skip``/``limit`` behaviour and returns a plain list. The total
+    number of matches is reported in the ``X-Total-Count`` header.
+    Anonymous requests are served from the response cache when possible.
     """
+    cached = get_cached_catalog_response(redis, request, db)
+    if cached is not None:
+        return cached
+    
+    position = None
+    if cursor is not None:
+        try:
+            position = decode_cursor(cursor, sort_by, sort_order)
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
     try:
-        query = db.query(Product)
+        query = apply_catalog_filters(catalog_query(db), filters)
         
-        # Apply filters
-        if search:
-            search_term = f"%{search}%"
-            query = query.filter(
-                (Product.name.ilike(search_term)) |
-                (Product.description.ilike(search_term))
-            )
-        
-        if min_price is not None:
-            query = query.filter(Product.price >= min_price)
-        
-        if max_price is not None:
-            query = query.filter(Product.price <= max_price)
+        if cursor is not None:
+            sort_column = SORT_COLUMNS[sort_by]
+            query = apply_keyset(query, sort_column, Product.id, sort_order, position)
+            
+            # Fetch one extra row to learn whether another page exists
+            products = query.limit(limit + 1).all()
+            has_more = len(products) > limit
+            products = products[:limit]
+            
+            next_cursor = None
+            if has_more:
+                last = products[-1]
+                next_cursor = encode_cursor(sort_by, sort_order, getattr(last, sort_column.key), last.id)
+            
+            return cache_catalog_response(redis, request, {
+                "items": serialize_catalog_rows(products),
+                "next_cursor": next_cursor
+            })
         
         # Get total count for pagination info
-        total_count = query.count()
+        total_count = cached_count(
+            query,
+            redis,
+            "products",
+            filters.as_dict(),
+            approximate=approximate
+        )
         
         # Apply pagination
         products = query.offset(skip).limit(limit).all()
         
-        # Convert to simple response format
-        result = []
-        for product in products:
-            result.append({
-                "id": product.id,
-                "name": product.name,
-                "description": product.description,
-                "price": product.price,
-                "category": "Electronics",  # Default category
-                "stock": product.stock_quantity,
-                "image_url": product.image_url,
-                "created_at": product.created_at
-            })
-        
-        return result
+        return cache_catalog_response(
+            redis,
+            request,
+            serialize_catalog_rows(products),
+            headers={"X-Total-Count": str(total_count)}
+        )
         
-    except Exception as e:
-        print(f"Error in get_products: {e}")
-        # Return empty list on error
-        return []
+    except Exception:
+        # An empty list would read as "no products" (and break the cursor envelope)
+        logger.exception("Error in get_products")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@router.get("/suggest")
+async def suggest_products(
+    q: str = Query(..., min_length=1, description="Text typed so far"),
+    limit: int = Query(8, ge=1, le=20, description="Number of suggestions to return"),
+    redis: Redis = Depends(get_redis)
+):
+    """Get typeahead suggestions for product names, categories and brands."""
+    return suggestion_index.suggest(redis, q, limit)
+
+@router.get("/facets")
+async def get_product_facets(
+    request: Request,
+    filters: CatalogFilters = Depends(),
+    db: Session = Depends(get_db),
+    redis: Redis = Depends(get_redis)
+):
+    """
+    Get facet counts (category, price bucket, brand) for a product listing.
+
+    Accepts the same filters as the product listing. Each facet's counts
+    ignore that facet's own filter, so sibling values stay selectable.
+
+    Like the listing, ``search`` always matches through the database
+    full-text index, even with ``SEARCH_BACKEND = "memory"``. The in-process
+    index behind ``/search/`` doesn't match category names, so counts can
+    include products that ``/search/`` doesn't return.
+    """
+    cached = get_cached_response(redis, request, version_etag=True)
+    if cached is not None:
+        return cached
+
+    search_ids = None
+    if filters.search:
+        search_ids = [row.id for row in apply_search(db.query(Product.id), filters.search)]
+
+    counts = facet_engine.counts(
+        redis,
+        category=filters.category,
+        min_price=filters.min_price,
+        max_price=filters.max_price,
+        search_ids=search_ids
+    )
+    return cache_response(redis, request, counts)
 
 @router.get("/{product_id}")
-async def get_product(product_id: int, db: Session = Depends(get_db)):
-    """Get a specific product by ID."""
+async def get_product(
+    product_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    redis: Redis = Depends(get_redis)
+):
+    """
+    Get a specific product by ID.
+
+    Responses carry a strong ETag derived from the body, with the stock read
+    live, so clients polling with If-None-Match get a 304 instead of the
+    body until the product or its stock changes. ``updated_at`` isn't
+    enough: it only has second resolution on some backends, and held stock
+    doesn't move it.
+    """
+    cached = get_cached_catalog_response(redis, request, db)
+    if cached is not None:
+        return cached
+    
     try:
-        product = db.query(Product).filter(Product.id == product_id).first()
+        product = catalog_query(db).filter(Product.id == product_id).first()
         if not product:
             raise HTTPException(status_code=404, detail="Product not found")
         
-        return {
-            "id": product.id,
-            "name": product.name,
-            "description": product.description,
-            "price": product.price,
-            "category": "Electronics",  # Default category
-            "stock": product.stock_quantity,
-            "image_url": product.image_url,
-            "created_at": product.created_at
-        }
+        return cache_catalog_response(redis, request, serialize_catalog_row(product), etag=True)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in get_product: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -100,6 +205,7 @@ async def get_product(product_id: int, db: Session = Depends(get_db)):
 async def create_product(
     product: ProductCreate,
     db: Session = Depends(get_db),
+    redis: Redis = Depends(get_redis),
     current_user: User = Depends(get_current_user)
 ):
     """Create a new product (Admin only)."""
@@ -110,6 +216,7 @@ async def create_product(
     db.add(db_product)
     db.commit()
     db.refresh(db_product)
+    bump_catalog_version(redis)
     return db_product
 
 @router.put("/{product_id}", response_model=ProductResponse)
@@ -117,6 +224,7 @@ async def update_product(
     product_id: int,
     product_update: ProductUpdate,
     db: Session = Depends(get_db),
+    redis: Redis = Depends(get_redis),
     current_user: User = Depends(get_current_user)
 ):
     """Update a product (Admin only)."""
@@ -132,12 +240,14 @@ async def update_product(
     
     db.commit()
     db.refresh(db_product)
+    bump_catalog_version(redis)
     return db_product
 
 @router.delete("/{product_id}")
 async def delete_product(
     product_id: int,
     db: Session = Depends(get_db),
+    redis: Redis = Depends(get_redis),
     current_user: User = Depends(get_current_user)
 ):
     """Delete a product (Admin only)."""
@@ -150,18 +260,28 @@ async def delete_product(
     
     db.delete(db_product)
     db.commit()
+    bump_catalog_version(redis)
     return {"message": "Product deleted successfully"}
 
 @router.get("/categories/", response_model=List[str])
-async def get_categories(db: Session = Depends(get_db)):
+async def get_categories(
+    request: Request,
+    db: Session = Depends(get_db),
+    redis: Redis = Depends(get_redis)
+):
     """Get all available product categories."""
+    cached = get_cached_response(redis, request, version_etag=True)
+    if cached is not None:
+        return cached
+    
     categories = db.query(Category.name).distinct().all()
-    return [category[0] for category in categories]
+    return cache_response(redis, request, [category[0] for category in categories])
 
 @router.post("/generate-demo/")
 async def generate_demo_products(
     count: int = Query(100, ge=1, le=1000, description="Number of demo products to generate"),
     db: Session = Depends(get_db),
+    redis: Redis = Depends(get_redis),
     current_user: User = Depends(get_current_user)
 ):
     """Generate demo products for testing (Admin only)."""
@@ -207,6 +327,7 @@ async def generate_demo_products(
         generated_products.append(product)
     
     db.commit()
+    bump_catalog_version(redis)
     
     return {
         "message": f"Generated {count} demo products successfully",
@@ -220,48 +341,18 @@ async def get_recommendations(
 ):
     """Get AI-powered product recommendations."""
     try:
-        # Use AI recommendation engine
-        recommendations = await get_product_recommendations(
-            user_id=None,
-            limit=limit,
-            db=db
-        )
-        
-        # Convert to simple response format
-        result = []
-        for product in recommendations:
-            result.append({
-                "id": product.id,
-                "name": product.name,
-                "description": product.description,
-                "price": product.price,
-                "category": "Electronics",  # Default category
-                "stock": product.stock_quantity,
-                "image_url": product.image_url,
-                "created_at": product.created_at
-            })
-        
-        return result
+        # Popular products, precomputed by scripts/precompute_recommendations.py
+        recommendations = recommendation_engine.get_stored_recommendations(None, limit, db)
+        if recommendations:
+            return serialize_catalog_rows(recommendations)
     except Exception as e:
         print(f"Error in get_recommendations: {e}")
-        # Fallback to random recommendations
-        products = db.query(Product).limit(limit).all()
-        random.shuffle(products)
-        
-        result = []
-        for product in products[:limit]:
-            result.append({
-                "id": product.id,
-                "name": product.name,
-                "description": product.description,
-                "price": product.price,
-                "category": "Electronics",  # Default category
-                "stock": product.stock_quantity,
-                "image_url": product.image_url,
-                "created_at": product.created_at
-            })
-        
-        return result
+    
+    # Fallback to random recommendations
+    products = catalog_query(db).limit(limit).all()
+    random.shuffle(products)
+    
+    return serialize_catalog_rows(products[:limit])
 
 @router.get("/trending/")
 async def get_trending_products(
@@ -271,50 +362,28 @@ async def get_trending_products(
     """Get trending products based on views and sales."""
     # In a real implementation, this would analyze user behavior data
     # For now, return random products as trending
-    products = db.query(Product).limit(limit * 2).all()
+    products = catalog_query(db).limit(limit * 2).all()
     random.shuffle(products)
     
-    result = []
-    for product in products[:limit]:
-        result.append({
-            "id": product.id,
-            "name": product.name,
-            "description": product.description,
-            "price": product.price,
-            "category": "Electronics",  # Default category
-            "stock": product.stock_quantity,
-            "image_url": product.image_url,
-            "created_at": product.created_at
-        })
-    
-    return result
+    return serialize_catalog_rows(products[:limit])
 
 @router.get("/search/")
 async def search_products(
+    request: Request,
     q: str = Query(..., description="Search query"),
     limit: int = Query(20, ge=1, le=100, description="Number of results to return"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    redis: Redis = Depends(get_redis)
 ):
-    """Search products by name, description, or category."""
-    search_term = f"%{q}%"
-    
-    products = db.query(Product).filter(
-        (Product.name.ilike(search_term)) |
-        (Product.description.ilike(search_term)) |
-        (Product.category.ilike(search_term))
-    ).limit(limit).all()
+    """Search products by name, description, tags or category, most relevant first."""
+    cached = get_cached_catalog_response(redis, request, db)
+    if cached is not None:
+        return cached
     
-    result = []
-    for product in products:
-        result.append({
-            "id": product.id,
-            "name": product.name,
-            "description": product.description,
-            "price": product.price,
-            "category": "Electronics",  # Default category
-            "stock": product.stock_quantity,
-            "image_url": product.image_url,
-            "created_at": product.created_at
-        })
+    if settings.SEARCH_BACKEND == "memory":
+        product_ids = product_search_index.search(db, redis, q, limit)
+        products = fetch_catalog_rows(db, product_ids)
+    else:
+        products = apply_search(catalog_query(db), q, rank=True).limit(limit).all()
     
-    return result 
\ No newline at end of file
+    return cache_catalog_response(redis, request, serialize_catalog_rows(products)) 
\ No newline at end of file
@@ -10,10 +10,18 @@ from app.database import get_db
 from app.core.security import get_current_active_user
 from app.models.user import User
 from app.ai.recommendation_engine import recommendation_engine
+from app.utils.catalog import serialize_catalog_row
 
 router = APIRouter()
 
 
+def _serialize_recommendations(rows) -> List[dict]:
+    return [
+        {**serialize_catalog_row(row), "score": row.score, "reason": row.reason}
+        for row in rows
+    ]
+
+
 @router.get("/user/{user_id}")
 async def get_user_recommendations(
     user_id: int,
@@ -22,22 +30,27 @@ async def get_user_recommendations(
 ):
     """Get personalized recommendations for a user."""
     try:
-        # Check if user exists
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found"
-            )
+        # Precomputed by scripts/precompute_recommendations.py
+        recommendations = recommendation_engine.get_stored_recommendations(user_id, limit, db)
         
-        # Get hybrid recommendations
-        recommendations = recommendation_engine.get_hybrid_recommendations(user_id, limit)
+        if not recommendations:
+            # Check if user exists
+            user = db.query(User).filter(User.id == user_id).first()
+            if not user:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="User not found"
+                )
+            # Nothing stored for this user yet: popular products
+            recommendations = recommendation_engine.get_stored_recommendations(None, limit, db)
         
         return {
             "user_id": user_id,
-            "recommendations": recommendations,
+            "recommendations": _serialize_recommendations(recommendations),
             "total": len(recommendations)
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -54,10 +67,10 @@ async def get_similar_products(
     """Get similar products based on content-based filtering."""
     try:
         # Get item-based recommendations
-        item_based = recommendation_engine.get_item_based_recommendations(product_id, limit)
+        item_based = recommendation_engine.get_item_based_recommendations(product_id, limit, db)
         
         # Get content-based recommendations
-        content_based = recommendation_engine.get_content_based_recommendations(product_id, limit)
+        content_based = recommendation_engine.get_content_based_recommendations(product_id, limit, db)
         
         return {
             "product_id": product_id,
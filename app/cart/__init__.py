@@ -0,0 +1,3 @@
+"""
+Shopping cart storage backends.
+"""
@@ -0,0 +1,115 @@
+"""
+Write-behind persistence of Redis carts.
+
+The flusher pops batches of dirty cart owners from ``cart:dirty`` and
+replaces their rows in ``cart_items`` with the Redis contents in a single
+transaction per batch. A cart changed while it is being flushed is marked
+dirty again by that change, so it is picked up by the next flush.
+"""
+
+import logging
+import threading
+from typing import Optional
+
+from redis import Redis
+from redis.exceptions import RedisError
+from sqlalchemy import insert
+
+from app.cart.redis_store import CART_DIRTY_KEY, items_key, meta_key
+from app.config import settings
+from app.database import SessionLocal, redis_client
+from app.models import Cart, CartItem
+from app.utils.cart import recompute_cart_totals
+
+logger = logging.getLogger(__name__)
+
+
+class CartFlusher:
+    """Background thread persisting dirty Redis carts to the cart tables."""
+
+    def __init__(self, redis: Redis, interval: float, batch_size: int):
+        self.redis = redis
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def flush_once(self) -> int:
+        """Persist one batch of dirty carts, returning how many were popped."""
+        user_ids = self.redis.spop(CART_DIRTY_KEY, self.batch_size)
+        if not user_ids:
+            return 0
+
+        pipe = self.redis.pipeline(transaction=False)
+        for user_id in user_ids:
+            pipe.hget(meta_key(user_id), "cart_id")
+            pipe.hgetall(items_key(user_id))
+        results = pipe.execute()
+
+        carts = {}
+        for cart_id, items in zip(results[::2], results[1::2]):
+            # Without its meta hash the cart expired from Redis and SQL is current
+            if cart_id is not None:
+                carts[int(cart_id)] = items
+
+        if carts:
+            rows = [
+                {"cart_id": cart_id, "product_id": int(product_id), "quantity": int(quantity)}
+                for cart_id, items in carts.items()
+                for product_id, quantity in items.items()
+            ]
+            db = SessionLocal()
+            try:
+                db.query(CartItem).filter(CartItem.cart_id.in_(carts)).delete(synchronize_session=False)
+                if rows:
+                    db.execute(insert(CartItem), rows)
+                db.execute(recompute_cart_totals(Cart.__table__.c.id.in_(carts)))
+                db.commit()
+            except Exception:
+                db.rollback()
+                # Put the carts back so the next flush retries them
+                self.redis.sadd(CART_DIRTY_KEY, *user_ids)
+                raise
+            finally:
+                db.close()
+
+        return len(user_ids)
+
+    def flush_all(self) -> None:
+        """Persist dirty carts until none are left."""
+        while self.flush_once() >= self.batch_size:
+            pass
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.flush_all()
+            except RedisError as e:
+                logger.warning(f"Cart flush skipped, Redis unavailable: {e}")
+            except Exception as e:
+                logger.error(f"Cart flush failed: {e}")
+
+    def start(self) -> None:
+        """Start flushing in a background thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="cart-flusher", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread and persist what is still dirty."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        try:
+            self.flush_all()
+        except RedisError as e:
+            logger.warning(f"Final cart flush skipped, Redis unavailable: {e}")
+
+
+# Global cart flusher instance
+cart_flusher = CartFlusher(
+    redis_client,
+    settings.CART_FLUSH_INTERVAL,
+    settings.CART_FLUSH_BATCH_SIZE
+)
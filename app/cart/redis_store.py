@@ -0,0 +1,265 @@
+"""
+Redis cart store.
+
+Each cart is a Redis hash of product id to quantity, so adding, updating and
+removing an item are single O(1) hash commands. Every mutation also marks
+the user's cart dirty; ``CartFlusher`` persists dirty carts to the SQL cart
+tables in batches. A cart is loaded from SQL into Redis the first time it is
+touched (or after its keys expired).
+
+Cart items are keyed by product, so the item id of a Redis cart line is its
+product id.
+
+Checking out can't remove the lines in the order's SQL transaction, so it
+records a ``CART_CHECKED_OUT`` outbox event there instead and removes them
+right after the commit; the event removes them again if that failed. The
+removal only drops lines whose quantity is unchanged, so it can be repeated.
+"""
+
+import logging
+from collections import namedtuple
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from redis import Redis
+from redis.exceptions import RedisError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.cache import get_catalog_version
+from app.models import Cart, Product
+from app.outbox.events import CART_CHECKED_OUT, enqueue
+from app.utils.cart import load_cart
+
+logger = logging.getLogger(__name__)
+
+CART_DIRTY_KEY = "cart:dirty"
+
+# Same fields as the SQL cart lines from load_cart
+CartLine = namedtuple(
+    "CartLine",
+    ["id", "product_id", "quantity", "product_name", "product_sku", "product_price", "product_stock"]
+)
+
+CartEntry = namedtuple("CartEntry", ["id", "product_id", "quantity", "created_at", "updated_at"])
+
+
+def items_key(user_id) -> str:
+    """Redis hash of product id to quantity for a user's cart."""
+    return f"cart:{user_id}:items"
+
+
+def meta_key(user_id) -> str:
+    """Redis hash holding the SQL cart id of a user's cart."""
+    return f"cart:{user_id}:meta"
+
+
+class RedisCartStore:
+    """Cart store backed by Redis hashes with write-behind persistence."""
+
+    def __init__(self, redis: Redis, db: Session):
+        self.redis = redis
+        self.db = db
+
+    def _load(self, user_id: int) -> int:
+        """Make sure the user's cart is in Redis and get its SQL cart id."""
+        cart_id = self.redis.hget(meta_key(user_id), "cart_id")
+        if cart_id is not None:
+            return int(cart_id)
+
+        cart_id, lines = load_cart(self.db, user_id)
+        if cart_id is None:
+            cart = Cart(user_id=user_id, created_at=datetime.utcnow())
+            self.db.add(cart)
+            self.db.commit()
+            cart_id = cart.id
+
+        def hydrate(pipe):
+            # Another request may have loaded the cart (and changed it) meanwhile
+            if pipe.exists(meta_key(user_id)):
+                return
+            pipe.multi()
+            pipe.delete(items_key(user_id))
+            if lines:
+                pipe.hset(items_key(user_id), mapping={line.product_id: line.quantity for line in lines})
+            pipe.hset(meta_key(user_id), "cart_id", cart_id)
+            pipe.expire(items_key(user_id), settings.CART_REDIS_TTL)
+            pipe.expire(meta_key(user_id), settings.CART_REDIS_TTL)
+
+        self.redis.transaction(hydrate, meta_key(user_id))
+        return int(self.redis.hget(meta_key(user_id), "cart_id"))
+
+    def _write(self, user_id: int, command: str, *args) -> None:
+        """Run a hash command on the cart and mark the cart dirty, atomically."""
+        pipe = self.redis.pipeline(transaction=True)
+        getattr(pipe, command)(items_key(user_id), *args)
+        pipe.hdel(meta_key(user_id), "subtotal")
+        pipe.sadd(CART_DIRTY_KEY, user_id)
+        pipe.expire(items_key(user_id), settings.CART_REDIS_TTL)
+        pipe.expire(meta_key(user_id), settings.CART_REDIS_TTL)
+        pipe.execute()
+
+    def _quantities(self, user_id: int) -> Dict[int, int]:
+        return {
+            int(product_id): int(quantity)
+            for product_id, quantity in self.redis.hgetall(items_key(user_id)).items()
+        }
+
+    def get_cart(self, user_id: int) -> Tuple[int, List[CartLine]]:
+        """Get the cart id and lines of a user's cart."""
+        cart_id = self._load(user_id)
+        quantities = self._quantities(user_id)
+        if not quantities:
+            return cart_id, []
+
+        products = {
+            row.id: row for row in self.db.query(
+                Product.id, Product.name, Product.sku, Product.price, Product.stock_quantity
+            ).filter(Product.id.in_(quantities))
+        }
+        lines = []
+        for product_id in sorted(quantities):
+            product = products.get(product_id)
+            lines.append(CartLine(
+                product_id,
+                product_id,
+                quantities[product_id],
+                product.name if product else None,
+                product.sku if product else None,
+                product.price if product else None,
+                product.stock_quantity if product else None
+            ))
+        return cart_id, lines
+
+    def find_item(self, user_id: int, product_id: int) -> Optional[CartEntry]:
+        """Get the item holding a product in the user's cart."""
+        self._load(user_id)
+        quantity = self.redis.hget(items_key(user_id), product_id)
+        if quantity is None:
+            return None
+        return CartEntry(product_id, product_id, int(quantity), None, None)
+
+    def get_item(self, user_id: int, item_id: int) -> Optional[CartEntry]:
+        """Get an item of the user's cart by item id (its product id)."""
+        return self.find_item(user_id, item_id)
+
+    def add_item(self, user_id: int, product_id: int, quantity: int) -> CartEntry:
+        """Add a product that isn't in the cart yet."""
+        self._load(user_id)
+        self._write(user_id, "hset", product_id, quantity)
+        return CartEntry(product_id, product_id, quantity, datetime.utcnow(), None)
+
+    def set_quantity(self, user_id: int, item: CartEntry, quantity: int) -> CartEntry:
+        """Change the quantity of a cart item."""
+        self._write(user_id, "hset", item.product_id, quantity)
+        return item._replace(quantity=quantity, updated_at=datetime.utcnow())
+
+    def remove_item(self, user_id: int, item: CartEntry) -> None:
+        """Remove an item from the cart."""
+        self._write(user_id, "hdel", item.product_id)
+
+    def get_quantities(self, user_id: int) -> Dict[int, int]:
+        """Get the quantity of each product in the user's cart."""
+        self._load(user_id)
+        return self._quantities(user_id)
+
+    def apply_quantities(self, user_id: int, changes: Dict[int, int]) -> None:
+        """Set the quantities of several products atomically; 0 removes a product."""
+        kept = {product_id: quantity for product_id, quantity in changes.items() if quantity > 0}
+        removed = [product_id for product_id, quantity in changes.items() if quantity == 0]
+
+        self._load(user_id)
+        pipe = self.redis.pipeline(transaction=True)
+        if kept:
+            pipe.hset(items_key(user_id), mapping=kept)
+        if removed:
+            pipe.hdel(items_key(user_id), *removed)
+        pipe.hdel(meta_key(user_id), "subtotal")
+        pipe.sadd(CART_DIRTY_KEY, user_id)
+        pipe.expire(items_key(user_id), settings.CART_REDIS_TTL)
+        pipe.expire(meta_key(user_id), settings.CART_REDIS_TTL)
+        pipe.execute()
+
+    def clear(self, user_id: int) -> None:
+        """Remove every item from the user's cart."""
+        self._load(user_id)
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.delete(items_key(user_id))
+        pipe.hdel(meta_key(user_id), "subtotal")
+        pipe.sadd(CART_DIRTY_KEY, user_id)
+        pipe.execute()
+
+    def remove_lines(self, user_id: int, quantities: Dict[int, int]) -> None:
+        """Remove products from the cart if their quantity is still the given one."""
+        self._load(user_id)
+        product_ids = list(quantities)
+
+        def remove(pipe):
+            current = pipe.hmget(items_key(user_id), product_ids)
+            unchanged = [
+                product_id for product_id, quantity in zip(product_ids, current)
+                if quantity is not None and int(quantity) == quantities[product_id]
+            ]
+            pipe.multi()
+            if unchanged:
+                pipe.hdel(items_key(user_id), *unchanged)
+                pipe.hdel(meta_key(user_id), "subtotal")
+                pipe.sadd(CART_DIRTY_KEY, user_id)
+
+        if product_ids:
+            self.redis.transaction(remove, items_key(user_id))
+
+    def clear_checked_out(self, user_id: int, quantities: Dict[int, int]) -> None:
+        """Record the removal of checked-out lines in the order's transaction."""
+        enqueue(self.db, [(CART_CHECKED_OUT, {"user_id": user_id, "quantities": quantities})])
+
+    def after_checkout(self, user_id: int, quantities: Dict[int, int]) -> None:
+        """Remove the checked-out lines now; the outbox event retries on failure."""
+        try:
+            self.remove_lines(user_id, quantities)
+        except RedisError as e:
+            logger.warning(f"Could not empty cart of user {user_id} after checkout: {e}")
+
+    def _price(self, quantities: Dict[int, int]) -> float:
+        """Price product quantities at current product prices."""
+        if not quantities:
+            return 0.0
+        prices = self.db.query(Product.id, Product.price).filter(Product.id.in_(quantities))
+        return sum(price * quantities[product_id] for product_id, price in prices)
+
+    def summary(self, user_id: int) -> Dict[str, Any]:
+        """
+        Get the subtotal and item count of the user's cart.
+
+        The item count is the hash length. The subtotal is cached in the meta
+        hash, stamped with the catalog version it was priced at; mutations
+        drop it and a price change moves the catalog version, so it is
+        repriced on the next read.
+        """
+        cart_id = self._load(user_id)
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hmget(meta_key(user_id), "subtotal", "priced_version")
+        pipe.hlen(items_key(user_id))
+        (subtotal, priced_version), item_count = pipe.execute()
+
+        version = str(get_catalog_version(self.redis))
+        if subtotal is None or priced_version != version:
+            def reprice(pipe):
+                quantities = {
+                    int(product_id): int(quantity)
+                    for product_id, quantity in pipe.hgetall(items_key(user_id)).items()
+                }
+                total = self._price(quantities)
+                pipe.multi()
+                pipe.hset(meta_key(user_id), mapping={"subtotal": total, "priced_version": version})
+                return total
+
+            # Retried if the cart changes while it is being priced
+            subtotal = self.redis.transaction(reprice, items_key(user_id), value_from_callable=True)
+
+        return {"cart_id": cart_id, "subtotal": float(subtotal), "item_count": item_count}
+
+    def count(self, user_id: int) -> int:
+        """Count the items in the user's cart."""
+        self._load(user_id)
+        return self.redis.hlen(items_key(user_id))
@@ -0,0 +1,174 @@
+"""
+Cart store selection and the SQL cart store.
+
+Endpoints talk to a cart store instead of the ORM so the storage backend can
+be chosen with ``CART_BACKEND``: ``"sql"`` keeps carts in the ``carts`` /
+``cart_items`` tables, ``"redis"`` keeps them in Redis hashes and persists
+them to those tables write-behind (see ``app.cart.redis_store``).
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import Depends
+from redis import Redis
+from sqlalchemy.orm import Session
+
+from app.cart.redis_store import RedisCartStore
+from app.config import settings
+from app.database import get_db, get_redis
+from app.models import Cart, CartItem
+from app.utils.cart import adjust_cart_totals, load_cart, recompute_cart_totals
+
+
+class SqlCartStore:
+    """Cart store that reads and writes the cart tables directly."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _get_or_create_cart(self, user_id: int) -> Cart:
+        cart = self.db.query(Cart).filter(Cart.user_id == user_id).first()
+        if not cart:
+            cart = Cart(user_id=user_id, created_at=datetime.utcnow())
+            self.db.add(cart)
+            self.db.commit()
+            self.db.refresh(cart)
+        return cart
+
+    def get_cart(self, user_id: int) -> Tuple[int, List[Any]]:
+        """Get the cart id and lines of a user's cart, creating the cart if needed."""
+        cart_id, lines = load_cart(self.db, user_id)
+        if cart_id is None:
+            cart_id = self._get_or_create_cart(user_id).id
+        return cart_id, lines
+
+    def get_item(self, user_id: int, item_id: int) -> Optional[CartItem]:
+        """Get an item of the user's cart by item id."""
+        return self.db.query(CartItem).join(Cart).filter(
+            CartItem.id == item_id,
+            Cart.user_id == user_id
+        ).first()
+
+    def find_item(self, user_id: int, product_id: int) -> Optional[CartItem]:
+        """Get the item holding a product in the user's cart."""
+        return self.db.query(CartItem).join(Cart).filter(
+            Cart.user_id == user_id,
+            CartItem.product_id == product_id
+        ).first()
+
+    def add_item(self, user_id: int, product_id: int, quantity: int) -> CartItem:
+        """Add a product that isn't in the cart yet."""
+        cart = self._get_or_create_cart(user_id)
+        cart_item = CartItem(
+            cart_id=cart.id,
+            product_id=product_id,
+            quantity=quantity,
+            created_at=datetime.utcnow()
+        )
+        self.db.add(cart_item)
+        self.db.execute(adjust_cart_totals(cart.id, product_id, quantity, 1))
+        self.db.commit()
+        self.db.refresh(cart_item)
+        return cart_item
+
+    def set_quantity(self, user_id: int, item: CartItem, quantity: int) -> CartItem:
+        """Change the quantity of a cart item."""
+        self.db.execute(adjust_cart_totals(item.cart_id, item.product_id, quantity - item.quantity, 0))
+        item.quantity = quantity
+        item.updated_at = datetime.utcnow()
+        self.db.commit()
+        self.db.refresh(item)
+        return item
+
+    def remove_item(self, user_id: int, item: CartItem) -> None:
+        """Remove an item from the cart."""
+        self.db.execute(adjust_cart_totals(item.cart_id, item.product_id, -item.quantity, -1))
+        self.db.delete(item)
+        self.db.commit()
+
+    def get_quantities(self, user_id: int) -> Dict[int, int]:
+        """Get the quantity of each product in the user's cart."""
+        return dict(
+            self.db.query(CartItem.product_id, CartItem.quantity)
+            .join(Cart)
+            .filter(Cart.user_id == user_id)
+            .all()
+        )
+
+    def apply_quantities(self, user_id: int, changes: Dict[int, int]) -> None:
+        """Set the quantities of several products in one transaction; 0 removes a product."""
+        cart = self.db.query(Cart).filter(Cart.user_id == user_id).first()
+        if not cart:
+            cart = Cart(user_id=user_id, created_at=datetime.utcnow())
+            self.db.add(cart)
+            self.db.flush()
+
+        items = {
+            item.product_id: item for item in self.db.query(CartItem).filter(
+                CartItem.cart_id == cart.id,
+                CartItem.product_id.in_(changes)
+            )
+        }
+        now = datetime.utcnow()
+        for product_id, quantity in changes.items():
+            item = items.get(product_id)
+            if quantity == 0:
+                if item:
+                    self.db.delete(item)
+            elif item:
+                item.quantity = quantity
+                item.updated_at = now
+            else:
+                self.db.add(CartItem(cart_id=cart.id, product_id=product_id, quantity=quantity, created_at=now))
+        self.db.flush()
+        self.db.execute(recompute_cart_totals(Cart.__table__.c.id == cart.id))
+        self.db.commit()
+
+    def clear(self, user_id: int) -> None:
+        """Remove every item from the user's cart."""
+        cart = self.db.query(Cart).filter(Cart.user_id == user_id).first()
+        if cart:
+            self.db.query(CartItem).filter(CartItem.cart_id == cart.id).delete()
+            cart.subtotal = 0.0
+            cart.item_count = 0
+            self.db.commit()
+
+    def clear_checked_out(self, user_id: int, quantities: Dict[int, int]) -> None:
+        """Remove checked-out lines in the order's transaction; the caller commits."""
+        cart = self.db.query(Cart).filter(Cart.user_id == user_id).first()
+        if cart:
+            self.db.query(CartItem).filter(
+                CartItem.cart_id == cart.id,
+                CartItem.product_id.in_(quantities)
+            ).delete(synchronize_session=False)
+            self.db.execute(recompute_cart_totals(Cart.__table__.c.id == cart.id))
+
+    def after_checkout(self, user_id: int, quantities: Dict[int, int]) -> None:
+        """Nothing left to do: the lines were removed with the order."""
+
+    def summary(self, user_id: int) -> Dict[str, Any]:
+        """Get the materialized subtotal and item count of the user's cart."""
+        cart = (
+            self.db.query(Cart.id, Cart.subtotal, Cart.item_count)
+            .filter(Cart.user_id == user_id)
+            .order_by(Cart.id)
+            .first()
+        )
+        if not cart:
+            return {"cart_id": None, "subtotal": 0.0, "item_count": 0}
+        return {"cart_id": cart.id, "subtotal": cart.subtotal, "item_count": cart.item_count}
+
+    def count(self, user_id: int) -> int:
+        """Count the items in the user's cart."""
+        return self.summary(user_id)["item_count"]
+
+
+def get_cart_store(
+    db: Session = Depends(get_db),
+    redis: Redis = Depends(get_redis)
+):
+    """Dependency to get the configured cart store."""
+    if settings.CART_BACKEND == "redis":
+        return RedisCartStore(redis, db)
+    return SqlCartStore(db)
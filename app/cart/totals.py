@@ -0,0 +1,38 @@
+"""
+Keeps materialized cart totals current when product prices change.
+
+Cart mutations adjust ``Cart.subtotal`` themselves; this session hook covers
+the other side, repricing every cart holding a product whose price changed
+(or that was deleted) in the same transaction as the product write.
+"""
+
+from itertools import chain
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from app.models import Cart, CartItem, Product
+from app.utils.cart import recompute_cart_totals
+
+
+def _reprice_carts(session: Session, flush_context) -> None:
+    """Recompute totals of carts holding products repriced by this flush."""
+    repriced = {
+        obj.id for obj in chain(session.dirty, session.deleted)
+        if isinstance(obj, Product) and obj.id is not None and (
+            obj in session.deleted or inspect(obj).attrs.price.history.has_changes()
+        )
+    }
+    if not repriced:
+        return
+
+    holding = select(CartItem.__table__.c.cart_id).where(CartItem.__table__.c.product_id.in_(repriced))
+    # Run on the flush's connection; a Session.execute here would re-enter the flush
+    session.connection().execute(recompute_cart_totals(Cart.__table__.c.id.in_(holding)))
+
+
+def register_cart_totals(session_factory) -> None:
+    """Reprice carts on product price changes in sessions from ``session_factory``."""
+    if event.contains(session_factory, "after_flush", _reprice_carts):
+        return
+    event.listen(session_factory, "after_flush", _reprice_carts)
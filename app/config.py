@@ -41,11 +41,70 @@ class Settings(BaseSettings):
     SMTP_USER: Optional[str] = None
     SMTP_PASSWORD: Optional[str] = None
     EMAIL_FROM: str = "noreply@ecommerce.com"
+    SMTP_STARTTLS: bool = True
+    SMTP_TIMEOUT: float = 30.0  # seconds
+    SMTP_POOL_SIZE: int = 4  # open SMTP connections
+    SMTP_MAX_MESSAGES_PER_CONNECTION: int = 100  # messages before a connection is recycled
+    SMTP_BATCH_SIZE: int = 50  # queued messages sent per connection checkout
     
     # AI/ML Configuration
     RECOMMENDATION_MODEL_PATH: str = "models/recommendation_model.pkl"
     SIMILARITY_THRESHOLD: float = 0.7
     RECOMMENDATION_LIMIT: int = 10
+    ITEM_SIMILARITY_PATH: str = "models/item_similarity.bin"
+    ITEM_SIMILARITY_TOP_K: int = 50  # neighbours kept per product
+    ALS_MODEL_PATH: str = "models/als.bin"
+    ALS_FACTORS: int = 64
+    ALS_REGULARIZATION: float = 0.05
+    ALS_ALPHA: float = 10.0  # confidence scale for behavior weights
+    ALS_ITERATIONS: int = 15
+    ALS_THREADS: int = 0  # 0 uses every CPU
+    ITEM_INDEX_PATH: str = "models/item_index.bin"
+    CONTENT_INDEX_PATH: str = "models/content_index.bin"
+    CONTENT_VECTORS_PATH: str = "models/content_vectors.bin"
+    CONTENT_VECTORIZER_PATH: str = "models/content_vectorizer.pkl"
+    CONTENT_EMBEDDING_DIM: int = 64
+    ANN_NPROBE: int = 16  # clusters scanned per similar-product lookup
+    STORED_RECOMMENDATION_LIMIT: int = 50  # precomputed recommendations kept per user
+    POPULAR_RECOMMENDATION_LIMIT: int = 100
+    RECOMMENDATION_ACTIVE_DAYS: int = 30  # users with behavior this recent get precomputed rows
+    PRECOMPUTE_CHUNK_SIZE: int = 1000  # users per worker task
+    PRECOMPUTE_WORKERS: int = 0  # 0 uses every CPU
+    
+    # Catalog Cache Configuration
+    COUNT_CACHE_TTL: int = 300  # seconds
+    RESPONSE_CACHE_TTL: int = 600  # seconds
+    
+    # Search Configuration
+    SEARCH_BACKEND: str = "fulltext"  # or "memory" for the in-process index
+    SEARCH_INDEX_PATH: str = "models/search_index.pkl"
+    SEARCH_INDEX_SYNC_INTERVAL: float = 1.0  # seconds between change feed polls
+    SUGGEST_REFRESH_INTERVAL: float = 5.0  # seconds between catalog version checks
+    SUGGEST_MAX_AGE: float = 900.0  # seconds before popularity is recomputed
+    FACET_REFRESH_INTERVAL: float = 5.0  # seconds between catalog version checks
+    
+    # Cart Configuration
+    CART_BACKEND: str = "sql"  # or "redis" for Redis carts persisted write-behind
+    CART_FLUSH_INTERVAL: float = 2.0  # seconds between write-behind flushes
+    CART_FLUSH_BATCH_SIZE: int = 500  # carts persisted per flush transaction
+    CART_REDIS_TTL: int = 2592000  # 30 days
+    
+    # Inventory Configuration
+    STOCK_HOLD_TTL: int = 900  # seconds a cart holds its stock
+    STOCK_SWEEP_INTERVAL: float = 30.0  # seconds between expired hold sweeps
+    STOCK_SWEEP_BATCH_SIZE: int = 500  # expired holds released per transaction
+    
+    # Idempotency Configuration
+    IDEMPOTENCY_TTL: int = 86400  # seconds a stored response is replayed
+    IDEMPOTENCY_LOCK_TTL: int = 60  # seconds before an unfinished request's key can be reclaimed
+    IDEMPOTENCY_WAIT: float = 10.0  # seconds a duplicate waits for the in-flight request
+    
+    # Outbox Configuration
+    OUTBOX_POLL_INTERVAL: float = 1.0  # seconds between polls when the outbox is empty
+    OUTBOX_BATCH_SIZE: int = 100  # events leased per batch
+    OUTBOX_LEASE: int = 300  # seconds a leased event is hidden from other workers
+    OUTBOX_MAX_ATTEMPTS: int = 8  # attempts before an event is parked
+    OUTBOX_RETRY_DELAY: float = 10.0  # seconds before the first retry, doubled per attempt
     
     # File Upload Configuration
     UPLOAD_DIR: str = "uploads"
@@ -0,0 +1,285 @@
+"""
+Redis-backed caching for catalog reads.
+
+Every cache key embeds the current catalog version, so bumping the version on
+product writes invalidates all cached catalog data at once without having to
+find and delete individual keys. Redis is treated as an optimisation only:
+when it is unreachable, callers fall back to querying the database.
+"""
+
+import hashlib
+import json
+import logging
+from datetime import date, datetime
+from typing import Any, Dict, Optional
+from urllib.parse import urlencode
+
+from fastapi import Request, Response
+from redis import Redis
+from redis.exceptions import RedisError
+from sqlalchemy.orm import Query
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+CATALOG_VERSION_KEY = "catalog:version"
+
+# Filters matched case-insensitively, so their cache key is case-folded
+FOLDED_FILTERS = {"search"}
+
+
+def get_catalog_version(redis: Redis) -> int:
+    """Get the current catalog version (0 if never bumped)."""
+    return int(redis.get(CATALOG_VERSION_KEY) or 0)
+
+
+def bump_catalog_version(redis: Redis) -> None:
+    """Invalidate all cached catalog data after a product write."""
+    try:
+        redis.incr(CATALOG_VERSION_KEY)
+    except RedisError as e:
+        logger.warning(f"Could not bump catalog version: {e}")
+
+
+def normalize_filters(**filters: Any) -> str:
+    """
+    Build a canonical string for a filter set.
+
+    Unset filters are dropped, search terms are case- and whitespace-folded
+    and prices are rendered as floats, so equivalent requests share a key.
+    Other strings, such as the category, are matched exactly by the
+    queries and are kept as sent.
+    """
+    normalized = {}
+    for name, value in filters.items():
+        if value is None or value == "":
+            continue
+        if name in FOLDED_FILTERS:
+            value = " ".join(value.lower().split())
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = float(value)
+        normalized[name] = value
+    return json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+
+
+def catalog_key(redis: Redis, namespace: str, fingerprint: str) -> str:
+    """Build a versioned cache key for catalog data."""
+    digest = hashlib.sha1(fingerprint.encode()).hexdigest()
+    return f"catalog:v{get_catalog_version(redis)}:{namespace}:{digest}"
+
+
+def estimate_count(query: Query) -> Optional[int]:
+    """
+    Estimate the row count of a query from the database planner.
+
+    Only PostgreSQL exposes a usable estimate; other backends return None so
+    the caller can fall back to an exact count.
+    """
+    bind = query.session.get_bind()
+    if bind.dialect.name != "postgresql":
+        return None
+
+    compiled = query.order_by(None).statement.compile(dialect=bind.dialect)
+    plan = query.session.connection().exec_driver_sql(
+        f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params
+    ).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def cached_count(
+    query: Query,
+    redis: Redis,
+    scope: str,
+    filters: Dict[str, Any],
+    approximate: bool = False
+) -> int:
+    """
+    Count the rows of a filtered product query, caching the result.
+
+    The cache key combines the listing ``scope`` (routes apply the same filter
+    names differently), the normalized filter set and the catalog version, so
+    counts expire on the TTL or as soon as the catalog changes. With
+    ``approximate`` the planner estimate is used where the backend has one.
+    """
+    mode = "approx" if approximate else "exact"
+    try:
+        key = catalog_key(redis, f"count:{scope}:{mode}", normalize_filters(**filters))
+        cached = redis.get(key)
+        if cached is not None:
+            return int(cached)
+    except RedisError as e:
+        logger.warning(f"Count cache unavailable: {e}")
+        key = None
+
+    count = estimate_count(query) if approximate else None
+    if count is None:
+        count = query.order_by(None).count()
+
+    if key is not None:
+        try:
+            redis.set(key, count, ex=settings.COUNT_CACHE_TTL)
+        except RedisError as e:
+            logger.warning(f"Could not cache count: {e}")
+    return count
+
+
+def _json_default(value: Any) -> Any:
+    """Encode values the json module can't handle the way FastAPI does."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def render_json(content: Any) -> bytes:
+    """Serialize response content to compact JSON bytes."""
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+        default=_json_default
+    ).encode("utf-8")
+
+
+def make_etag(*parts: Any) -> str:
+    """Build a strong ETag from the values that identify a representation."""
+    digest = hashlib.sha1(":".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest[:24]}"'
+
+
+def etag_matches(request: Request, etag: Optional[str]) -> bool:
+    """Check a request's If-None-Match header against an ETag."""
+    header = request.headers.get("if-none-match")
+    if not header or not etag:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so W/ prefixes are ignored
+    candidates = (candidate.strip() for candidate in header.split(","))
+    return etag in (candidate[2:] if candidate.startswith("W/") else candidate for candidate in candidates)
+
+
+def not_modified(etag: str) -> Response:
+    """Build a 304 response for a matching conditional GET."""
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+def response_cache_key(redis: Redis, request: Request) -> str:
+    """Build the versioned response cache key of a request's path and sorted query string."""
+    query_string = urlencode(sorted(request.query_params.multi_items()))
+    return catalog_key(redis, "response", f"{request.url.path}?{query_string}")
+
+
+def get_cached_entry(redis: Redis, request: Request) -> Optional[Dict[str, str]]:
+    """
+    Look up the cached entry of an anonymous catalog request.
+
+    Returns the stored ``body`` and ``h:``-prefixed headers, or None on a
+    miss. Like ``get_cached_response`` it remembers the key on
+    ``request.state`` for the response to be stored under.
+    """
+    if "authorization" in request.headers:
+        return None
+
+    try:
+        key = response_cache_key(redis, request)
+        entry = redis.hgetall(key)
+    except RedisError as e:
+        logger.warning(f"Response cache unavailable: {e}")
+        return None
+
+    request.state.response_cache_key = key
+    return entry or None
+
+
+def store_response(redis: Redis, key: str, body: bytes, headers: Dict[str, str]) -> None:
+    """Store a serialized response and its headers under a response cache key."""
+    entry = {"body": body}
+    entry.update({f"h:{name}": value for name, value in headers.items()})
+    try:
+        pipe = redis.pipeline()
+        pipe.hset(key, mapping=entry)
+        pipe.expire(key, settings.RESPONSE_CACHE_TTL)
+        pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Could not cache response: {e}")
+
+
+def get_cached_response(
+    redis: Redis,
+    request: Request,
+    version_etag: bool = False
+) -> Optional[Response]:
+    """
+    Look up a cached anonymous catalog response.
+
+    The key is built from the route path, the sorted query string and the
+    catalog version read *before* the handler queries the database; it is
+    remembered on ``request.state`` so ``cache_response`` stores the result
+    under the same version even if the catalog changes mid-request.
+
+    With ``version_etag`` the response ETag is derived from that key, so a
+    conditional GET can be answered with 304 from the catalog version alone.
+    Otherwise a 304 is served when the ETag stored with the cached entry
+    matches.
+    """
+    if "authorization" in request.headers:
+        return None
+
+    try:
+        key = response_cache_key(redis, request)
+        if version_etag:
+            request.state.response_etag = make_etag(key)
+            if etag_matches(request, request.state.response_etag):
+                return not_modified(request.state.response_etag)
+        entry = redis.hgetall(key)
+    except RedisError as e:
+        logger.warning(f"Response cache unavailable: {e}")
+        return None
+
+    request.state.response_cache_key = key
+    if not entry:
+        return None
+
+    if etag_matches(request, entry.get("h:ETag")):
+        return not_modified(entry["h:ETag"])
+
+    body = entry.pop("body")
+    headers = {name[2:]: value for name, value in entry.items() if name.startswith("h:")}
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def cache_response(
+    redis: Redis,
+    request: Request,
+    content: Any,
+    headers: Optional[Dict[str, str]] = None,
+    etag: Optional[str] = None
+) -> Response:
+    """
+    Serialize response content once, store it for anonymous reads and return it.
+
+    Only requests that went through ``get_cached_response`` and missed are
+    stored; everything else just gets the serialized response. When the
+    request's If-None-Match matches the ETag, a 304 is returned instead, and
+    the body is only serialized if it still has to be cached.
+    """
+    headers = dict(headers or {})
+    etag = etag or getattr(request.state, "response_etag", None)
+    if etag:
+        headers["ETag"] = etag
+
+    key = getattr(request.state, "response_cache_key", None)
+    if key is None and etag_matches(request, etag):
+        return not_modified(etag)
+
+    body = render_json(content)
+    if key is not None:
+        store_response(redis, key, body, headers)
+
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return Response(content=body, media_type="application/json", headers=headers)
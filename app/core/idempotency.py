@@ -0,0 +1,309 @@
+"""
+Idempotency keys for endpoints that must not run twice.
+
+Clients send an ``Idempotency-Key`` header with checkout and payment requests
+so they can retry them safely. The first request with a key claims it, runs
+the handler and stores the response; a retry with the same key gets the
+stored response replayed without running the handler again, and a duplicate
+that arrives while the first request is still running waits for its result
+instead of running alongside it.
+
+Keys live in Redis and fall back to the ``idempotency_keys`` table when Redis
+is unreachable. They are scoped per endpoint and user, and reusing a key for
+a different request is rejected. Client errors are stored like successes;
+server errors are not, so retrying after one runs the handler again.
+
+A claim lapses after ``IDEMPOTENCY_LOCK_TTL`` so a crashed request doesn't
+block its key for good; while the handler runs, the claim is extended from a
+background thread so a slow handler doesn't lose it to a retry.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from fastapi import HTTPException, Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from redis import Redis
+from redis.exceptions import RedisError
+from sqlalchemy import and_, or_, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.cache import render_json
+from app.models import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+# Seconds between checks while waiting for an in-flight duplicate
+POLL_INTERVAL = 0.05
+
+# Claims are extended this many times per lock TTL while the handler runs
+RENEWALS_PER_LOCK_TTL = 3
+
+
+class RedisKeyStore:
+    """Idempotency records as JSON strings in Redis."""
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+
+    def claim(self, key: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Claim a key, or get its record if it is taken."""
+        name = f"idempotency:{key}"
+        claim = json.dumps({"fingerprint": fingerprint})
+        while True:
+            if self.redis.set(name, claim, nx=True, ex=settings.IDEMPOTENCY_LOCK_TTL):
+                return None
+            record = self.redis.get(name)
+            # Otherwise the record expired in between, so try again
+            if record is not None:
+                return json.loads(record)
+
+    def complete(self, key: str, fingerprint: str, status_code: int, body: str) -> None:
+        """Store the response of a claimed key."""
+        self.redis.set(
+            f"idempotency:{key}",
+            json.dumps({"fingerprint": fingerprint, "status_code": status_code, "body": body}),
+            ex=settings.IDEMPOTENCY_TTL
+        )
+
+    def extend(self, key: str, fingerprint: str) -> None:
+        """Keep a claimed key locked for another lock TTL."""
+        name = f"idempotency:{key}"
+        # Only a claim is extended; a stored response keeps its own expiry
+        self.redis.set(name, json.dumps({"fingerprint": fingerprint}), xx=True, ex=settings.IDEMPOTENCY_LOCK_TTL)
+
+    def release(self, key: str) -> None:
+        """Give up a claimed key without storing a response."""
+        self.redis.delete(f"idempotency:{key}")
+
+
+class DatabaseKeyStore:
+    """Idempotency records in the ``idempotency_keys`` table."""
+
+    def __init__(self, db: Session):
+        # Claims are committed on their own, apart from the handler's transaction
+        self.bind = db.get_bind()
+
+    def claim(self, key: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Claim a key, or get its record if it is taken."""
+        now = datetime.utcnow()
+        claimed = {
+            "fingerprint": fingerprint,
+            "status_code": None,
+            "response_body": None,
+            "locked_until": now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_TTL),
+            "expires_at": now + timedelta(seconds=settings.IDEMPOTENCY_TTL),
+        }
+        with Session(bind=self.bind) as db:
+            db.add(IdempotencyKey(key=key, **claimed))
+            try:
+                db.commit()
+                return None
+            except IntegrityError:
+                db.rollback()
+
+            # Take over keys whose response expired or whose request never finished
+            taken = db.execute(
+                update(IdempotencyKey)
+                .where(
+                    IdempotencyKey.key == key,
+                    or_(
+                        IdempotencyKey.expires_at < now,
+                        and_(IdempotencyKey.status_code.is_(None), IdempotencyKey.locked_until < now)
+                    )
+                )
+                .values(**claimed)
+            ).rowcount
+            db.commit()
+            if taken:
+                return None
+
+            record = db.query(IdempotencyKey).filter(IdempotencyKey.key == key).one()
+            return {
+                "fingerprint": record.fingerprint,
+                "status_code": record.status_code,
+                "body": record.response_body
+            }
+
+    def complete(self, key: str, fingerprint: str, status_code: int, body: str) -> None:
+        """Store the response of a claimed key."""
+        with Session(bind=self.bind) as db:
+            try:
+                db.execute(
+                    update(IdempotencyKey)
+                    .where(IdempotencyKey.key == key)
+                    .values(status_code=status_code, response_body=body)
+                )
+                db.commit()
+            except SQLAlchemyError:
+                db.rollback()
+                raise
+
+    def extend(self, key: str, fingerprint: str) -> None:
+        """Keep a claimed key locked for another lock TTL."""
+        with Session(bind=self.bind) as db:
+            db.execute(
+                update(IdempotencyKey)
+                .where(
+                    IdempotencyKey.key == key,
+                    IdempotencyKey.fingerprint == fingerprint,
+                    IdempotencyKey.status_code.is_(None)
+                )
+                .values(locked_until=datetime.utcnow() + timedelta(seconds=settings.IDEMPOTENCY_LOCK_TTL))
+            )
+            db.commit()
+
+    def release(self, key: str) -> None:
+        """Give up a claimed key without storing a response."""
+        with Session(bind=self.bind) as db:
+            try:
+                db.query(IdempotencyKey).filter(IdempotencyKey.key == key).delete()
+                db.commit()
+            except SQLAlchemyError:
+                db.rollback()
+                raise
+
+
+def request_fingerprint(method: str, path: str, body: bytes) -> str:
+    """Identify a request, so a key can't be reused for a different one."""
+    return hashlib.sha256(b"\n".join([method.encode(), path.encode(), body])).hexdigest()
+
+
+def _replay(record: Dict[str, Any]) -> Response:
+    """Answer a duplicate request with the stored response."""
+    if record["status_code"] >= 400:
+        raise HTTPException(
+            status_code=record["status_code"],
+            detail=json.loads(record["body"])["detail"],
+            headers={REPLAYED_HEADER: "true"}
+        )
+    return Response(
+        content=record["body"],
+        status_code=record["status_code"],
+        media_type="application/json",
+        headers={REPLAYED_HEADER: "true"}
+    )
+
+
+@contextmanager
+def _keep_claimed(store, key: str, fingerprint: str) -> Iterator[None]:
+    """Extend a claim periodically until the block exits."""
+    done = threading.Event()
+    interval = settings.IDEMPOTENCY_LOCK_TTL / RENEWALS_PER_LOCK_TTL
+
+    def renew() -> None:
+        while not done.wait(interval):
+            try:
+                store.extend(key, fingerprint)
+            except Exception as e:
+                logger.warning(f"Could not extend idempotency claim: {e}")
+
+    renewer = threading.Thread(target=renew, daemon=True)
+    renewer.start()
+    try:
+        yield
+    finally:
+        done.set()
+        renewer.join()
+
+
+def _finish(store, key: str, fingerprint: str, status_code: Optional[int] = None, body: Optional[str] = None) -> None:
+    """
+    Store a response for a claimed key, or release the key without one.
+
+    Key store failures are logged, not raised. After a successful handler
+    its work is already committed, and after a failed one the handler's own
+    error is what the client should see.
+    """
+    try:
+        if status_code is None:
+            store.release(key)
+        else:
+            store.complete(key, fingerprint, status_code, body)
+    except (RedisError, SQLAlchemyError) as e:
+        logger.warning(f"Could not store idempotent response: {e}")
+
+
+async def run_idempotent(
+    request: Request,
+    redis: Redis,
+    db: Session,
+    scope: str,
+    user_id: int,
+    handler: Callable[[], Any],
+    status_code: int = status.HTTP_200_OK
+) -> Any:
+    """
+    Run an endpoint handler at most once per ``Idempotency-Key``.
+
+    Without the header the handler just runs. With it, the handler's content
+    is serialized once, stored under the key and returned as a response, and
+    requests repeating the key get the stored response back.
+    """
+    idempotency_key = request.headers.get(IDEMPOTENCY_HEADER)
+    if idempotency_key is None:
+        return handler()
+    if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{IDEMPOTENCY_HEADER} must be 1 to {MAX_KEY_LENGTH} characters"
+        )
+
+    key = f"{scope}:{user_id}:{idempotency_key}"
+    fingerprint = request_fingerprint(request.method, request.url.path, await request.body())
+
+    try:
+        store = RedisKeyStore(redis)
+        record = store.claim(key, fingerprint)
+    except RedisError as e:
+        logger.warning(f"Idempotency keys falling back to the database: {e}")
+        store = DatabaseKeyStore(db)
+        record = store.claim(key, fingerprint)
+
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT
+    while record is not None:
+        if record["fingerprint"] != fingerprint:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"{IDEMPOTENCY_HEADER} was already used for a different request"
+            )
+        if record.get("status_code") is not None:
+            return _replay(record)
+        if time.monotonic() > deadline:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"A request with this {IDEMPOTENCY_HEADER} is still being processed"
+            )
+        # Coalesce with the in-flight request; its claim lapses if it never finishes
+        await asyncio.sleep(POLL_INTERVAL)
+        record = store.claim(key, fingerprint)
+
+    try:
+        with _keep_claimed(store, key, fingerprint):
+            content = handler()
+    except HTTPException as e:
+        if e.status_code < 500:
+            _finish(store, key, fingerprint, e.status_code, json.dumps({"detail": e.detail}))
+        else:
+            _finish(store, key, fingerprint)
+        raise
+    except Exception:
+        _finish(store, key, fingerprint)
+        raise
+
+    body = render_json(jsonable_encoder(content))
+    _finish(store, key, fingerprint, status_code, body.decode("utf-8"))
+    return Response(content=body, status_code=status_code, media_type="application/json")
@@ -0,0 +1,3 @@
+"""
+Inventory reservations.
+"""
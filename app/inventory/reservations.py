@@ -0,0 +1,197 @@
+"""
+Stock reservations.
+
+Stock only ever leaves ``Product.stock_quantity`` through a conditional
+``UPDATE ... WHERE stock_quantity >= :quantity``, so concurrent carts and
+checkouts can't oversell without locking the products table. Adding to a
+cart holds the stock for ``STOCK_HOLD_TTL`` seconds; checkout keeps the held
+stock as sold, and the sweeper returns the stock of expired holds.
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import case, delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import Product, StockReservation
+
+products = Product.__table__
+reservations = StockReservation.__table__
+
+# Attempts at setting holds when concurrent first holds of a product collide
+HOLD_ATTEMPTS = 3
+
+
+class InsufficientStockError(Exception):
+    """Raised when some products don't have enough stock left."""
+
+    def __init__(self, product_ids: Iterable[int]):
+        self.product_ids = sorted(product_ids)
+        super().__init__(f"Insufficient stock for products: {self.product_ids}")
+
+
+def _sum_by_product(rows) -> Dict[int, int]:
+    totals: Dict[int, int] = defaultdict(int)
+    for product_id, quantity in rows:
+        totals[product_id] += quantity
+    return dict(totals)
+
+
+def _take(db: Session, amounts: Dict[int, int]) -> None:
+    """Take stock of several products in one statement; raise if any falls short."""
+    amounts = {product_id: quantity for product_id, quantity in amounts.items() if quantity > 0}
+    if not amounts:
+        return
+    amount = case(amounts, value=products.c.id)
+    taken = db.execute(
+        update(products)
+        .where(products.c.id.in_(amounts), products.c.stock_quantity >= amount)
+        .values(stock_quantity=products.c.stock_quantity - amount)
+        .returning(products.c.id)
+    ).scalars().all()
+    if len(taken) != len(amounts):
+        raise InsufficientStockError(set(amounts) - set(taken))
+
+
+def _give_back(db: Session, amounts: Dict[int, int]) -> None:
+    """Return stock of several products in one statement."""
+    amounts = {product_id: quantity for product_id, quantity in amounts.items() if quantity > 0}
+    if not amounts:
+        return
+    amount = case(amounts, value=products.c.id)
+    db.execute(
+        update(products)
+        .where(products.c.id.in_(amounts))
+        .values(stock_quantity=products.c.stock_quantity + amount)
+    )
+
+
+def _set_holds(db: Session, user_id: int, quantities: Dict[int, int], expires_at: datetime) -> None:
+    """Adjust a user's holds and their stock without committing."""
+    holds = {
+        hold.product_id: hold for hold in db.query(StockReservation).filter(
+            StockReservation.user_id == user_id,
+            StockReservation.product_id.in_(quantities)
+        ).with_for_update()
+    }
+
+    take, give = {}, {}
+    for product_id, quantity in quantities.items():
+        hold = holds.get(product_id)
+        held = hold.quantity if hold else 0
+        if quantity > held:
+            take[product_id] = quantity - held
+        elif quantity < held:
+            give[product_id] = held - quantity
+
+        if quantity == 0:
+            if hold:
+                db.delete(hold)
+        elif hold:
+            hold.quantity = quantity
+            hold.expires_at = expires_at
+        else:
+            db.add(StockReservation(
+                user_id=user_id,
+                product_id=product_id,
+                quantity=quantity,
+                expires_at=expires_at
+            ))
+
+    _take(db, take)
+    _give_back(db, give)
+
+
+def hold_stock(db: Session, user_id: int, quantities: Dict[int, int], ttl: Optional[int] = None) -> None:
+    """
+    Set the stock held for a user's cart lines and commit.
+
+    ``quantities`` maps product id to the quantity now in the cart (``0``
+    releases the hold). Only the difference to the current hold is taken or
+    returned. All-or-nothing: on ``InsufficientStockError`` the session has
+    been rolled back.
+
+    When a concurrent request creates the same first hold, the insert that
+    loses on the unique constraint is rolled back and retried against the
+    winner's hold, so the stock taken always matches the held quantity.
+    """
+    expires_at = datetime.utcnow() + timedelta(seconds=ttl or settings.STOCK_HOLD_TTL)
+    for attempt in range(HOLD_ATTEMPTS):
+        try:
+            _set_holds(db, user_id, quantities, expires_at)
+            db.commit()
+            return
+        except InsufficientStockError:
+            db.rollback()
+            raise
+        except IntegrityError:
+            db.rollback()
+            if attempt == HOLD_ATTEMPTS - 1:
+                raise
+
+
+def release_holds(db: Session, user_id: int) -> None:
+    """Release all stock held for a user's cart and commit."""
+    released = db.execute(
+        delete(reservations)
+        .where(reservations.c.user_id == user_id)
+        .returning(reservations.c.product_id, reservations.c.quantity)
+    ).all()
+    _give_back(db, _sum_by_product(released))
+    db.commit()
+
+
+def settle_holds(db: Session, user_id: int, quantities: Dict[int, int]) -> None:
+    """
+    Turn a user's holds into the sale of ``quantities`` without committing.
+
+    Holds are consumed even if they expired but haven't been swept, since
+    their stock was never returned. Stock missing from the holds is taken and
+    surplus held stock is returned. On ``InsufficientStockError`` the session
+    has been rolled back, restoring the holds.
+    """
+    held = _sum_by_product(db.execute(
+        delete(reservations)
+        .where(reservations.c.user_id == user_id)
+        .returning(reservations.c.product_id, reservations.c.quantity)
+    ).all())
+
+    take = {
+        product_id: quantity - held.get(product_id, 0)
+        for product_id, quantity in quantities.items()
+    }
+    give = {
+        product_id: quantity - quantities.get(product_id, 0)
+        for product_id, quantity in held.items()
+    }
+    try:
+        _take(db, take)
+    except InsufficientStockError:
+        db.rollback()
+        raise
+    _give_back(db, give)
+
+
+def release_expired(db: Session, limit: int, now: Optional[datetime] = None) -> int:
+    """Release up to ``limit`` expired holds and commit, returning how many were released."""
+    expired = (
+        select(reservations.c.id)
+        .where(reservations.c.expires_at < (now or datetime.utcnow()))
+        .limit(limit)
+    )
+    if db.bind.dialect.name == "postgresql":
+        # Let concurrent sweepers work on different holds
+        expired = expired.with_for_update(skip_locked=True)
+
+    released = db.execute(
+        delete(reservations)
+        .where(reservations.c.id.in_(expired))
+        .returning(reservations.c.product_id, reservations.c.quantity)
+    ).all()
+    _give_back(db, _sum_by_product(released))
+    db.commit()
+    return len(released)
@@ -0,0 +1,65 @@
+"""
+Background release of expired stock holds.
+"""
+
+import logging
+import threading
+from typing import Optional
+
+from app.config import settings
+from app.database import SessionLocal
+from app.inventory.reservations import release_expired
+
+logger = logging.getLogger(__name__)
+
+
+class StockSweeper:
+    """Background thread returning the stock of expired cart holds."""
+
+    def __init__(self, interval: float, batch_size: int):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sweep(self) -> int:
+        """Release expired holds until none are left, returning how many were released."""
+        total = 0
+        while True:
+            db = SessionLocal()
+            try:
+                released = release_expired(db, self.batch_size)
+            finally:
+                db.close()
+            total += released
+            if released < self.batch_size:
+                return total
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                released = self.sweep()
+                if released:
+                    logger.info(f"Released {released} expired stock holds")
+            except Exception as e:
+                logger.error(f"Stock hold sweep failed: {e}")
+
+    def start(self) -> None:
+        """Start sweeping in a background thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="stock-sweeper", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+
+# Global stock sweeper instance
+stock_sweeper = StockSweeper(
+    settings.STOCK_SWEEP_INTERVAL,
+    settings.STOCK_SWEEP_BATCH_SIZE
+)
@@ -10,11 +10,25 @@ from contextlib import asynccontextmanager
 import uvicorn
 
 from app.config import settings
-from app.database import engine, Base
+from app.database import engine, Base, SessionLocal, redis_client
 from app.api.v1.api import api_router
 from app.core.security import create_access_token
+from app.cart.flusher import cart_flusher
+from app.cart.totals import register_cart_totals
+from app.inventory.sweeper import stock_sweeper
+from app.search.change_feed import register_change_feed
+from app.search.facets import facet_engine
+from app.search.fulltext import install_fulltext_index
+from app.search.product_index import product_search_index
+from app.search.suggest import suggestion_index
 from app.models import *  # Import all models to register them
 
+# Publish product writes to the change feed
+register_change_feed(SessionLocal)
+
+# Reprice carts when product prices change
+register_cart_totals(SessionLocal)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -26,10 +40,38 @@ async def lifespan(app: FastAPI):
     Base.metadata.create_all(bind=engine)
     print("✅ Database tables created")
     
+    # Create the SQLite full-text index; PostgreSQL gets its index from the migrations
+    install_fulltext_index(engine)
+    print("✅ Full-text search index ready")
+    
+    if settings.SEARCH_BACKEND == "memory":
+        db = SessionLocal()
+        try:
+            product_search_index.ensure_ready(db, redis_client)
+        finally:
+            db.close()
+        print("✅ In-memory search index loaded")
+    
+    # Build the facet and suggestion snapshots before serving requests
+    facet_engine.warm(redis_client)
+    suggestion_index.warm(redis_client)
+    print("✅ Facet and suggestion snapshots built")
+    
+    if settings.CART_BACKEND == "redis":
+        cart_flusher.start()
+        print("✅ Cart write-behind flusher started")
+    
+    stock_sweeper.start()
+    
     yield
     
     # Shutdown
     print("🛑 Shutting down Modern Ecommerce Platform...")
+    if settings.SEARCH_BACKEND == "memory":
+        product_search_index.save()
+    if settings.CART_BACKEND == "redis":
+        cart_flusher.stop()
+    stock_sweeper.stop()
 
 
 # Create FastAPI application
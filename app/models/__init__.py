@@ -7,6 +7,9 @@ from .product import Product, Category, ProductImage, ProductReview
 from .order import Order, OrderItem, Cart, CartItem
 from .payment import Payment, PaymentMethod
 from .recommendation import UserBehavior, ProductRecommendation
+from .inventory import StockReservation
+from .idempotency import IdempotencyKey
+from .outbox import OutboxEvent
 
 __all__ = [
     "User",
@@ -22,5 +25,8 @@ __all__ = [
     "Payment",
     "PaymentMethod",
     "UserBehavior",
-    "ProductRecommendation"
+    "ProductRecommendation",
+    "StockReservation",
+    "IdempotencyKey",
+    "OutboxEvent"
 ] 
\ No newline at end of file
@@ -0,0 +1,28 @@
+"""
+Idempotency models for the ecommerce application.
+"""
+
+from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class IdempotencyKey(Base):
+    """
+    Stored outcome of a request sent with an ``Idempotency-Key`` header.
+
+    Used when Redis is unavailable. ``status_code`` is NULL while the first
+    request is still running; ``locked_until`` bounds how long such a claim
+    blocks duplicates if its request never finishes.
+    """
+    
+    __tablename__ = "idempotency_keys"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    key = Column(String(400), unique=True, nullable=False)
+    fingerprint = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=True)
+    response_body = Column(Text, nullable=True)
+    locked_until = Column(DateTime(timezone=True), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,27 @@
+"""
+Outbox models for the ecommerce application.
+"""
+
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class OutboxEvent(Base):
+    """
+    Side effect recorded in the transaction that caused it.
+
+    The outbox worker runs events once ``available_at`` has passed and
+    deletes them when they succeed. A NULL ``available_at`` marks an event
+    parked after running out of attempts.
+    """
+    
+    __tablename__ = "outbox_events"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    topic = Column(String(100), nullable=False)
+    payload = Column(JSON, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    available_at = Column(DateTime(timezone=True), nullable=True, index=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -2,7 +2,7 @@
 Product models for the ecommerce application.
 """
 
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -40,6 +40,13 @@ class Product(Base):
     """Product model."""
     
     __tablename__ = "products"
+    __table_args__ = (
+        # Category listings filtered by price, and keyset pagination on
+        # (price, id) / (created_at, id)
+        Index("ix_products_category_id_price", "category_id", "price"),
+        Index("ix_products_price_id", "price", "id"),
+        Index("ix_products_created_at_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False)
@@ -60,7 +67,8 @@ class Product(Base):
     meta_title = Column(String(255), nullable=True)
     meta_description = Column(Text, nullable=True)
     image_url = Column(String(500), nullable=True)  # Simple image URL
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Not null, so keyset pages on (created_at, id) don't skip rows
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Relationships
@@ -2,7 +2,7 @@
 Recommendation models for the AI recommendation system.
 """
 
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text, ForeignKey, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -12,6 +12,11 @@ class UserBehavior(Base):
     """User behavior tracking model for AI recommendations."""
     
     __tablename__ = "user_behaviors"
+    __table_args__ = (
+        # A user's history by behavior type, and the users who touched a product
+        Index("ix_user_behaviors_user_id_behavior_type_product_id", "user_id", "behavior_type", "product_id"),
+        Index("ix_user_behaviors_product_id_user_id", "product_id", "user_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -39,10 +44,14 @@ class ProductRecommendation(Base):
     """Product recommendation model for storing AI-generated recommendations."""
     
     __tablename__ = "product_recommendations"
+    __table_args__ = (
+        # A user's stored recommendations, best first (NULL user: popular products)
+        Index("ix_product_recommendations_user_id_score", "user_id", "score"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # Null for anonymous users
-    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)  # Source product (per-user rows: the user's strongest interest)
     recommended_product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
     
     # Recommendation details
@@ -0,0 +1,60 @@
+"""
+Order number generation.
+
+Order numbers are generated in-process, so placing an order needs no
+sequence or uniqueness lookup. Like a Snowflake id, a number packs the
+millisecond timestamp, a random node id drawn per process (and redrawn
+after a fork) and a per-millisecond sequence, and is rendered in Crockford
+base32. Numbers from one process never repeat; two processes can only
+collide by drawing the same node id and using it in the same millisecond.
+"""
+
+import os
+import secrets
+import threading
+import time
+
+ORDER_NUMBER_PREFIX = "ORD-"
+
+_TIMESTAMP_BITS = 42
+_NODE_BITS = 30
+_SEQUENCE_BITS = 12
+_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_WIDTH = -(-(_TIMESTAMP_BITS + _NODE_BITS + _SEQUENCE_BITS) // 5)
+
+_lock = threading.Lock()
+_pid = None
+_node = 0
+_last_ms = 0
+_sequence = 0
+
+
+def _encode(value: int) -> str:
+    chars = []
+    for _ in range(_WIDTH):
+        value, digit = divmod(value, 32)
+        chars.append(_ALPHABET[digit])
+    return "".join(reversed(chars))
+
+
+def generate_order_number() -> str:
+    """Generate a unique, time-ordered order number such as ``ORD-6GMH0BMHSK09F2000``."""
+    global _pid, _node, _last_ms, _sequence
+    with _lock:
+        if _pid != os.getpid():
+            _pid = os.getpid()
+            _node = secrets.randbits(_NODE_BITS)
+            _last_ms = _sequence = 0
+
+        now = int(time.time() * 1000)
+        if now > _last_ms:
+            _last_ms, _sequence = now, 0
+        else:
+            # Same millisecond (or the clock went back): keep counting, and
+            # borrow the next millisecond once the sequence runs out
+            _sequence += 1
+            if _sequence >> _SEQUENCE_BITS:
+                _last_ms, _sequence = _last_ms + 1, 0
+
+        value = (_last_ms << (_NODE_BITS + _SEQUENCE_BITS)) | (_node << _SEQUENCE_BITS) | _sequence
+    return ORDER_NUMBER_PREFIX + _encode(value)
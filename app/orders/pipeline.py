@@ -0,0 +1,104 @@
+"""
+Order placement pipeline.
+
+Checking out turns the cart into an ``Order`` and its ``OrderItem`` rows and
+empties the cart in one transaction. The cart lines already carry product name, SKU and price,
+so items are snapshotted without further product lookups and written with
+a single bulk insert; together with the batched stock settlement a
+checkout costs the same handful of statements whatever the cart size.
+
+The confirmation email, purchase behavior logging and recommendation update
+are recorded in the outbox in the same transaction and run by the outbox
+worker, so checkout only waits for the commit.
+"""
+
+from typing import Any, Dict, Iterable, List
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.inventory.reservations import settle_holds
+from app.models import Order, OrderItem
+from app.models.order import OrderStatus, PaymentStatus
+from app.orders.numbers import generate_order_number
+from app.outbox.events import ORDER_CONFIRMATION_EMAIL, PURCHASE_BEHAVIOR, RECOMMENDATIONS_UPDATE, enqueue
+
+
+class EmptyCartError(Exception):
+    """Raised when checking out a cart without items."""
+
+
+class MissingProductsError(Exception):
+    """Raised when cart lines refer to products that no longer exist."""
+
+    def __init__(self, product_ids: Iterable[int]):
+        self.product_ids = sorted(product_ids)
+        super().__init__(f"Products not found: {self.product_ids}")
+
+
+def place_order(db: Session, user_id: int, lines: List[Any], details: Dict[str, Any]) -> Order:
+    """
+    Create an order for cart lines without committing.
+
+    ``details`` holds the billing and shipping fields of ``OrderCreate``.
+    The held stock is settled first (see ``settle_holds``), so on
+    ``InsufficientStockError`` nothing has been written.
+    """
+    if not lines:
+        raise EmptyCartError()
+    missing = [line.product_id for line in lines if line.product_name is None]
+    if missing:
+        raise MissingProductsError(missing)
+
+    settle_holds(db, user_id, {line.product_id: line.quantity for line in lines})
+
+    subtotal = sum(line.product_price * line.quantity for line in lines)
+    order = Order(
+        order_number=generate_order_number(),
+        user_id=user_id,
+        status=OrderStatus.PENDING,
+        payment_status=PaymentStatus.PENDING,
+        subtotal=subtotal,
+        total_amount=subtotal,
+        **details
+    )
+    db.add(order)
+    db.flush()
+
+    db.execute(insert(OrderItem), [
+        {
+            "order_id": order.id,
+            "product_id": line.product_id,
+            "product_name": line.product_name,
+            "product_sku": line.product_sku,
+            "quantity": line.quantity,
+            "unit_price": line.product_price,
+            "total_price": line.product_price * line.quantity,
+        }
+        for line in lines
+    ])
+
+    enqueue(db, [
+        (ORDER_CONFIRMATION_EMAIL, {"order_id": order.id}),
+        (PURCHASE_BEHAVIOR, {"order_id": order.id}),
+        (RECOMMENDATIONS_UPDATE, {"user_id": user_id}),
+    ])
+    return order
+
+
+def checkout_cart(db: Session, store, user_id: int, details: Dict[str, Any]) -> Order:
+    """
+    Place an order for everything in the user's cart and empty the cart in
+    the same transaction, then commit.
+
+    A placed order never leaves its lines in the cart, so a retry can't
+    order them twice. Raises ``EmptyCartError``, ``MissingProductsError`` or
+    ``InsufficientStockError`` without placing an order.
+    """
+    _, lines = store.get_cart(user_id)
+    order = place_order(db, user_id, lines, details)
+    quantities = {line.product_id: line.quantity for line in lines}
+    store.clear_checked_out(user_id, quantities)
+    db.commit()
+    store.after_checkout(user_id, quantities)
+    return order
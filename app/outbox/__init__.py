@@ -0,0 +1,3 @@
+"""
+Transactional outbox for side effects of committed changes.
+"""
@@ -0,0 +1,33 @@
+"""
+Outbox topics and enqueueing.
+
+Side effects that don't have to happen before the response (emails,
+recommendation updates, behavior logging) are written to ``outbox_events``
+in the same transaction as the change that causes them, so they happen if
+and only if it commits. ``scripts/outbox_worker.py`` runs them afterwards.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Iterable, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.models import OutboxEvent
+
+# Payload {"order_id": ...}
+ORDER_CONFIRMATION_EMAIL = "email.order_confirmation"
+# Payload {"order_id": ...}
+PURCHASE_BEHAVIOR = "behavior.purchase"
+# Payload {"user_id": ...}
+RECOMMENDATIONS_UPDATE = "recommendations.update"
+# Payload {"user_id": ..., "quantities": {product_id: quantity}} (Redis carts)
+CART_CHECKED_OUT = "cart.checked_out"
+
+
+def enqueue(db: Session, events: Iterable[Tuple[str, Dict[str, Any]]]) -> None:
+    """Add ``(topic, payload)`` events to the current transaction in one insert."""
+    now = datetime.utcnow()
+    rows = [{"topic": topic, "payload": payload, "available_at": now} for topic, payload in events]
+    if rows:
+        db.execute(insert(OutboxEvent), rows)
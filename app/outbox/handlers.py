@@ -0,0 +1,77 @@
+"""
+Outbox event handlers.
+
+Each handler gets its own session and the event payload. Database writes
+are committed together with the removal of the event, so they happen
+exactly once; anything else (an email) may be repeated if the worker dies
+between sending it and committing. A handler fails by raising.
+"""
+
+from typing import Any, Awaitable, Callable, Dict
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, selectinload
+
+from app.ai.recommendation_engine import recommendation_engine
+from app.cart.redis_store import RedisCartStore
+from app.database import redis_client
+from app.models import Order, UserBehavior
+from app.outbox.events import CART_CHECKED_OUT, ORDER_CONFIRMATION_EMAIL, PURCHASE_BEHAVIOR, RECOMMENDATIONS_UPDATE
+from app.utils.email_service import email_service
+
+Handler = Callable[[Session, Dict[str, Any]], Awaitable[None]]
+
+HANDLERS: Dict[str, Handler] = {}
+
+
+def handles(topic: str) -> Callable[[Handler], Handler]:
+    """Register a handler for an outbox topic."""
+    def register(handler: Handler) -> Handler:
+        HANDLERS[topic] = handler
+        return handler
+    return register
+
+
+def _load_order(db: Session, order_id: int) -> Order:
+    order = db.query(Order).options(selectinload(Order.items)).filter(Order.id == order_id).first()
+    if order is None:
+        raise LookupError(f"Order {order_id} not found")
+    return order
+
+
+@handles(ORDER_CONFIRMATION_EMAIL)
+async def send_order_confirmation(db: Session, payload: Dict[str, Any]) -> None:
+    order = _load_order(db, payload["order_id"])
+    sent = await email_service.send_order_confirmation(
+        order.billing_email,
+        order.order_number,
+        order.total_amount,
+        [{"name": item.product_name, "price": item.unit_price, "quantity": item.quantity} for item in order.items]
+    )
+    if not sent:
+        raise RuntimeError(f"Could not send confirmation for order {order.order_number}")
+
+
+@handles(PURCHASE_BEHAVIOR)
+async def log_purchase_behavior(db: Session, payload: Dict[str, Any]) -> None:
+    order = _load_order(db, payload["order_id"])
+    db.execute(insert(UserBehavior), [
+        {
+            "user_id": order.user_id,
+            "product_id": item.product_id,
+            "behavior_type": "purchase",
+            "context": {"order_id": order.id, "quantity": item.quantity}
+        }
+        for item in order.items
+    ])
+
+
+@handles(RECOMMENDATIONS_UPDATE)
+async def refresh_recommendations(db: Session, payload: Dict[str, Any]) -> None:
+    recommendation_engine.store_recommendations([payload["user_id"]], db)
+
+
+@handles(CART_CHECKED_OUT)
+async def clear_checked_out_cart(db: Session, payload: Dict[str, Any]) -> None:
+    quantities = {int(product_id): quantity for product_id, quantity in payload["quantities"].items()}
+    RedisCartStore(redis_client, db).remove_lines(payload["user_id"], quantities)
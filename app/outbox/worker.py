@@ -0,0 +1,133 @@
+"""
+Outbox worker.
+
+Due events are leased in batches: one statement pushes their
+``available_at`` past the lease, so concurrent workers (and a worker that
+restarts mid-batch) don't run them twice while they are being handled,
+and leased events of a crashed worker come due again once the lease runs
+out. Failed events are retried with exponential backoff and parked after
+``OUTBOX_MAX_ATTEMPTS``.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models import OutboxEvent
+from app.outbox.handlers import HANDLERS
+
+logger = logging.getLogger(__name__)
+
+events = OutboxEvent.__table__
+
+
+class OutboxWorker:
+    """Runs outbox events in leased batches."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        batch_size: int,
+        lease: int,
+        max_attempts: int,
+        retry_delay: float
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+    def lease_batch(self, now: Optional[datetime] = None) -> List[Row]:
+        """Lease up to a batch of due events, oldest first."""
+        now = now or datetime.utcnow()
+        db = self.session_factory()
+        try:
+            due = (
+                select(events.c.id)
+                .where(events.c.available_at <= now)
+                .order_by(events.c.id)
+                .limit(self.batch_size)
+            )
+            if db.bind.dialect.name == "postgresql":
+                due = due.with_for_update(skip_locked=True)
+
+            leased = db.execute(
+                update(events)
+                .where(events.c.id.in_(due))
+                .values(available_at=now + timedelta(seconds=self.lease))
+                .returning(events.c.id, events.c.topic, events.c.payload, events.c.attempts)
+            ).all()
+            db.commit()
+            return sorted(leased, key=lambda event: event.id)
+        finally:
+            db.close()
+
+    async def run_event(self, event: Row) -> bool:
+        """Run one leased event, deleting it on success or scheduling its retry."""
+        db = self.session_factory()
+        try:
+            handler = HANDLERS.get(event.topic)
+            if handler is None:
+                raise LookupError(f"No handler for outbox topic {event.topic}")
+            await handler(db, event.payload)
+            db.execute(delete(events).where(events.c.id == event.id))
+            db.commit()
+            return True
+        except Exception as e:
+            db.rollback()
+            attempts = event.attempts + 1
+            if attempts >= self.max_attempts:
+                available_at = None
+                logger.error(f"Parking outbox event {event.id} ({event.topic}) after {attempts} attempts: {e}")
+            else:
+                delay = self.retry_delay * 2 ** (attempts - 1)
+                available_at = datetime.utcnow() + timedelta(seconds=delay)
+                logger.warning(f"Outbox event {event.id} ({event.topic}) failed, retrying in {delay:.0f}s: {e}")
+            db.execute(
+                update(events)
+                .where(events.c.id == event.id)
+                .values(attempts=attempts, available_at=available_at, last_error=str(e))
+            )
+            db.commit()
+            return False
+        finally:
+            db.close()
+
+    async def drain_once(self) -> int:
+        """Lease and run one batch, returning how many events it held."""
+        batch = self.lease_batch()
+        for event in batch:
+            await self.run_event(event)
+        return len(batch)
+
+    async def run(self, stop: asyncio.Event, poll_interval: float) -> None:
+        """Drain the outbox until ``stop`` is set, polling while it is empty."""
+        while not stop.is_set():
+            try:
+                leased = await self.drain_once()
+            except Exception as e:
+                logger.error(f"Outbox drain failed: {e}")
+                leased = 0
+            if leased < self.batch_size:
+                try:
+                    await asyncio.wait_for(stop.wait(), poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+
+# Global outbox worker instance
+outbox_worker = OutboxWorker(
+    SessionLocal,
+    settings.OUTBOX_BATCH_SIZE,
+    settings.OUTBOX_LEASE,
+    settings.OUTBOX_MAX_ATTEMPTS,
+    settings.OUTBOX_RETRY_DELAY
+)
@@ -3,7 +3,7 @@ Cart schemas for shopping cart management.
 """
 
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Literal, Optional
 from datetime import datetime
 
 
@@ -13,6 +13,18 @@ class CartItemCreate(BaseModel):
     quantity: int = 1
 
 
+class CartBatchOperation(BaseModel):
+    """Single operation of a bulk cart mutation."""
+    op: Literal["add", "update", "remove"]
+    product_id: int
+    quantity: int = 1
+
+
+class CartBatchRequest(BaseModel):
+    """Bulk cart mutation schema."""
+    operations: List[CartBatchOperation]
+
+
 class CartItemResponse(BaseModel):
     """Cart item response schema."""
     id: int
@@ -0,0 +1,132 @@
+"""
+Product change feed.
+
+Session events record the ids of products inserted, updated or deleted in a
+transaction and, once it commits, append them to a Redis stream and notify
+in-process subscribers. Consumers such as the in-memory search index replay
+the stream from their last position to update incrementally.
+
+Stock reservations change ``stock_quantity`` with bulk statements these
+events don't see. That's deliberate: stock moves with every cart write, so
+catalog responses read it live (``app.utils.catalog``) instead of having it
+invalidate the catalog.
+"""
+
+import logging
+from itertools import chain
+from typing import Callable, List, Set, Tuple
+
+from redis import Redis
+from redis.exceptions import RedisError, ResponseError
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.database import redis_client
+from app.models import Product
+
+logger = logging.getLogger(__name__)
+
+CHANGE_STREAM_KEY = "catalog:changes"
+CHANGE_STREAM_MAXLEN = 100000
+
+_SESSION_KEY = "changed_product_ids"
+_subscribers: List[Callable[[Set[int]], None]] = []
+
+
+def subscribe(callback: Callable[[Set[int]], None]) -> None:
+    """Call ``callback`` with the changed product ids after each commit in this process."""
+    _subscribers.append(callback)
+
+
+def _collect_product_changes(session: Session, flush_context) -> None:
+    """Remember which products a flush touched."""
+    changed = {
+        obj.id for obj in chain(session.new, session.dirty, session.deleted)
+        if isinstance(obj, Product) and obj.id is not None
+    }
+    if changed:
+        session.info.setdefault(_SESSION_KEY, set()).update(changed)
+
+
+def _publish_product_changes(session: Session) -> None:
+    """Publish the products changed by a committed transaction."""
+    changed = session.info.pop(_SESSION_KEY, None)
+    if not changed:
+        return
+
+    for callback in _subscribers:
+        callback(changed)
+
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for product_id in changed:
+            pipe.xadd(
+                CHANGE_STREAM_KEY,
+                {"product_id": product_id},
+                maxlen=CHANGE_STREAM_MAXLEN,
+                approximate=True
+            )
+        pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Could not publish product changes: {e}")
+
+
+def _discard_product_changes(session: Session) -> None:
+    """Forget changes from a rolled back transaction."""
+    session.info.pop(_SESSION_KEY, None)
+
+
+def register_change_feed(session_factory) -> None:
+    """Attach the change feed to every session created by ``session_factory``."""
+    if event.contains(session_factory, "after_flush", _collect_product_changes):
+        return
+    event.listen(session_factory, "after_flush", _collect_product_changes)
+    event.listen(session_factory, "after_commit", _publish_product_changes)
+    event.listen(session_factory, "after_rollback", _discard_product_changes)
+
+
+def _stream_id(entry_id: str) -> Tuple[int, int]:
+    """Parse a Redis stream id into a comparable tuple."""
+    milliseconds, _, sequence = entry_id.partition("-")
+    return int(milliseconds), int(sequence or 0)
+
+
+def current_position(redis: Redis) -> str:
+    """Get the id of the latest entry in the change stream."""
+    try:
+        return redis.xinfo_stream(CHANGE_STREAM_KEY)["last-generated-id"]
+    except ResponseError:
+        # The stream doesn't exist until the first change is published
+        return "0-0"
+
+
+def read_changes(redis: Redis, after: str, count: int = 10000) -> Tuple[Set[int], str, bool]:
+    """
+    Read product ids changed since stream position ``after``.
+
+    Returns the ids, the new position and whether the stream has been
+    trimmed past ``after``. Stream ids are not contiguous, so a trimmed
+    position can't be told apart from lost entries; the caller must treat it
+    as missed changes and rebuild from scratch.
+    """
+    try:
+        first_entry = redis.xinfo_stream(CHANGE_STREAM_KEY)["first-entry"]
+    except ResponseError:
+        return set(), after, False
+
+    trimmed = (
+        first_entry is not None
+        and after != "0-0"
+        and _stream_id(first_entry[0]) > _stream_id(after)
+    )
+
+    changed: Set[int] = set()
+    position = after
+    while True:
+        entries = redis.xrange(CHANGE_STREAM_KEY, min=f"({position}", count=count)
+        for entry_id, fields in entries:
+            changed.add(int(fields["product_id"]))
+            position = entry_id
+        if len(entries) < count:
+            break
+    return changed, position, trimmed
@@ -0,0 +1,184 @@
+"""
+Facet counts for product listings.
+
+The facet engine keeps a columnar snapshot of the catalog (product ids sorted
+ascending with parallel price, category and brand code arrays). A request's
+filters become boolean masks over that snapshot, and each facet is counted
+with a single ``bincount`` over its codes under the combined mask of all the
+*other* filters, so selecting a category still shows the counts of its
+sibling categories.
+"""
+
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+from redis import Redis
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import Category, Product
+from app.search.refresh import CatalogSnapshotIndex
+
+logger = logging.getLogger(__name__)
+
+# Lower edges of the price buckets; the last bucket is open-ended
+PRICE_BUCKET_EDGES = [0, 25, 50, 100, 250, 500, 1000]
+
+# Product generators write tags as "category, subcategory, brand, ..."
+BRAND_TAG_POSITION = 2
+
+# Maximum number of values returned per facet
+MAX_FACET_VALUES = 20
+
+
+def product_brand(tags: Optional[str]) -> str:
+    """Get a product's brand from its comma-separated tags ("" if it has none)."""
+    tag_list = (tags or "").split(",")
+    return tag_list[BRAND_TAG_POSITION].strip() if len(tag_list) > BRAND_TAG_POSITION else ""
+
+
+class _FacetSnapshot:
+    """Columnar catalog snapshot used to count facets."""
+
+    def __init__(self, ids, prices, category_codes, category_names, brand_codes, brand_names):
+        self.ids = ids
+        self.prices = prices
+        self.category_codes = category_codes
+        self.category_names = category_names
+        self.category_lookup = {name: code for code, name in enumerate(category_names)}
+        self.brand_codes = brand_codes
+        self.brand_names = brand_names
+        self.price_codes = np.searchsorted(PRICE_BUCKET_EDGES, prices, side="right") - 1
+
+    def _filter_masks(
+        self,
+        category: Optional[str],
+        min_price: Optional[float],
+        max_price: Optional[float],
+        search_ids: Optional[np.ndarray]
+    ) -> Dict[str, np.ndarray]:
+        """Build one boolean mask per active filter."""
+        masks = {}
+        if category:
+            code = self.category_lookup.get(category, -2)
+            masks["category"] = self.category_codes == code
+        if min_price is not None or max_price is not None:
+            mask = np.ones(len(self.ids), dtype=bool)
+            if min_price is not None:
+                mask &= self.prices >= min_price
+            if max_price is not None:
+                mask &= self.prices <= max_price
+            masks["price"] = mask
+        if search_ids is not None:
+            masks["search"] = np.isin(self.ids, search_ids, assume_unique=True)
+        return masks
+
+    def _combine(self, masks: Dict[str, np.ndarray], exclude: Optional[str] = None) -> np.ndarray:
+        """AND together every mask except the excluded facet's own filter."""
+        combined = np.ones(len(self.ids), dtype=bool)
+        for name, mask in masks.items():
+            if name != exclude:
+                combined &= mask
+        return combined
+
+    @staticmethod
+    def _count(codes: np.ndarray, mask: np.ndarray, size: int) -> np.ndarray:
+        """Count products per code under a mask, ignoring unknown (negative) codes."""
+        selected = codes[mask]
+        return np.bincount(selected[selected >= 0], minlength=size)
+
+    @staticmethod
+    def _values(names: List[str], counts: np.ndarray) -> List[dict]:
+        """Turn per-code counts into facet values, most frequent first."""
+        order = np.argsort(-counts, kind="stable")[:MAX_FACET_VALUES]
+        return [{"value": names[code], "count": int(counts[code])} for code in order if counts[code] > 0]
+
+    def counts(
+        self,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        search_ids: Optional[np.ndarray] = None
+    ) -> dict:
+        """Count the matching products and their facet values."""
+        masks = self._filter_masks(category, min_price, max_price, search_ids)
+
+        category_counts = self._count(
+            self.category_codes, self._combine(masks, "category"), len(self.category_names)
+        )
+        price_counts = self._count(
+            self.price_codes, self._combine(masks, "price"), len(PRICE_BUCKET_EDGES)
+        )
+        matching = self._combine(masks)
+        brand_counts = self._count(self.brand_codes, matching, len(self.brand_names))
+
+        price_values = []
+        for code, lower in enumerate(PRICE_BUCKET_EDGES):
+            upper = PRICE_BUCKET_EDGES[code + 1] if code + 1 < len(PRICE_BUCKET_EDGES) else None
+            if price_counts[code] > 0:
+                price_values.append({
+                    "value": f"{lower}-{upper}" if upper is not None else f"{lower}+",
+                    "min": lower,
+                    "max": upper,
+                    "count": int(price_counts[code])
+                })
+
+        return {
+            "total": int(matching.sum()),
+            "facets": {
+                "category": self._values(self.category_names, category_counts),
+                "price": price_values,
+                "brand": self._values(self.brand_names, brand_counts)
+            }
+        }
+
+
+class FacetEngine(CatalogSnapshotIndex):
+    """Facet counter whose snapshot is rebuilt when the catalog changes."""
+
+    def build_snapshot(self, db: Session) -> _FacetSnapshot:
+        """Load the facet columns of every product into arrays."""
+        category_ids = {}
+        category_names = []
+        for category_id, name in db.query(Category.id, Category.name).order_by(Category.name):
+            category_ids[category_id] = len(category_names)
+            category_names.append(name)
+
+        brand_lookup: Dict[str, int] = {}
+        ids, prices, category_codes, brand_codes = [], [], [], []
+        rows = db.query(Product.id, Product.price, Product.category_id, Product.tags).order_by(Product.id)
+        for product_id, price, category_id, tags in rows.yield_per(5000):
+            ids.append(product_id)
+            prices.append(price)
+            category_codes.append(category_ids.get(category_id, -1))
+            brand = product_brand(tags)
+            brand_codes.append(brand_lookup.setdefault(brand, len(brand_lookup)) if brand else -1)
+
+        snapshot = _FacetSnapshot(
+            np.array(ids, dtype=np.int64),
+            np.array(prices, dtype=np.float64),
+            np.array(category_codes, dtype=np.int32),
+            category_names,
+            np.array(brand_codes, dtype=np.int32),
+            list(brand_lookup)
+        )
+        logger.info(f"Built facet snapshot with {len(ids)} products")
+        return snapshot
+
+    def counts(
+        self,
+        redis: Redis,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        search_ids: Optional[List[int]] = None
+    ) -> dict:
+        """Count facets for the given filters against the current snapshot."""
+        if search_ids is not None:
+            search_ids = np.unique(np.asarray(search_ids, dtype=np.int64))
+        return self.current(redis).counts(category, min_price, max_price, search_ids)
+
+
+# Global facet engine instance
+facet_engine = FacetEngine(settings.FACET_REFRESH_INTERVAL)
@@ -0,0 +1,136 @@
+"""
+Database full-text search over products.
+
+PostgreSQL gets a ``tsvector`` column with a GIN index and SQLite gets an
+FTS5 table, both kept in sync by triggers, so every write path (API
+endpoints, scripts, bulk generators) updates the index without extra code.
+On both, a product's document is its name, description, tags and category
+name. Other databases fall back to ``ILIKE`` matching.
+
+The PostgreSQL column, triggers and index are created by an Alembic
+migration (building them at startup would rewrite the products table under
+an exclusive lock); only the SQLite FTS5 table is created at startup.
+"""
+
+import re
+from typing import List
+
+from sqlalchemy import Float, Integer, false, func, inspect, literal_column, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Query
+
+from app.models import Category, Product
+
+FTS_TABLE = "products_fts"
+
+# Relative weight of each FTS5 column in bm25 ranking: name, description, tags, category
+SQLITE_BM25_WEIGHTS = "10.0, 1.0, 4.0, 3.0"
+
+SQLITE_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, description, tags, category,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON products BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, description, tags, category)
+        VALUES (new.id, new.name, new.description, new.tags,
+                (SELECT name FROM categories WHERE id = new.category_id));
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON products BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au
+    AFTER UPDATE OF name, description, tags, category_id ON products BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        INSERT INTO {FTS_TABLE}(rowid, name, description, tags, category)
+        VALUES (new.id, new.name, new.description, new.tags,
+                (SELECT name FROM categories WHERE id = new.category_id));
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_category_au
+    AFTER UPDATE OF name ON categories BEGIN
+        UPDATE {FTS_TABLE} SET category = new.name
+        WHERE rowid IN (SELECT id FROM products WHERE category_id = new.id);
+    END
+    """,
+]
+
+SQLITE_REBUILD = [
+    f"DELETE FROM {FTS_TABLE}",
+    f"""
+    INSERT INTO {FTS_TABLE}(rowid, name, description, tags, category)
+    SELECT p.id, p.name, p.description, p.tags, c.name
+    FROM products p LEFT JOIN categories c ON c.id = p.category_id
+    """,
+]
+
+def install_fulltext_index(engine: Engine) -> None:
+    """
+    Create the SQLite full-text index if it is missing.
+
+    Safe to call on every startup. A freshly created FTS table is populated
+    from the existing products. Other databases are left alone; PostgreSQL
+    gets its index from the migrations.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as connection:
+        exists = inspect(connection).has_table(FTS_TABLE)
+        for statement in SQLITE_DDL:
+            connection.exec_driver_sql(statement)
+        if not exists:
+            for statement in SQLITE_REBUILD:
+                connection.exec_driver_sql(statement)
+
+
+def tokenize_query(q: str) -> List[str]:
+    """Split a user query into lowercase word tokens."""
+    return re.findall(r"\w+", q.lower())
+
+
+def apply_search(query: Query, q: str, rank: bool = False) -> Query:
+    """
+    Restrict a product query to full-text matches for ``q``.
+
+    Every query token must match, and the last one also matches as a prefix
+    so partially typed words find results. With ``rank`` the results are
+    ordered by relevance.
+    """
+    tokens = tokenize_query(q)
+    if not tokens:
+        return query.filter(false())
+
+    dialect = query.session.get_bind().dialect.name
+
+    if dialect == "sqlite":
+        match = " ".join(f'"{token}"' for token in tokens) + "*"
+        matches = text(
+            f"SELECT rowid AS product_id, bm25({FTS_TABLE}, {SQLITE_BM25_WEIGHTS}) AS score "
+            f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match"
+        ).bindparams(match=match).columns(product_id=Integer, score=Float).subquery("fts")
+        query = query.join(matches, matches.c.product_id == Product.id)
+        # bm25 scores are negative, lower is more relevant
+        return query.order_by(matches.c.score) if rank else query
+
+    if dialect == "postgresql":
+        tsquery = func.to_tsquery("english", " & ".join(tokens) + ":*")
+        search_vector = literal_column("products.search_vector")
+        query = query.filter(search_vector.op("@@")(tsquery))
+        return query.order_by(func.ts_rank(search_vector, tsquery).desc()) if rank else query
+
+    search_term = f"%{q}%"
+    return query.filter(
+        (Product.name.ilike(search_term)) |
+        (Product.description.ilike(search_term)) |
+        (Product.tags.ilike(search_term)) |
+        (Product.category.has(Category.name.ilike(search_term)))
+    )
@@ -0,0 +1,189 @@
+"""
+In-memory inverted index with BM25 ranking.
+
+Postings are kept per term as two parallel ``array`` objects (document ids
+sorted ascending and term frequencies), which is far more compact than lists
+of Python ints and lets updates use binary search on the id array.
+"""
+
+import math
+import os
+import pickle
+import re
+import tempfile
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Maximum number of vocabulary terms a trailing prefix may expand to
+MAX_PREFIX_EXPANSIONS = 64
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Split text into lowercase word tokens."""
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+
+class InvertedIndex:
+    """Inverted index over weighted text fields, ranked with BM25."""
+
+    def __init__(self, field_weights: Dict[str, int], k1: float = 1.2, b: float = 0.75):
+        self.field_weights = field_weights
+        self.k1 = k1
+        self.b = b
+        self._doc_ids: Dict[str, array] = {}
+        self._freqs: Dict[str, array] = {}
+        self._vocabulary: List[str] = []
+        self._doc_lengths: Dict[int, int] = {}
+        self._doc_terms: Dict[int, Tuple[str, ...]] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def __contains__(self, doc_id: int) -> bool:
+        return doc_id in self._doc_lengths
+
+    def add(self, doc_id: int, fields: Dict[str, Optional[str]]) -> None:
+        """Index a document, replacing any previous version of it."""
+        if doc_id in self._doc_lengths:
+            self.remove(doc_id)
+
+        counts = Counter()
+        for field, weight in self.field_weights.items():
+            for token in tokenize(fields.get(field)):
+                counts[token] += weight
+
+        for term, freq in counts.items():
+            doc_ids = self._doc_ids.get(term)
+            if doc_ids is None:
+                self._doc_ids[term] = array("I", [doc_id])
+                self._freqs[term] = array("I", [freq])
+                insort(self._vocabulary, term)
+                continue
+            if not doc_ids or doc_ids[-1] < doc_id:
+                # Ids usually arrive in ascending order, so appending is the common case
+                doc_ids.append(doc_id)
+                self._freqs[term].append(freq)
+            else:
+                position = bisect_left(doc_ids, doc_id)
+                doc_ids.insert(position, doc_id)
+                self._freqs[term].insert(position, freq)
+
+        length = sum(counts.values())
+        self._doc_lengths[doc_id] = length
+        self._doc_terms[doc_id] = tuple(counts)
+        self._total_length += length
+
+    def remove(self, doc_id: int) -> None:
+        """Remove a document from the index if present."""
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        self._total_length -= self._doc_lengths.pop(doc_id)
+
+        for term in terms:
+            doc_ids = self._doc_ids[term]
+            position = bisect_left(doc_ids, doc_id)
+            doc_ids.pop(position)
+            self._freqs[term].pop(position)
+            if not doc_ids:
+                del self._doc_ids[term]
+                del self._freqs[term]
+                self._vocabulary.pop(bisect_left(self._vocabulary, term))
+
+    def expand_prefix(self, prefix: str) -> List[str]:
+        """List vocabulary terms starting with a prefix."""
+        start = bisect_left(self._vocabulary, prefix)
+        terms = []
+        for term in self._vocabulary[start:start + MAX_PREFIX_EXPANSIONS]:
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+        return terms
+
+    def search(self, query: str, limit: int = 20, prefix: bool = True) -> List[Tuple[int, float]]:
+        """
+        Rank documents containing every query token with BM25.
+
+        With ``prefix`` the last token also matches any term it is a prefix
+        of, so partially typed queries find results.
+        """
+        tokens = tokenize(query)
+        if not tokens or not self._doc_lengths:
+            return []
+
+        doc_count = len(self._doc_lengths)
+        average_length = self._total_length / doc_count
+        scores: Dict[int, float] = {}
+
+        for position, token in enumerate(tokens):
+            is_last = position == len(tokens) - 1
+            terms = self.expand_prefix(token) if prefix and is_last else [token]
+            token_scores: Dict[int, float] = {}
+
+            for term in terms:
+                doc_ids = self._doc_ids.get(term)
+                if doc_ids is None:
+                    continue
+                idf = math.log(1 + (doc_count - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+                for doc_id, freq in zip(doc_ids, self._freqs[term]):
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / average_length)
+                    score = idf * freq * (self.k1 + 1) / (freq + norm)
+                    if score > token_scores.get(doc_id, 0.0):
+                        token_scores[doc_id] = score
+
+            # Every token has to match, so keep only documents seen for all of them
+            if position == 0:
+                scores = token_scores
+            else:
+                scores = {
+                    doc_id: score + token_scores[doc_id]
+                    for doc_id, score in scores.items()
+                    if doc_id in token_scores
+                }
+            if not scores:
+                return []
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit]
+
+    def save(self, path: str, metadata: Optional[dict] = None) -> None:
+        """Write a snapshot of the index to disk atomically."""
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        state = {
+            "field_weights": self.field_weights,
+            "k1": self.k1,
+            "b": self.b,
+            "doc_ids": self._doc_ids,
+            "freqs": self._freqs,
+            "doc_lengths": self._doc_lengths,
+            "doc_terms": self._doc_terms,
+            "metadata": metadata or {},
+        }
+        with tempfile.NamedTemporaryFile("wb", dir=directory, delete=False) as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(f.name, path)
+
+    @classmethod
+    def load(cls, path: str) -> Tuple["InvertedIndex", dict]:
+        """Load an index snapshot and the metadata saved with it."""
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        index = cls(state["field_weights"], k1=state["k1"], b=state["b"])
+        index._doc_ids = state["doc_ids"]
+        index._freqs = state["freqs"]
+        index._doc_lengths = state["doc_lengths"]
+        index._doc_terms = state["doc_terms"]
+        index._vocabulary = sorted(index._doc_ids)
+        index._total_length = sum(index._doc_lengths.values())
+        return index, state["metadata"]
+
+    def bulk_add(self, documents: Iterable[Tuple[int, Dict[str, Optional[str]]]]) -> None:
+        """Index many documents."""
+        for doc_id, fields in documents:
+            self.add(doc_id, fields)
@@ -0,0 +1,144 @@
+"""
+In-memory product search backed by the inverted index.
+
+The index is loaded from a disk snapshot (or built from the database when
+there is none) and then kept current from the product change feed, so a
+search only re-indexes the products that changed since the last one.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import List, Set
+
+from redis import Redis
+from redis.exceptions import RedisError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import Product
+from app.search.change_feed import current_position, read_changes, subscribe
+from app.search.inverted_index import InvertedIndex
+
+logger = logging.getLogger(__name__)
+
+# Name matches count three times as much as description matches, tags twice
+PRODUCT_FIELD_WEIGHTS = {"name": 3, "tags": 2, "description": 1}
+
+# Rows fetched per round trip when building the index from the database
+BUILD_BATCH_SIZE = 5000
+
+
+class ProductSearchIndex:
+    """Process-local product search index kept in sync with the change feed."""
+
+    def __init__(self, snapshot_path: str, sync_interval: float):
+        self.snapshot_path = snapshot_path
+        self.sync_interval = sync_interval
+        self.index = None
+        self.feed_position = "0-0"
+        self._pending: Set[int] = set()
+        self._lock = threading.Lock()
+        self._last_sync = 0.0
+        self._subscribed = False
+
+    def _on_products_changed(self, product_ids: Set[int]) -> None:
+        """Queue products committed by this process for re-indexing."""
+        with self._lock:
+            self._pending.update(product_ids)
+
+    @staticmethod
+    def _fetch_documents(db: Session, product_ids=None):
+        """Yield (id, fields) pairs for products, optionally limited to some ids."""
+        query = db.query(Product.id, Product.name, Product.tags, Product.description)
+        if product_ids is not None:
+            query = query.filter(Product.id.in_(product_ids))
+        for row in query.order_by(Product.id).yield_per(BUILD_BATCH_SIZE):
+            yield row.id, {"name": row.name, "tags": row.tags, "description": row.description}
+
+    def rebuild(self, db: Session, redis: Redis) -> None:
+        """Build the index from the database and snapshot it."""
+        # Read the feed position first so changes made during the scan are replayed
+        try:
+            position = current_position(redis)
+        except RedisError as e:
+            logger.warning(f"Change feed unavailable, index will only see local changes: {e}")
+            position = "0-0"
+
+        index = InvertedIndex(PRODUCT_FIELD_WEIGHTS)
+        index.bulk_add(self._fetch_documents(db))
+        self.index = index
+        self.feed_position = position
+        logger.info(f"Built product search index with {len(index)} products")
+        self.save()
+
+    def save(self) -> None:
+        """Snapshot the index so workers can start without a rebuild."""
+        if self.index is not None:
+            self.index.save(self.snapshot_path, {"feed_position": self.feed_position})
+
+    def load_snapshot(self) -> bool:
+        """Load the index from its snapshot, returning whether one was found."""
+        if not os.path.exists(self.snapshot_path):
+            return False
+        self.index, metadata = InvertedIndex.load(self.snapshot_path)
+        self.feed_position = metadata.get("feed_position", "0-0")
+        logger.info(f"Loaded product search index with {len(self.index)} products")
+        return True
+
+    def ensure_ready(self, db: Session, redis: Redis) -> None:
+        """Load or build the index on first use, then apply pending changes."""
+        if not self._subscribed:
+            subscribe(self._on_products_changed)
+            self._subscribed = True
+        if self.index is None and not self.load_snapshot():
+            self.rebuild(db, redis)
+        self.sync(db, redis)
+
+    def sync(self, db: Session, redis: Redis, force: bool = False) -> None:
+        """
+        Re-index products changed since the last sync.
+
+        Changes committed by this process are applied immediately; the shared
+        feed (carrying other workers' changes) is polled at most once per
+        ``sync_interval``.
+        """
+        with self._lock:
+            changed, self._pending = self._pending, set()
+
+        now = time.monotonic()
+        if force or now - self._last_sync >= self.sync_interval:
+            self._last_sync = now
+            try:
+                feed_changes, position, trimmed = read_changes(redis, self.feed_position)
+            except RedisError as e:
+                logger.warning(f"Change feed unavailable: {e}")
+            else:
+                if trimmed:
+                    logger.warning("Product change feed was trimmed past the index position, rebuilding")
+                    self.rebuild(db, redis)
+                    return
+                changed |= feed_changes
+                self.feed_position = position
+
+        if not changed:
+            return
+        found = set()
+        for product_id, fields in self._fetch_documents(db, changed):
+            self.index.add(product_id, fields)
+            found.add(product_id)
+        for product_id in changed - found:
+            self.index.remove(product_id)
+
+    def search(self, db: Session, redis: Redis, q: str, limit: int = 20) -> List[int]:
+        """Get the ids of the best matching products, most relevant first."""
+        self.ensure_ready(db, redis)
+        return [product_id for product_id, _ in self.index.search(q, limit)]
+
+
+# Global product search index instance
+product_search_index = ProductSearchIndex(
+    settings.SEARCH_INDEX_PATH,
+    settings.SEARCH_INDEX_SYNC_INTERVAL
+)
@@ -0,0 +1,87 @@
+"""
+Base class for in-memory catalog structures rebuilt when the catalog changes.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Optional
+
+from redis import Redis
+from redis.exceptions import RedisError
+from sqlalchemy.orm import Session
+
+from app.core.cache import get_catalog_version
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogSnapshotIndex:
+    """
+    Holds an immutable snapshot built from the database and swaps in a new
+    one, built in a background thread, when the catalog version moves or the
+    snapshot is older than ``max_age``. Readers keep using the previous
+    snapshot meanwhile.
+
+    The first snapshot is built by ``warm`` in the application's lifespan,
+    before requests are served. Without it, the first reader builds it
+    synchronously, which blocks the event loop of an async handler.
+    """
+
+    def __init__(self, refresh_interval: float, max_age: Optional[float] = None):
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age
+        self._snapshot: Any = None
+        self._built_version = None
+        self._built_at = 0.0
+        self._checked_at = 0.0
+        self._building = threading.Lock()
+
+    def build_snapshot(self, db: Session) -> Any:
+        """Build a new snapshot from the database."""
+        raise NotImplementedError
+
+    def rebuild(self, version: Optional[int] = None) -> None:
+        """Rebuild the snapshot and swap it in."""
+        with self._building:
+            db = SessionLocal()
+            try:
+                snapshot = self.build_snapshot(db)
+            finally:
+                db.close()
+            self._snapshot = snapshot
+            self._built_version = version
+            self._built_at = time.monotonic()
+
+    def _read_version(self, redis: Redis) -> Optional[int]:
+        try:
+            return get_catalog_version(redis)
+        except RedisError as e:
+            logger.warning(f"Catalog version unavailable: {e}")
+            return self._built_version
+
+    def warm(self, redis: Redis) -> None:
+        """Build the first snapshot ahead of the first request."""
+        self._checked_at = time.monotonic()
+        self.rebuild(self._read_version(redis))
+
+    def current(self, redis: Redis) -> Any:
+        """Get the current snapshot, scheduling a rebuild if it is stale."""
+        now = time.monotonic()
+        if self._snapshot is not None and now - self._checked_at < self.refresh_interval:
+            return self._snapshot
+        self._checked_at = now
+
+        version = self._read_version(redis)
+
+        if self._snapshot is None:
+            self.rebuild(version)
+            return self._snapshot
+
+        stale = version != self._built_version or (
+            self.max_age is not None and now - self._built_at > self.max_age
+        )
+        if stale and not self._building.locked():
+            threading.Thread(target=self.rebuild, args=(version,), daemon=True).start()
+        return self._snapshot
@@ -0,0 +1,138 @@
+"""
+Typeahead suggestions from a precomputed sorted prefix array.
+
+Product names, category names and brands (read from the product tags the
+same way as the brand facet) are normalized into a sorted key array, so
+a prefix maps to a contiguous slice found with two binary searches. The
+best entries for short prefixes, whose slices are large, are
+precomputed; longer prefixes pick the best from their slice directly.
+Entries are ranked by popularity from ``UserBehavior``.
+"""
+
+import heapq
+import logging
+from bisect import bisect_left
+from collections import defaultdict
+from itertools import groupby
+from typing import Dict, List
+
+from redis import Redis
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import Category, Product, UserBehavior
+from app.search.facets import product_brand
+from app.search.inverted_index import tokenize
+from app.search.refresh import CatalogSnapshotIndex
+
+logger = logging.getLogger(__name__)
+
+# Popularity weight of each behavior type
+BEHAVIOR_WEIGHTS = {"view": 1.0, "add_to_cart": 3.0, "purchase": 5.0}
+
+# Prefixes up to this length get their top suggestions precomputed
+PRECOMPUTED_PREFIX_LENGTH = 3
+
+# How many top suggestions are kept per precomputed prefix
+PRECOMPUTED_TOP_K = 20
+
+# Words of a suggestion that can start a match ("head" finds "Wireless Headphones")
+MAX_WORD_STARTS = 4
+
+
+def normalize(text: str) -> str:
+    """Normalize text for prefix matching."""
+    return " ".join(tokenize(text))
+
+
+class _SuggestionSnapshot:
+    """Immutable sorted prefix array over suggestion entries."""
+
+    def __init__(self, entries: Dict[tuple, float]):
+        # entries maps (label, kind) to popularity
+        self.labels = []
+        self.kinds = []
+        self.scores = []
+        keyed = []
+        for entry_id, ((label, kind), score) in enumerate(entries.items()):
+            self.labels.append(label)
+            self.kinds.append(kind)
+            self.scores.append(score)
+            words = normalize(label).split(" ")
+            for start in range(min(len(words), MAX_WORD_STARTS)):
+                keyed.append((" ".join(words[start:]), entry_id))
+        keyed.sort()
+        self.keys = [key for key, _ in keyed]
+        self.entry_ids = [entry_id for _, entry_id in keyed]
+
+        # Keys are sorted, so each short prefix covers one contiguous run of them
+        self.top_by_prefix: Dict[str, List[int]] = {}
+        for length in range(1, PRECOMPUTED_PREFIX_LENGTH + 1):
+            runs = groupby(range(len(self.keys)), key=lambda position: self.keys[position][:length])
+            for prefix, positions in runs:
+                if len(prefix) == length:
+                    entry_ids = {self.entry_ids[position] for position in positions}
+                    self.top_by_prefix[prefix] = self._best(entry_ids, PRECOMPUTED_TOP_K)
+
+    def _best(self, entry_ids, limit: int) -> List[int]:
+        """Pick the most popular entries, ties broken alphabetically."""
+        return heapq.nsmallest(limit, entry_ids, key=lambda i: (-self.scores[i], self.labels[i]))
+
+    def suggest(self, prefix: str, limit: int) -> List[int]:
+        """Get the entry ids of the best suggestions for a normalized prefix."""
+        if len(prefix) <= PRECOMPUTED_PREFIX_LENGTH and limit <= PRECOMPUTED_TOP_K:
+            return self.top_by_prefix.get(prefix, [])[:limit]
+        start = bisect_left(self.keys, prefix)
+        end = bisect_left(self.keys, prefix + "\uffff", lo=start)
+        return self._best(set(self.entry_ids[start:end]), limit)
+
+
+class SuggestionIndex(CatalogSnapshotIndex):
+    """Typeahead index rebuilt in the background when the catalog changes."""
+
+    def build_snapshot(self, db: Session) -> _SuggestionSnapshot:
+        """Collect suggestion labels with their popularity and index them."""
+        weight = case(
+            *[(UserBehavior.behavior_type == name, value) for name, value in BEHAVIOR_WEIGHTS.items()],
+            else_=0.5
+        )
+        popularity = dict(
+            db.query(UserBehavior.product_id, func.sum(weight))
+            .group_by(UserBehavior.product_id)
+            .all()
+        )
+        category_names = dict(db.query(Category.id, Category.name).all())
+
+        entries: Dict[tuple, float] = defaultdict(float)
+        rows = db.query(Product.id, Product.name, Product.category_id, Product.tags).yield_per(5000)
+        for product_id, name, category_id, tags in rows:
+            score = float(popularity.get(product_id, 0.0))
+            entries[(name, "product")] = max(entries[(name, "product")], score)
+            if category_id in category_names:
+                entries[(category_names[category_id], "category")] += score
+            brand = product_brand(tags)
+            if brand:
+                entries[(brand, "brand")] += score
+
+        snapshot = _SuggestionSnapshot(entries)
+        logger.info(f"Built suggestion index with {len(snapshot.labels)} entries")
+        return snapshot
+
+    def suggest(self, redis: Redis, q: str, limit: int = 8) -> List[dict]:
+        """Get the most popular suggestions starting with ``q``."""
+        snapshot = self.current(redis)
+        prefix = normalize(q)
+        if not prefix:
+            return []
+        return [
+            {"text": snapshot.labels[i], "type": snapshot.kinds[i]}
+            for i in snapshot.suggest(prefix, limit)
+        ]
+
+
+# Global suggestion index instance
+suggestion_index = SuggestionIndex(
+    settings.SUGGEST_REFRESH_INTERVAL,
+    settings.SUGGEST_MAX_AGE
+)
@@ -0,0 +1,143 @@
+"""
+Shared cart helpers.
+
+A cart, its items and the price/stock of each item's product are loaded with
+a single outer-joined query, so reading or checking out a cart costs the same
+number of statements however many items it holds.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import ColumnElement, Update
+
+from app.models import Cart, CartItem, Product
+
+# Columns of one cart line, in response order
+CART_LINE_COLUMNS = (
+    CartItem.id,
+    CartItem.product_id,
+    CartItem.quantity,
+    Product.name.label("product_name"),
+    Product.sku.label("product_sku"),
+    Product.price.label("product_price"),
+    Product.stock_quantity.label("product_stock"),
+)
+
+
+def load_cart(db: Session, user_id: int) -> Tuple[Optional[int], List[Any]]:
+    """
+    Load a user's cart id and its lines in one query.
+
+    Returns ``(None, [])`` when the user has no cart. Lines whose product no
+    longer exists have ``product_name`` set to ``None``.
+    """
+    rows = (
+        db.query(Cart.id.label("cart_id"), *CART_LINE_COLUMNS)
+        .outerjoin(CartItem, CartItem.cart_id == Cart.id)
+        .outerjoin(Product, Product.id == CartItem.product_id)
+        .filter(Cart.user_id == user_id)
+        .order_by(Cart.id, CartItem.id)
+        .all()
+    )
+    if not rows:
+        return None, []
+
+    # A user should only have one cart; use the oldest if there are several
+    cart_id = rows[0].cart_id
+    return cart_id, [row for row in rows if row.cart_id == cart_id and row.id is not None]
+
+
+def recompute_cart_totals(where: ColumnElement) -> Update:
+    """
+    Build an UPDATE recomputing the materialized totals of the carts matching
+    ``where`` from their items and current product prices.
+    """
+    carts = Cart.__table__
+    cart_items = CartItem.__table__
+    products = Product.__table__
+
+    subtotal = (
+        select(func.coalesce(func.sum(cart_items.c.quantity * products.c.price), 0.0))
+        .select_from(cart_items.join(products, products.c.id == cart_items.c.product_id))
+        .where(cart_items.c.cart_id == carts.c.id)
+        .scalar_subquery()
+    )
+    item_count = (
+        select(func.count(cart_items.c.id))
+        .where(cart_items.c.cart_id == carts.c.id)
+        .scalar_subquery()
+    )
+    return update(carts).where(where).values(subtotal=subtotal, item_count=item_count)
+
+
+def adjust_cart_totals(cart_id: int, product_id: int, quantity_delta: int, line_delta: int) -> Update:
+    """
+    Build an UPDATE applying one item change to a cart's materialized totals,
+    pricing the quantity change at the product's current price.
+    """
+    carts = Cart.__table__
+    price = select(Product.__table__.c.price).where(Product.__table__.c.id == product_id).scalar_subquery()
+    return update(carts).where(carts.c.id == cart_id).values(
+        subtotal=carts.c.subtotal + func.coalesce(price, 0.0) * quantity_delta,
+        item_count=carts.c.item_count + line_delta
+    )
+
+
+def serialize_cart(cart_id: int, user_id: int, lines: List[Any]) -> Dict[str, Any]:
+    """Build the cart response from its lines in a single pass."""
+    total = 0
+    items = []
+
+    for line in lines:
+        if line.product_name is None:
+            continue
+        item_total = line.product_price * line.quantity
+        total += item_total
+        items.append({
+            "id": line.id,
+            "product_id": line.product_id,
+            "product_name": line.product_name,
+            "product_price": line.product_price,
+            "quantity": line.quantity,
+            "total": item_total
+        })
+
+    return {
+        "cart_id": cart_id,
+        "user_id": user_id,
+        "items": items,
+        "total": total,
+        "item_count": len(items)
+    }
+
+
+def fold_cart_operations(current: Dict[int, int], operations: Iterable[Any]) -> Dict[int, int]:
+    """
+    Apply add/update/remove operations to a cart's product quantities.
+
+    ``current`` maps product id to quantity. Returns the final quantity of
+    every product the operations touched, ``0`` meaning removed. Raises
+    ``ValueError`` for an operation that can't apply.
+    """
+    quantities = dict(current)
+    touched = set()
+
+    for operation in operations:
+        product_id = operation.product_id
+        if operation.op == "remove":
+            if not quantities.get(product_id):
+                raise ValueError(f"Product {product_id} is not in the cart")
+            quantities[product_id] = 0
+        elif operation.quantity <= 0:
+            raise ValueError("Quantity must be greater than 0")
+        elif operation.op == "add":
+            quantities[product_id] = quantities.get(product_id, 0) + operation.quantity
+        else:
+            if not quantities.get(product_id):
+                raise ValueError(f"Product {product_id} is not in the cart")
+            quantities[product_id] = operation.quantity
+        touched.add(product_id)
+
+    return {product_id: quantities[product_id] for product_id in touched}
@@ -0,0 +1,181 @@
+"""
+Shared read path for catalog listing endpoints.
+
+Catalog responses only need a handful of product columns, so listings select
+those columns as plain row tuples instead of loading full ``Product`` entities
+(which drag in long text fields and identity-map bookkeeping).
+
+Stock changes with every cart write, so it doesn't invalidate the catalog
+version. Cached catalog responses are served with the stock of their products
+read live instead, and their ETag is derived from that live body.
+"""
+
+import json
+from typing import Any, Dict, Iterable, List, Optional
+
+from fastapi import Query as QueryParam
+from fastapi import Request, Response
+from redis import Redis
+from sqlalchemy import select
+from sqlalchemy.orm import Query, Session
+
+from app.core.cache import etag_matches, get_cached_entry, make_etag, not_modified, render_json, store_response
+from app.models import Category, Product
+from app.search.fulltext import apply_search
+
+# Category reported for every product until categories are exposed in listings
+DEFAULT_CATEGORY = "Electronics"
+
+# Columns backing the simple product response, in response order
+CATALOG_COLUMNS = (
+    Product.id,
+    Product.name,
+    Product.description,
+    Product.price,
+    Product.stock_quantity,
+    Product.image_url,
+    Product.created_at,
+)
+
+
+class CatalogFilters:
+    """Filter parameters shared by catalog listings and their facet counts."""
+
+    def __init__(
+        self,
+        category: Optional[str] = QueryParam(None, description="Filter by category"),
+        search: Optional[str] = QueryParam(None, description="Search in product names and descriptions"),
+        min_price: Optional[float] = QueryParam(None, ge=0, description="Minimum price filter"),
+        max_price: Optional[float] = QueryParam(None, ge=0, description="Maximum price filter")
+    ):
+        self.category = category
+        self.search = search
+        self.min_price = min_price
+        self.max_price = max_price
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Get the filters as a plain dict (e.g. for cache keys)."""
+        return {
+            "category": self.category,
+            "search": self.search,
+            "min_price": self.min_price,
+            "max_price": self.max_price
+        }
+
+
+def apply_catalog_filters(query: Query, filters: CatalogFilters) -> Query:
+    """Restrict a product query to the products matching ``filters``."""
+    if filters.category:
+        category_ids = select(Category.id).where(Category.name == filters.category)
+        query = query.filter(Product.category_id.in_(category_ids))
+
+    if filters.search:
+        query = apply_search(query, filters.search)
+
+    if filters.min_price is not None:
+        query = query.filter(Product.price >= filters.min_price)
+
+    if filters.max_price is not None:
+        query = query.filter(Product.price <= filters.max_price)
+
+    return query
+
+
+def catalog_query(db: Session) -> Query:
+    """Start a query that yields lightweight catalog rows."""
+    return db.query(*CATALOG_COLUMNS)
+
+
+def serialize_catalog_row(row: Any) -> Dict[str, Any]:
+    """Convert a catalog row (or a Product) to the simple product response."""
+    return {
+        "id": row.id,
+        "name": row.name,
+        "description": row.description,
+        "price": row.price,
+        "category": DEFAULT_CATEGORY,
+        "stock": row.stock_quantity,
+        "image_url": row.image_url,
+        "created_at": row.created_at
+    }
+
+
+def serialize_catalog_rows(rows: Iterable[Any]) -> List[Dict[str, Any]]:
+    """Convert catalog rows to response dicts in a single pass."""
+    return [serialize_catalog_row(row) for row in rows]
+
+
+def fetch_catalog_rows(db: Session, product_ids: List[int]) -> List[Any]:
+    """Load catalog rows for the given ids, preserving the order of the ids."""
+    if not product_ids:
+        return []
+    rows = catalog_query(db).filter(Product.id.in_(product_ids)).all()
+    by_id = {row.id: row for row in rows}
+    return [by_id[product_id] for product_id in product_ids if product_id in by_id]
+
+
+def _catalog_items(content: Any) -> List[Dict[str, Any]]:
+    """The product dicts of a catalog response: a list, a cursor page or one product."""
+    if isinstance(content, list):
+        return content
+    if "items" in content:
+        return content["items"]
+    return [content]
+
+
+def refresh_stock(db: Session, content: Any) -> Any:
+    """Replace the stock of every product in a catalog response with its live value."""
+    items = _catalog_items(content)
+    if items:
+        stock = dict(db.query(Product.id, Product.stock_quantity).filter(
+            Product.id.in_([item["id"] for item in items])
+        ))
+        for item in items:
+            item["stock"] = stock.get(item["id"], item["stock"])
+    return content
+
+
+def get_cached_catalog_response(redis: Redis, request: Request, db: Session) -> Optional[Response]:
+    """
+    Serve an anonymous catalog response from the cache, with live stock.
+
+    The cached body is only invalidated by catalog edits, so the stock of
+    its products is read again (one primary key lookup) before the body
+    and its ETag are rebuilt.
+    """
+    entry = get_cached_entry(redis, request)
+    if entry is None:
+        return None
+
+    body = render_json(refresh_stock(db, json.loads(entry.pop("body"))))
+    headers = {name[2:]: value for name, value in entry.items() if name.startswith("h:")}
+    headers["ETag"] = make_etag(body.decode("utf-8"))
+    if etag_matches(request, headers["ETag"]):
+        return not_modified(headers["ETag"])
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def cache_catalog_response(
+    redis: Redis,
+    request: Request,
+    content: Any,
+    headers: Optional[Dict[str, str]] = None,
+    etag: bool = False
+) -> Response:
+    """
+    Serialize a catalog response, store it for anonymous reads and return it.
+
+    Responses that went through ``get_cached_catalog_response`` carry an
+    ETag of their body; with ``etag`` every response does.
+    """
+    headers = dict(headers or {})
+    body = render_json(content)
+    key = getattr(request.state, "response_cache_key", None)
+    if key is not None:
+        store_response(redis, key, body, headers)
+
+    if key is not None or etag:
+        headers["ETag"] = make_etag(body.decode("utf-8"))
+        if etag_matches(request, headers["ETag"]):
+            return not_modified(headers["ETag"])
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,129 @@
+"""
+Precompiled email templates.
+
+Templates are parsed once, when this module is imported, into their static
+text and the fields between them, so rendering is a single ``str.join``
+over the static parts and the formatted field values. Field values are
+HTML-escaped unless they are ``Safe`` (already rendered HTML). Repeated
+sections such as order items have their own row template; rows are joined
+rather than concatenated in a loop, and recently rendered rows are cached,
+since the same products appear across many orders.
+"""
+
+import re
+from functools import lru_cache
+from html import escape
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# {name} or {name:format_spec}
+_FIELD = re.compile(r"\{(\w+)(?::([^{}]*))?\}")
+
+
+class Safe(str):
+    """Rendered HTML that must not be escaped again."""
+
+
+class CompiledTemplate:
+    """A template split into static text and the fields between it."""
+
+    __slots__ = ("_static", "_fields", "_escape")
+
+    def __init__(self, source: str, html: bool = True):
+        self._static: List[str] = []
+        self._fields: List[Tuple[str, str]] = []
+        position = 0
+        for match in _FIELD.finditer(source):
+            self._static.append(source[position:match.start()])
+            self._fields.append((match.group(1), match.group(2) or ""))
+            position = match.end()
+        self._static.append(source[position:])
+        self._escape = html
+
+    def render(self, **values: Any) -> str:
+        """Fill in the fields; a missing value raises ``KeyError``."""
+        parts = [self._static[0]]
+        for (name, spec), static in zip(self._fields, self._static[1:]):
+            value = format(values[name], spec)
+            if self._escape and not isinstance(values[name], Safe):
+                value = escape(value)
+            parts.append(value)
+            parts.append(static)
+        return "".join(parts)
+
+
+class EmailTemplate:
+    """Subject and HTML body of an email, optionally with a repeated item row."""
+
+    def __init__(self, subject: str, html: str, item: Optional[str] = None):
+        self.subject = CompiledTemplate(subject, html=False)
+        self.html = CompiledTemplate(html)
+        self.item = CompiledTemplate(item) if item is not None else None
+        # Bound per template so each row template has its own cache
+        self._render_item = lru_cache(maxsize=4096)(self._render_item_uncached)
+
+    def _render_item_uncached(self, fields: Tuple[Tuple[str, Any], ...]) -> str:
+        return self.item.render(**dict(fields))
+
+    def render(self, items: Iterable[Dict[str, Any]] = (), **values: Any) -> Tuple[str, str]:
+        """Render the subject and HTML body; ``items`` fill ``{items_html}``."""
+        if self.item is not None:
+            values["items_html"] = Safe("".join(
+                self._render_item(tuple(sorted(item.items()))) for item in items
+            ))
+        return self.subject.render(**values), self.html.render(**values)
+
+
+WELCOME = EmailTemplate(
+    subject="Welcome to Modern Ecommerce Platform!",
+    html="""
+        <html>
+            <body>
+                <h1>Welcome, {user_name}!</h1>
+                <p>Thank you for joining our modern ecommerce platform.</p>
+                <p>We're excited to provide you with:</p>
+                <ul>
+                    <li>AI-powered product recommendations</li>
+                    <li>Modern payment methods including cryptocurrency</li>
+                    <li>Seamless shopping experience</li>
+                </ul>
+                <p>Start exploring our products today!</p>
+            </body>
+        </html>
+        """
+)
+
+ORDER_CONFIRMATION = EmailTemplate(
+    subject="Order Confirmation - {order_number}",
+    html="""
+        <html>
+            <body>
+                <h1>Order Confirmation</h1>
+                <p>Thank you for your order!</p>
+                <p><strong>Order Number:</strong> {order_number}</p>
+                <p><strong>Total:</strong> ${order_total:.2f}</p>
+
+                <h2>Order Items:</h2>
+                <ul>{items_html}</ul>
+
+                <p>We'll send you tracking information once your order ships.</p>
+            </body>
+        </html>
+        """,
+    item="<li>{name} - ${price:.2f} x {quantity}</li>"
+)
+
+PASSWORD_RESET = EmailTemplate(
+    subject="Password Reset Request",
+    html="""
+        <html>
+            <body>
+                <h1>Password Reset Request</h1>
+                <p>You requested a password reset for your account.</p>
+                <p>Click the link below to reset your password:</p>
+                <p><a href="{reset_url}?token={reset_token}">Reset Password</a></p>
+                <p>If you didn't request this, please ignore this email.</p>
+                <p>This link will expire in 1 hour.</p>
+            </body>
+        </html>
+        """
+)
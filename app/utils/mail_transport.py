@@ -0,0 +1,226 @@
+"""
+Pooled SMTP transport.
+
+``smtplib`` is blocking, so messages are sent from worker threads over a
+small pool of connections that stay open and authenticated between
+messages: connect, STARTTLS and login happen once per connection rather
+than once per email, and a batch of messages goes out over one connection.
+Servers drop sessions that sit idle too long, so an idle connection is
+checked with NOOP before it is reused.
+``AsyncMailTransport`` exposes this to async code, either per message or
+through a queue that bulk senders ``enqueue`` into.
+"""
+
+import asyncio
+import logging
+import queue
+import smtplib
+import threading
+from contextlib import contextmanager
+from email.message import Message
+from typing import Iterator, List, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SMTPConnectionPool:
+    """Bounded pool of open, authenticated SMTP connections shared by threads."""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        user: Optional[str] = None,
+        password: Optional[str] = None,
+        size: int = 4,
+        starttls: bool = True,
+        timeout: float = 30.0,
+        max_messages: int = 100
+    ):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.size = size
+        self.starttls = starttls
+        self.timeout = timeout
+        self.max_messages = max_messages
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle: "queue.LifoQueue[smtplib.SMTP]" = queue.LifoQueue()
+        self._sent = {}
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            server.ehlo()
+            if self.starttls:
+                server.starttls()
+                server.ehlo()
+            if self.user and self.password:
+                server.login(self.user, self.password)
+        except Exception:
+            server.close()
+            raise
+        self._sent[server] = 0
+        return server
+
+    def _discard(self, server: smtplib.SMTP) -> None:
+        self._sent.pop(server, None)
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    def _alive(self, server: smtplib.SMTP) -> bool:
+        try:
+            return server.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def _checkout(self) -> smtplib.SMTP:
+        """Take an idle connection that still answers, or open a new one."""
+        while True:
+            try:
+                server = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if self._alive(server):
+                return server
+            self._discard(server)
+
+    @contextmanager
+    def connection(self) -> Iterator[smtplib.SMTP]:
+        """Borrow a connection, opening one if none is idle."""
+        with self._slots:
+            server = self._checkout()
+            try:
+                yield server
+            except Exception:
+                self._discard(server)
+                raise
+            # Servers limit messages per session, so connections are recycled
+            if self._sent.get(server, self.max_messages) >= self.max_messages:
+                self._discard(server)
+            else:
+                self._idle.put(server)
+
+    def send_batch(self, messages: List[Message]) -> List[bool]:
+        """Send messages over one connection, returning which were accepted."""
+        results = []
+        remaining = list(messages)
+        while remaining:
+            connected = False
+            try:
+                with self.connection() as server:
+                    connected = True
+                    while remaining and self._sent[server] < self.max_messages:
+                        message = remaining.pop(0)
+                        self._sent[server] += 1
+                        try:
+                            # sendmail resets the session itself when a message is refused
+                            server.send_message(message)
+                            results.append(True)
+                        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError) as e:
+                            logger.warning(f"SMTP server rejected email to {message['To']}: {e}")
+                            results.append(False)
+            except (smtplib.SMTPException, OSError) as e:
+                if not connected:
+                    logger.error(f"Could not connect to SMTP server {self.host}:{self.port}: {e}")
+                    results.extend([False] * len(remaining))
+                    return results
+                # The connection dropped mid-message; the rest go out on a fresh one
+                logger.error(f"Error sending email: {e}")
+                results.append(False)
+        return results
+
+    def close(self) -> None:
+        """Close all idle connections."""
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+
+class AsyncMailTransport:
+    """Sends email through an ``SMTPConnectionPool`` without blocking the event loop."""
+
+    def __init__(self, pool: SMTPConnectionPool, batch_size: int = 50):
+        self.pool = pool
+        self.batch_size = batch_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+    async def send(self, message: Message) -> bool:
+        """Send one message."""
+        results = await asyncio.to_thread(self.pool.send_batch, [message])
+        return results[0]
+
+    async def send_many(self, messages: List[Message]) -> List[bool]:
+        """Send messages in batches spread over the pool's connections."""
+        batches = [messages[i:i + self.batch_size] for i in range(0, len(messages), self.batch_size)]
+        results = await asyncio.gather(*(asyncio.to_thread(self.pool.send_batch, batch) for batch in batches))
+        return [accepted for batch in results for accepted in batch]
+
+    async def _work(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            # Take whatever else is already waiting, up to a batch
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                results = await asyncio.to_thread(self.pool.send_batch, [message for message, _ in batch])
+            except Exception as e:
+                logger.error(f"Error sending email batch: {e}")
+                results = [False] * len(batch)
+            for (_, delivered), accepted in zip(batch, results):
+                if not delivered.done():
+                    delivered.set_result(accepted)
+                self._queue.task_done()
+
+    async def enqueue(self, message: Message) -> "asyncio.Future[bool]":
+        """
+        Queue a message for delivery, returning a future of whether it was accepted.
+
+        Queued messages are sent by one worker per pooled connection in
+        batches of up to ``batch_size``; the first call starts the workers.
+        """
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._workers = [asyncio.create_task(self._work()) for _ in range(self.pool.size)]
+        delivered = asyncio.get_running_loop().create_future()
+        await self._queue.put((message, delivered))
+        return delivered
+
+    async def join(self) -> None:
+        """Wait until every queued message has been handled."""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def close(self) -> None:
+        """Deliver queued messages, stop the workers and close the connections."""
+        await self.join()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._queue, self._workers = None, []
+        await asyncio.to_thread(self.pool.close)
+
+
+def create_transport() -> AsyncMailTransport:
+    """Build the mail transport from the SMTP settings."""
+    return AsyncMailTransport(
+        SMTPConnectionPool(
+            settings.SMTP_HOST,
+            settings.SMTP_PORT,
+            settings.SMTP_USER,
+            settings.SMTP_PASSWORD,
+            size=settings.SMTP_POOL_SIZE,
+            starttls=settings.SMTP_STARTTLS,
+            timeout=settings.SMTP_TIMEOUT,
+            max_messages=settings.SMTP_MAX_MESSAGES_PER_CONNECTION
+        ),
+        batch_size=settings.SMTP_BATCH_SIZE
+    )
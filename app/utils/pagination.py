@@ -0,0 +1,80 @@
+"""
+Keyset (cursor) pagination helpers.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional, Tuple
+
+from sqlalchemy import and_, or_
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def encode_cursor(sort_by: str, sort_order: str, value: Any, last_id: int) -> str:
+    """Encode the position after the last row of a page as an opaque cursor."""
+    if isinstance(value, datetime):
+        value = {"dt": value.isoformat()}
+    payload = json.dumps([sort_by, sort_order, value, last_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_by: str, sort_order: str) -> Optional[Tuple[Any, int]]:
+    """
+    Decode a cursor into its (sort value, id) position.
+
+    An empty cursor means "first page" and decodes to None. A cursor created
+    for a different sort is rejected, since its position is meaningless there.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort_by, cursor_sort_order, value, last_id = json.loads(
+            base64.urlsafe_b64decode(padded.encode())
+        )
+        if isinstance(value, dict):
+            value = datetime.fromisoformat(value["dt"])
+        elif isinstance(value, bool) or not isinstance(value, (int, float, str)):
+            raise TypeError("Cursor sort value must be a scalar")
+        last_id = int(last_id)
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursorError("Malformed cursor")
+
+    if (cursor_sort_by, cursor_sort_order) != (sort_by, sort_order):
+        raise InvalidCursorError("Cursor does not match the requested sort order")
+    return value, last_id
+
+
+def apply_keyset(query, sort_column, id_column, sort_order: str, position: Optional[Tuple[Any, int]]):
+    """
+    Order a query by (sort column, id) and seek past the given position.
+
+    The seek predicate only touches rows after the cursor, so the cost of a
+    page is independent of how deep it is when (sort column, id) is indexed.
+    """
+    descending = sort_order == "desc"
+
+    if position is not None:
+        value, last_id = position
+        if sort_column is id_column:
+            query = query.filter(id_column < last_id if descending else id_column > last_id)
+        elif descending:
+            query = query.filter(or_(
+                sort_column < value,
+                and_(sort_column == value, id_column < last_id)
+            ))
+        else:
+            query = query.filter(or_(
+                sort_column > value,
+                and_(sort_column == value, id_column > last_id)
+            ))
+
+    if sort_column is id_column:
+        return query.order_by(id_column.desc() if descending else id_column.asc())
+    if descending:
+        return query.order_by(sort_column.desc(), id_column.desc())
+    return query.order_by(sort_column.asc(), id_column.asc())
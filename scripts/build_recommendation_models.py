@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Build the offline recommendation models from recorded user behavior.
+
+Run nightly (or after large imports); API workers pick up the new model
+files on their next request.
+"""
+
+import argparse
+import sys
+import os
+import time
+from datetime import datetime, timezone
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings
+from app.database import SessionLocal
+from app.ai.interactions import load_interactions
+from app.ai.item_similarity import ItemSimilarityModel
+from app.ai.als import ALSModel
+from app.ai.ann import IVFIndex
+from app.ai.content import (
+    ContentVectors, content_embeddings, fit_vectorizer, product_documents, save_vectorizer
+)
+
+
+def build_models(top_k: int, factors: int, iterations: int, threads: int):
+    """Build and save the item-item similarity, ALS and similar-product models."""
+    db = SessionLocal()
+    try:
+        started = time.time()
+        interactions = load_interactions(db)
+        print(f"📊 Loaded {interactions.matrix.nnz} interactions "
+              f"({len(interactions.user_ids)} users, {len(interactions.item_ids)} products) "
+              f"in {time.time() - started:.1f}s")
+        read_at = datetime.now(timezone.utc)
+        product_ids, documents = product_documents(db)
+    finally:
+        db.close()
+
+    started = time.time()
+    model = ItemSimilarityModel.build(interactions, top_k)
+    model.save(settings.ITEM_SIMILARITY_PATH)
+    print(f"✅ Item similarity model saved to {settings.ITEM_SIMILARITY_PATH} in {time.time() - started:.1f}s")
+
+    started = time.time()
+    model = ALSModel.train(
+        interactions,
+        factors=factors,
+        regularization=settings.ALS_REGULARIZATION,
+        alpha=settings.ALS_ALPHA,
+        iterations=iterations,
+        threads=threads or None
+    )
+    model.save(settings.ALS_MODEL_PATH)
+    print(f"✅ ALS model saved to {settings.ALS_MODEL_PATH} in {time.time() - started:.1f}s")
+
+    started = time.time()
+    IVFIndex.build(model.item_ids, model.item_factors).save(settings.ITEM_INDEX_PATH)
+    print(f"✅ Item index saved to {settings.ITEM_INDEX_PATH} in {time.time() - started:.1f}s")
+
+    if not documents:
+        print("⚠️ No products to vectorize; skipping the content models")
+        return
+
+    started = time.time()
+    vectorizer = fit_vectorizer(documents)
+    vectors = ContentVectors.build(vectorizer, product_ids, documents, read_at)
+    save_vectorizer(vectorizer, settings.CONTENT_VECTORIZER_PATH)
+    vectors.save(settings.CONTENT_VECTORS_PATH)
+    print(f"✅ TF-IDF vectors ({len(vectorizer.vocabulary_)} terms) saved to {settings.CONTENT_VECTORS_PATH} "
+          f"in {time.time() - started:.1f}s")
+
+    started = time.time()
+    IVFIndex.build(vectors.product_ids, content_embeddings(vectors, settings.CONTENT_EMBEDDING_DIM)).save(
+        settings.CONTENT_INDEX_PATH
+    )
+    print(f"✅ Content index for {len(vectors)} products saved to {settings.CONTENT_INDEX_PATH} "
+          f"in {time.time() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build recommendation models")
+    parser.add_argument("--top-k", type=int, default=settings.ITEM_SIMILARITY_TOP_K, help="neighbours kept per product")
+    parser.add_argument("--factors", type=int, default=settings.ALS_FACTORS, help="ALS latent factors")
+    parser.add_argument("--iterations", type=int, default=settings.ALS_ITERATIONS, help="ALS iterations")
+    parser.add_argument("--threads", type=int, default=settings.ALS_THREADS, help="ALS training threads (0 = all CPUs)")
+    args = parser.parse_args()
+    build_models(args.top_k, args.factors, args.iterations, args.threads)
@@ -9,14 +9,21 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.ai.ml_service import MLService
-from app.database import SessionLocal
+from app.core.cache import bump_catalog_version
+from app.database import SessionLocal, engine, redis_client
 from app.models.product import Product
 from app.schemas.product import ProductCreate
+from app.search.change_feed import register_change_feed
+from app.search.fulltext import install_fulltext_index
 import json
 
 async def generate_and_store_products(count: int = 1000, category: str = None):
     """Generate and store products in the database."""
     ml_service = MLService()
+    
+    # Make sure new products are indexed for search as they are inserted
+    install_fulltext_index(engine)
+    register_change_feed(SessionLocal)
     db = SessionLocal()
     
     try:
@@ -69,8 +76,9 @@ async def generate_and_store_products(count: int = 1000, category: str = None):
                     print(f"Error creating product {product_data['name']}: {e}")
                     continue
             
-            # Commit batch
+            # Commit batch; cached counts and listings must see the new products
             db.commit()
+            bump_catalog_version(redis_client)
             print(f"Batch {i//batch_size + 1} completed. Total generated: {total_generated}")
         
         print(f"Successfully generated {total_generated} products!")
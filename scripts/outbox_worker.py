@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Outbox worker process.
+
+Runs the side effects that checkout records in the outbox (confirmation
+emails, purchase behavior logging, recommendation updates). Run one or more
+alongside the API; use --once to drain what is due and exit.
+"""
+
+import argparse
+import asyncio
+import logging
+import signal
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings
+from app.outbox.worker import outbox_worker
+from app.utils.email_service import email_service
+
+
+async def main(once: bool = False):
+    """Drain the outbox once, or until SIGINT/SIGTERM."""
+    try:
+        await drain(once)
+    finally:
+        await email_service.close()
+
+
+async def drain(once: bool):
+    """Drain due events once, or run the worker until stopped."""
+    if once:
+        total = 0
+        while True:
+            leased = await outbox_worker.drain_once()
+            total += leased
+            if leased < outbox_worker.batch_size:
+                break
+        print(f"✅ Processed {total} outbox events")
+        return
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+
+    print("📬 Outbox worker started")
+    await outbox_worker.run(stop, settings.OUTBOX_POLL_INTERVAL)
+    print("👋 Outbox worker stopped")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run outbox events")
+    parser.add_argument("--once", action="store_true", help="drain due events and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=settings.LOG_LEVEL)
+    asyncio.run(main(args.once))
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Precompute the stored recommendations of every active user.
+
+Run after scripts/build_recommendation_models.py; the recommendation
+endpoints serve the stored rows.
+"""
+
+import argparse
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings
+from app.ai.precompute import precompute_all
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute stored recommendations")
+    parser.add_argument("--limit", type=int, default=settings.STORED_RECOMMENDATION_LIMIT, help="recommendations per user")
+    parser.add_argument("--active-days", type=int, default=settings.RECOMMENDATION_ACTIVE_DAYS, help="users active within this many days")
+    parser.add_argument("--chunk-size", type=int, default=settings.PRECOMPUTE_CHUNK_SIZE, help="users per worker task")
+    parser.add_argument("--workers", type=int, default=settings.PRECOMPUTE_WORKERS, help="worker processes (0 = all CPUs)")
+    args = parser.parse_args()
+
+    started = time.time()
+    users, rows = precompute_all(args.limit, args.active_days, args.chunk_size, args.workers)
+    print(f"✅ Stored {rows} recommendations for {users} active users in {time.time() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
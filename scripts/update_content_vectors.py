@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Vectorize products added or edited since the content vectors were built.
+
+Only the changed products are transformed, with the vectorizer fitted by
+the last full build (scripts/build_recommendation_models.py), so this is
+cheap enough to run every few minutes. Deleted products are dropped. API workers pick up the new vectors
+on their next request.
+"""
+
+import sys
+import os
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings
+from app.database import SessionLocal
+from app.ai.content import ContentVectors, catalog_product_ids, load_vectorizer, product_documents
+
+
+def update_content_vectors():
+    """Merge the TF-IDF vectors of recently changed products into the saved vectors."""
+    if not os.path.exists(settings.CONTENT_VECTORS_PATH):
+        print("❌ No content vectors yet; run scripts/build_recommendation_models.py first")
+        return
+
+    vectors = ContentVectors.load(settings.CONTENT_VECTORS_PATH)
+    vectorizer = load_vectorizer(settings.CONTENT_VECTORIZER_PATH)
+
+    db = SessionLocal()
+    try:
+        read_at = datetime.now(timezone.utc)
+        product_ids, documents = product_documents(db, changed_since=vectors.read_at)
+        catalog_ids = catalog_product_ids(db)
+    finally:
+        db.close()
+
+    deleted = int((~np.isin(vectors.product_ids, catalog_ids)).sum())
+    if not len(product_ids) and not deleted:
+        print("✅ Content vectors are up to date")
+        return
+
+    started = time.time()
+    vectors.updated(vectorizer, product_ids, documents, read_at, catalog_ids).save(settings.CONTENT_VECTORS_PATH)
+    print(f"✅ Vectorized {len(product_ids)} changed products and dropped {deleted} deleted ones "
+          f"in {time.time() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    update_content_vectors()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Tests for the implicit ALS recommender.
+"""
+
+import os
+import tempfile
+
+import numpy as np
+
+from app.ai import als
+from app.ai.als import ALSModel
+from app.ai.interactions import interaction_matrix
+
+
+def _clustered_interactions(seed=0):
+    """Two groups of users, each interacting with its own half of the catalog."""
+    rng = np.random.default_rng(seed)
+    users, items = [], []
+    for user in range(1, 201):
+        group = user % 2
+        for item in rng.choice(20, 6, replace=False):
+            users.append(user)
+            items.append(1000 + group * 20 + item)
+    weights = rng.choice([1.0, 4.0, 8.0], len(users)).astype(np.float32)
+    return interaction_matrix(np.array(users), np.array(items), weights)
+
+
+def test_conjugate_gradient_matches_exact_solve():
+    interactions = _clustered_interactions()
+    confidence = interactions.matrix.astype(np.float32).tocsr()
+    confidence.data = 1.0 + 10.0 * np.log1p(confidence.data)
+    rng = np.random.default_rng(1)
+    items = rng.standard_normal((confidence.shape[1], 8)).astype(np.float32)
+    users = np.zeros((confidence.shape[0], 8), dtype=np.float32)
+    gram = items.T @ items + 0.1 * np.eye(8, dtype=np.float32)
+
+    als._solve_rows(confidence, 0, confidence.shape[0], users, items, gram, cg_steps=20)
+
+    for row in range(0, confidence.shape[0], 37):
+        observed = confidence[row]
+        weighted = items[observed.indices]
+        a = gram + weighted.T @ ((observed.data - 1.0)[:, None] * weighted)
+        b = weighted.T @ observed.data
+        np.testing.assert_allclose(users[row], np.linalg.solve(a, b), rtol=1e-3, atol=1e-3)
+
+
+def test_recommends_items_from_the_users_group():
+    interactions = _clustered_interactions()
+    # Two latent groups: more factors would start fitting noise in this tiny matrix
+    model = ALSModel.train(interactions, factors=2, iterations=10, threads=2)
+
+    for user_id in (1, 2, 51, 100):
+        seen = interactions.item_ids[interactions.matrix[np.searchsorted(interactions.user_ids, user_id)].indices]
+        ranked = model.recommend(user_id, 10, exclude=seen.tolist())
+        group_start = 1000 + (user_id % 2) * 20
+        assert len(ranked) == 10
+        assert not set(seen.tolist()) & {product for product, _ in ranked}
+        assert all(group_start <= product < group_start + 20 for product, _ in ranked)
+        assert [score for _, score in ranked] == sorted((score for _, score in ranked), reverse=True)
+
+    assert model.recommend(9999, 10) == []
+
+
+def test_training_is_independent_of_thread_count():
+    interactions = _clustered_interactions()
+    single = ALSModel.train(interactions, factors=8, iterations=3, threads=1)
+    threaded = ALSModel.train(interactions, factors=8, iterations=3, threads=4)
+
+    np.testing.assert_allclose(single.user_factors, threaded.user_factors, rtol=1e-5, atol=1e-6)
+    np.testing.assert_allclose(single.item_factors, threaded.item_factors, rtol=1e-5, atol=1e-6)
+
+
+def test_save_and_memory_mapped_load_round_trip():
+    interactions = _clustered_interactions()
+    model = ALSModel.train(interactions, factors=8, iterations=2)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "als.bin")
+        model.save(path)
+        loaded = ALSModel.load(path)
+
+        assert isinstance(loaded.item_factors, np.memmap)
+        assert loaded.item_factors.dtype == np.float32
+        assert loaded.recommend(3, 5) == model.recommend(3, 5)
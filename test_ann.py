@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Tests for the IVF nearest-neighbour index and content embeddings.
+"""
+
+import os
+import tempfile
+from datetime import datetime
+
+import numpy as np
+
+from app.ai.ann import IVFIndex
+from app.ai.content import ContentVectors, content_embeddings, document_text, fit_vectorizer
+
+
+def _clustered_vectors(seed=0, items=2000, dimensions=16):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((40, dimensions))
+    vectors = centers[rng.integers(0, 40, items)] + 0.3 * rng.standard_normal((items, dimensions))
+    product_ids = rng.permutation(items) * 7 + 3
+    return product_ids, vectors.astype(np.float32)
+
+
+def _brute_force(product_ids, vectors, product_id, limit):
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    position = int(np.flatnonzero(product_ids == product_id)[0])
+    scores = unit @ unit[position]
+    scores[position] = -np.inf
+    return product_ids[np.argsort(-scores)[:limit]].tolist()
+
+
+def test_probing_every_list_is_exact():
+    product_ids, vectors = _clustered_vectors()
+    index = IVFIndex.build(product_ids, vectors)
+
+    for product_id in product_ids[:25]:
+        found = index.similar(int(product_id), 10, nprobe=len(index.centroids))
+        assert [product for product, _ in found] == _brute_force(product_ids, vectors, product_id, 10)
+        assert [score for _, score in found] == sorted((score for _, score in found), reverse=True)
+
+
+def test_few_probes_keep_high_recall():
+    product_ids, vectors = _clustered_vectors(seed=1)
+    index = IVFIndex.build(product_ids, vectors)
+
+    recall = np.mean([
+        len(set(_brute_force(product_ids, vectors, product_id, 10))
+            & {product for product, _ in index.similar(int(product_id), 10, nprobe=8)}) / 10
+        for product_id in product_ids[:100]
+    ])
+    assert recall > 0.9
+
+
+def test_unknown_products_and_empty_index():
+    product_ids, vectors = _clustered_vectors()
+    index = IVFIndex.build(product_ids, vectors)
+    assert index.similar(-1, 10, nprobe=4) == []
+
+    empty = IVFIndex.build(np.empty(0, dtype=np.int64), np.empty((0, 8), dtype=np.float32))
+    assert empty.similar(3, 10, nprobe=4) == []
+
+
+def test_save_and_memory_mapped_load_round_trip():
+    product_ids, vectors = _clustered_vectors()
+    index = IVFIndex.build(product_ids, vectors)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "index.bin")
+        index.save(path)
+        loaded = IVFIndex.load(path)
+
+        assert isinstance(loaded.vectors, np.memmap)
+        assert loaded.similar(int(product_ids[0]), 10, nprobe=8) == index.similar(int(product_ids[0]), 10, nprobe=8)
+
+
+def test_content_embeddings_group_similar_documents():
+    documents = [
+        document_text("Trail Running Shoes", "Lightweight shoes for trail running", '["running", "shoes"]', "Sports"),
+        document_text("Road Running Shoes", "Cushioned running shoes for the road", '["running", "shoes"]', "Sports"),
+        document_text("Espresso Machine", "Brews espresso and cappuccino", '["coffee", "kitchen"]', "Home"),
+        document_text("Coffee Grinder", "Burr grinder for espresso coffee", '["coffee", "kitchen"]', "Home"),
+    ]
+    vectors = ContentVectors.build(fit_vectorizer(documents), np.arange(1, 5), documents, datetime.utcnow())
+    embeddings = content_embeddings(vectors, dimensions=2)
+    index = IVFIndex.build(np.arange(1, 5), embeddings, lists=1)
+
+    assert index.similar(1, 1, nprobe=1)[0][0] == 2
+    assert index.similar(3, 1, nprobe=1)[0][0] == 4
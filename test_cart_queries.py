@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Query-count tests for the cart read and checkout paths.
+
+Reading or checking out a cart must cost a constant number of SQL
+statements, however many items the cart holds.
+"""
+
+from contextlib import contextmanager
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base, get_db
+from app.main import app
+from app.models import Cart, CartItem, Category, Order, Product
+
+engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def _override_get_db():
+    db = TestingSession()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@contextmanager
+def _count_statements():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def _fill_cart(item_count):
+    """Reset the database to a cart for user 1 holding ``item_count`` products."""
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    db = TestingSession()
+    db.add(Category(id=1, name="Electronics", slug="electronics"))
+    cart = Cart(user_id=1)
+    db.add(cart)
+    db.flush()
+    for i in range(1, item_count + 1):
+        db.add(Product(id=i, name=f"Product {i}", sku=f"SKU-{i}", price=10.0, stock_quantity=5, category_id=1))
+        db.add(CartItem(cart_id=cart.id, product_id=i, quantity=2))
+    db.commit()
+    db.close()
+
+
+def _statements_for(method, path, item_count):
+    _fill_cart(item_count)
+    client = TestClient(app)
+    app.dependency_overrides[get_db] = _override_get_db
+    try:
+        with _count_statements() as statements:
+            response = client.request(method, path)
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+    assert response.status_code == 200, response.text
+    return response.json(), len(statements)
+
+
+def test_get_cart_query_count_is_constant():
+    """get_cart loads the cart, items and products in one query."""
+    small, small_count = _statements_for("GET", "/api/v1/cart/", 1)
+    large, large_count = _statements_for("GET", "/api/v1/cart/", 40)
+
+    assert small["item_count"] == 1
+    assert large["item_count"] == 40
+    assert large["total"] == 40 * 2 * 10.0
+    assert small_count == large_count == 1
+
+
+def test_checkout_query_count_is_constant():
+    """checkout places the order and its items without per-item statements."""
+    _, small_count = _statements_for("POST", "/api/v1/cart/checkout", 1)
+    result, large_count = _statements_for("POST", "/api/v1/cart/checkout", 50)
+
+    assert result["total"] == 50 * 2 * 10.0
+    assert small_count == large_count <= 12
+
+    db = TestingSession()
+    order = db.query(Order).filter(Order.order_number == result["order_id"]).one()
+    assert order.subtotal == order.total_amount == result["total"]
+    assert len(order.items) == 50
+    assert {(item.product_name, item.product_sku) for item in order.items} == {
+        (f"Product {i}", f"SKU-{i}") for i in range(1, 51)
+    }
+    assert db.query(CartItem).count() == 0
+    db.close()
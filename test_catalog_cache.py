@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Tests for the Redis catalog caches: listing counts, anonymous responses and ETags.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import fakeredis
+from fastapi.testclient import TestClient
+from redis import Redis
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.security import get_current_user
+from app.core.cache import bump_catalog_version, cached_count, estimate_count, normalize_filters
+from app.database import Base, get_db, get_redis
+from app.main import app
+from app.inventory.reservations import hold_stock
+from app.models import Category, Product
+from app.search import change_feed
+from scripts import generate_products
+
+engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+unreachable_redis = Redis(port=1, socket_connect_timeout=0.1)
+
+
+def _seed(products=12):
+    """Reset the database to ``products`` products priced 10, 20, ..."""
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    db = TestingSession()
+    db.add(Category(id=1, name="Electronics", slug="electronics"))
+    for product_id in range(1, products + 1):
+        db.add(Product(id=product_id, name=f"Product {product_id}", sku=f"SKU-{product_id}",
+                       price=10.0 * product_id, category_id=1))
+    db.commit()
+    db.close()
+
+
+def _override_get_db():
+    db = TestingSession()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def _client(redis):
+    _seed()
+    app.dependency_overrides[get_db] = _override_get_db
+    app.dependency_overrides[get_redis] = lambda: redis
+    return TestClient(app)
+
+
+def teardown_function():
+    app.dependency_overrides.clear()
+
+
+def _add_product(product_id):
+    db = TestingSession()
+    db.add(Product(id=product_id, name=f"Product {product_id}", sku=f"SKU-{product_id}", price=5.0, category_id=1))
+    db.commit()
+    db.close()
+
+
+def _count(db, redis, **filters):
+    query = db.query(Product)
+    if filters.get("max_price") is not None:
+        query = query.filter(Product.price <= filters["max_price"])
+    return cached_count(query, redis, "products", filters)
+
+
+def test_counts_are_cached_until_the_catalog_version_moves():
+    _seed()
+    redis = fakeredis.FakeRedis(decode_responses=True)
+    db = TestingSession()
+
+    assert _count(db, redis, max_price=50) == 5
+    _add_product(100)
+    # Equivalent filters share the cached count
+    assert _count(db, redis, max_price=50.0) == 5
+
+    bump_catalog_version(redis)
+    assert _count(db, redis, max_price=50) == 6
+    assert _count(db, redis) == 13
+    db.close()
+
+
+def test_filters_are_normalized():
+    assert normalize_filters(search="  Wireless   HEADPHONES ", min_price=10, category=None) == \
+        normalize_filters(min_price=10.0, search="wireless headphones")
+    assert normalize_filters(search="a") != normalize_filters(search="b")
+    assert normalize_filters(category="Electronics") != normalize_filters(category="electronics")
+
+
+def test_category_counts_keep_the_category_case():
+    """Categories match exactly, so spellings differing in case don't share a count."""
+    redis = fakeredis.FakeRedis(decode_responses=True)
+    client = _client(redis)
+
+    lower = client.get("/api/v1/products/", params={"category": "electronics"})
+    assert lower.json() == [] and lower.headers["X-Total-Count"] == "0"
+    exact = client.get("/api/v1/products/", params={"category": "Electronics", "limit": 5})
+    assert len(exact.json()) == 5
+    assert exact.headers["X-Total-Count"] == "12"
+
+
+def test_counts_fall_back_to_the_database():
+    _seed()
+    db = TestingSession()
+    # SQLite has no planner estimate, so an approximate count is exact
+    assert estimate_count(db.query(Product)) is None
+    assert cached_count(db.query(Product), fakeredis.FakeRedis(), "products", {}, approximate=True) == 12
+    assert _count(db, unreachable_redis, max_price=30) == 3
+    db.close()
+
+
+def test_generated_products_invalidate_cached_counts(monkeypatch):
+    _seed()
+    redis = fakeredis.FakeRedis(decode_responses=True)
+    db = TestingSession()
+    assert _count(db, redis) == 12
+
+    class FakeMLService:
+        async def generate_limitless_products(self, count):
+            return [
+                {"name": f"Generated {i}", "description": "d", "short_description": "s", "brand": "Acme",
+                 "price": 20.0, "original_price": 25.0, "is_on_sale": False, "stock_quantity": 3,
+                 "category": "Electronics", "is_featured": False, "is_bestseller": False, "tags": ["new"]}
+                for i in range(count)
+            ]
+
+    monkeypatch.setattr(generate_products, "MLService", FakeMLService)
+    monkeypatch.setattr(generate_products, "SessionLocal", TestingSession)
+    monkeypatch.setattr(generate_products, "engine", engine)
+    monkeypatch.setattr(generate_products, "redis_client", redis)
+    asyncio.run(generate_products.generate_and_store_products(count=5))
+
+    assert _count(db, redis) == 17
+    db.close()
+
+
+def test_anonymous_listings_are_served_from_the_cache():
+    redis = fakeredis.FakeRedis(decode_responses=True)
+    client = _client(redis)
+    params = {"limit": 100, "max_price": 50}
+
+    first = client.get("/api/v1/products/", params=params)
+    assert len(first.json()) == 5
+    _add_product(100)
+
+    cached = client.get("/api/v1/products/", params=params)
+    assert cached.content == first.content
+    assert cached.headers["X-Total-Count"] == first.headers["X-Total-Count"] == "5"
+    assert cached.headers["ETag"] == first.headers["ETag"]
+
+    # Authenticated requests never read (or fill) the cache
+    fresh = client.get("/api/v1/products/", params=params, headers={"Authorization": "Bearer token"})
+    assert len(fresh.json()) == 6
+    assert "ETag" not in fresh.headers
+    assert client.get("/api/v1/products/", params=params).content == first.content
+
+    bump_catalog_version(redis)
+    refreshed = client.get("/api/v1/products/", params=params)
+    assert len(refreshed.json()) == 6
+    assert refreshed.headers["X-Total-Count"] == "6"
+    assert refreshed.headers["ETag"] != first.headers["ETag"]
+
+
+def test_cache_keys_ignore_query_parameter_order():
+    redis = fakeredis.FakeRedis(decode_responses=True)
+    client = _client(redis)
+
+    first = client.get("/api/v1/products/?limit=5&skip=10")
+    assert len(first.json()) == 2
+    _add_product(100)
+    assert client.get("/api/v1/products/?skip=10&limit=5").content == first.content
+
+
+def test_conditional_product_gets():
+    redis = fakeredis.FakeRedis(decode_responses=True)
+    client = _client(redis)
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(user_type="admin")
+
+    first = client.get("/api/v1/products/3")
+    etag = first.headers["ETag"]
+    for header in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+        response = client.get("/api/v1/products/3", headers={"If-None-Match": header})
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag and not response.content
+    assert client.get("/api/v1/products/3", headers={"If-None-Match": '"other"'}).status_code == 200
+
+    # An update in the same second as the creation still moves the ETag
+    assert client.put("/api/v1/products/3", json={"price": 99.0}).status_code == 200
+    updated = client.get("/api/v1/products/3", headers={"If-None-Match": etag})
+    assert updated.status_code == 200
+    assert updated.json()["price"] == 99.0
+    assert updated.headers["ETag"] != etag
+
+
+def test_conditional_gets_follow_stock_holds(monkeypatch):
+    redis = fakeredis.FakeRedis(decode_responses=True)
+    client = _client(redis)
+    change_feed.register_change_feed(TestingSession)
+    monkeypatch.setattr(change_feed, "redis_client", redis)
+    db = TestingSession()
+    db.get(Product, 3).stock_quantity = 10
+    db.commit()
+
+    product = client.get("/api/v1/products/3")
+    listing = client.get("/api/v1/products/")
+    assert client.get("/api/v1/products/", headers={"If-None-Match": listing.headers["ETag"]}).status_code == 304
+
+    hold_stock(db, 1, {3: 4})
+    db.close()
+
+    held = client.get("/api/v1/products/3", headers={"If-None-Match": product.headers["ETag"]})
+    assert held.status_code == 200 and held.json()["stock"] == 6
+    listed = client.get("/api/v1/products/", headers={"If-None-Match": listing.headers["ETag"]})
+    assert listed.status_code == 200 and listed.json()[2]["stock"] == 6
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Tests for the TF-IDF content vectors.
+"""
+
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.ai.content import (
+    ContentVectors, catalog_product_ids, document_text, fit_vectorizer, product_documents
+)
+from app.database import Base
+from app.models import Category, Product
+
+WORDS = ["running", "shoes", "trail", "coffee", "espresso", "grinder", "laptop", "gaming", "keyboard", "wireless",
+         "leather", "bag", "yoga", "mat", "cotton", "shirt", "camera", "lens", "tent", "camping"]
+
+
+def _catalog(seed=0, products=300):
+    rng = np.random.default_rng(seed)
+    product_ids = rng.permutation(products) * 3 + 1
+    documents = [" ".join(rng.choice(WORDS, rng.integers(3, 9))) for _ in range(products)]
+    return product_ids, documents
+
+
+def _dense(vectors):
+    return vectors.matrix().toarray().astype(np.float64)
+
+
+def test_similar_matches_brute_force_cosine():
+    product_ids, documents = _catalog()
+    vectors = ContentVectors.build(fit_vectorizer(documents), product_ids, documents, datetime.utcnow())
+    dense = _dense(vectors)
+
+    for position in range(0, len(vectors), 29):
+        product_id = int(vectors.product_ids[position])
+        scores = dense @ dense[position]
+        scores[position] = -np.inf
+        found = vectors.similar(product_id, 5)
+        np.testing.assert_allclose([score for _, score in found], np.sort(scores)[::-1][:5], rtol=1e-5)
+        for similar_id, score in found:
+            assert abs(scores[np.searchsorted(vectors.product_ids, similar_id)] - score) < 1e-5
+
+
+def test_similar_reranks_only_the_given_candidates():
+    product_ids, documents = _catalog()
+    vectors = ContentVectors.build(fit_vectorizer(documents), product_ids, documents, datetime.utcnow())
+    product_id = int(vectors.product_ids[0])
+    everything = dict(vectors.similar(product_id, len(vectors)))
+    candidates = [int(candidate) for candidate in vectors.product_ids[10:40]]
+
+    found = vectors.similar(product_id, 5, candidates)
+    assert {similar_id for similar_id, _ in found} <= set(candidates)
+    expected = sorted((everything.get(candidate, 0.0) for candidate in candidates), reverse=True)[:5]
+    np.testing.assert_allclose([score for _, score in found], expected, rtol=1e-5)
+
+
+def test_profile_matching_follows_the_weighted_history():
+    documents = [
+        document_text("Trail Running Shoes", "Grippy shoes for trail running", '["running"]', "Sports"),
+        document_text("Road Running Shoes", "Cushioned running shoes", '["running"]', "Sports"),
+        document_text("Running Socks", "Socks for long runs", '["running"]', "Sports"),
+        document_text("Espresso Machine", "Brews espresso", '["coffee"]', "Home"),
+        document_text("Coffee Grinder", "Burr grinder for espresso coffee", '["coffee"]', "Home"),
+    ]
+    product_ids = np.arange(1, 6)
+    vectors = ContentVectors.build(fit_vectorizer(documents), product_ids, documents, datetime.utcnow())
+
+    ranked = vectors.match_profile({1: 8.0, 4: 1.0}, 3)
+    assert [product_id for product_id, _ in ranked][:2] == [2, 3]
+    assert not {1, 4} & {product_id for product_id, _ in ranked}
+    assert vectors.match_profile({999: 1.0}, 3) == []
+
+
+def test_partial_update_matches_a_full_rebuild():
+    product_ids, documents = _catalog()
+    vectorizer = fit_vectorizer(documents)
+    vectors = ContentVectors.build(vectorizer, product_ids[:250], documents[:250], datetime.utcnow())
+
+    # Products 250+ are new; the first two existing products were edited
+    edited = {0: "gaming laptop keyboard", 1: "espresso coffee grinder"}
+    changed_ids = np.concatenate([product_ids[:2], product_ids[250:]])
+    changed_documents = [edited[0], edited[1]] + documents[250:]
+    updated = vectors.updated(vectorizer, changed_ids, changed_documents, datetime.utcnow())
+
+    final_documents = [edited.get(i, document) for i, document in enumerate(documents)]
+    rebuilt = ContentVectors.build(vectorizer, product_ids, final_documents, datetime.utcnow())
+    np.testing.assert_array_equal(updated.product_ids, rebuilt.product_ids)
+    np.testing.assert_allclose(_dense(updated), _dense(rebuilt), rtol=1e-6)
+    np.testing.assert_array_equal(updated.term_rows, rebuilt.term_rows)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "content.bin")
+        updated.save(path)
+        loaded = ContentVectors.load(path)
+        assert isinstance(loaded.data, np.memmap)
+        assert loaded.read_at == updated.read_at
+        assert loaded.similar(int(product_ids[3]), 5) == updated.similar(int(product_ids[3]), 5)
+
+
+def test_product_documents_reads_only_changed_products():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    old, new = datetime.utcnow() - timedelta(days=2), datetime.utcnow()
+    db.add(Category(id=1, name="Outdoors", slug="outdoors"))
+    db.add(Product(id=1, name="Tent", description="Two person tent", tags='["camping"]', sku="A",
+                   price=100.0, category_id=1, created_at=old))
+    db.add(Product(id=2, name="Stove", sku="B", price=40.0, category_id=1, created_at=new))
+    db.commit()
+
+    product_ids, documents = product_documents(db)
+    assert product_ids.tolist() == [1, 2]
+    assert documents[0] == "Tent Two person tent camping Outdoors"
+
+    product_ids, _ = product_documents(db, changed_since=new - timedelta(hours=1))
+    assert product_ids.tolist() == [2]
+    product_ids, _ = product_documents(db, changed_since=(new - timedelta(hours=1)).replace(tzinfo=timezone.utc))
+    assert product_ids.tolist() == [2]
+    assert catalog_product_ids(db).tolist() == [1, 2]
+    db.close()
+
+
+def test_update_drops_deleted_products():
+    product_ids, documents = _catalog()
+    vectorizer = fit_vectorizer(documents)
+    vectors = ContentVectors.build(vectorizer, product_ids, documents, datetime.now(timezone.utc))
+    deleted = {int(product_id) for product_id in product_ids[:20]}
+    catalog_ids = np.sort(product_ids[20:])
+
+    # Nothing else changed; the update only removes the deleted products
+    updated = vectors.updated(vectorizer, product_ids[:0], [], datetime.now(timezone.utc), catalog_ids)
+    np.testing.assert_array_equal(updated.product_ids, catalog_ids)
+    for product_id in catalog_ids[:10]:
+        assert not deleted & {similar_id for similar_id, _ in updated.similar(int(product_id), len(updated))}
+    assert not deleted & {product_id for product_id, _ in updated.match_profile({int(catalog_ids[0]): 1.0}, 50)}
+
+
+def test_read_at_is_aware_utc():
+    product_ids, documents = _catalog(products=10)
+    vectors = ContentVectors.build(fit_vectorizer(documents), product_ids, documents, datetime.now(timezone.utc))
+    assert vectors.read_at.tzinfo is not None
+
+    # Vectors saved with a naive UTC timestamp read back as the same instant
+    vectors.metadata["read_at"] = "2024-05-01T12:00:00"
+    assert vectors.read_at == datetime(2024, 5, 1, 12, tzinfo=timezone.utc)
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Tests for the precompiled email templates.
+"""
+
+import time
+
+from app.utils.email_templates import ORDER_CONFIRMATION, PASSWORD_RESET, CompiledTemplate, Safe
+
+ITEMS = [
+    {"name": "Headphones", "price": 49.5, "quantity": 2},
+    {"name": "Cable <USB-C>", "price": 9.99, "quantity": 1},
+]
+
+
+def test_order_confirmation_renders_items_and_escapes_values():
+    subject, html = ORDER_CONFIRMATION.render(order_number="ORD-1", order_total=108.99, items=ITEMS)
+
+    assert subject == "Order Confirmation - ORD-1"
+    assert "<p><strong>Total:</strong> $108.99</p>" in html
+    assert "<ul><li>Headphones - $49.50 x 2</li><li>Cable &lt;USB-C&gt; - $9.99 x 1</li></ul>" in html
+
+
+def test_safe_values_and_plain_text_templates_are_not_escaped():
+    assert CompiledTemplate("<p>{body}</p>").render(body=Safe("<b>hi</b>")) == "<p><b>hi</b></p>"
+    assert CompiledTemplate("{a} & {b}", html=False).render(a="<x>", b=1) == "<x> & 1"
+
+    _, html = PASSWORD_RESET.render(reset_url="https://shop.test/reset", reset_token="a&b")
+    assert 'href="https://shop.test/reset?token=a&amp;b"' in html
+
+
+def test_order_confirmation_throughput():
+    """Rendering stays far below the 10k confirmations per minute budget."""
+    start = time.perf_counter()
+    for n in range(10000):
+        ORDER_CONFIRMATION.render(order_number=f"ORD-{n}", order_total=108.99, items=ITEMS)
+    assert time.perf_counter() - start < 6.0
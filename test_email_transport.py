@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Tests for the pooled SMTP transport against a local aiosmtpd server.
+"""
+
+import asyncio
+import socket
+from email.message import EmailMessage
+
+from aiosmtpd.controller import Controller
+
+from app.utils.mail_transport import AsyncMailTransport, SMTPConnectionPool
+
+
+class RecordingHandler:
+    """Collects delivered messages and the SMTP sessions they came over."""
+
+    def __init__(self):
+        self.recipients = []
+        self.sessions = []
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.endswith("@invalid.test"):
+            return "550 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.recipients.extend(envelope.rcpt_tos)
+        if not any(s is session for s in self.sessions):
+            self.sessions.append(session)
+        return "250 Message accepted"
+
+
+def _message(to):
+    message = EmailMessage()
+    message["From"] = "noreply@ecommerce.com"
+    message["To"] = to
+    message["Subject"] = "Hello"
+    message.set_content("Hi there")
+    return message
+
+
+def _serve(port=None):
+    if port is None:
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+    handler = RecordingHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    return handler, controller
+
+
+def _transport(controller, **pool_options):
+    pool = SMTPConnectionPool(controller.hostname, controller.port, starttls=False, **pool_options)
+    return AsyncMailTransport(pool, batch_size=10)
+
+
+def test_send_many_reuses_pooled_connections():
+    """60 messages go out over at most pool-size connections."""
+    handler, controller = _serve()
+    try:
+        transport = _transport(controller, size=2)
+
+        async def run():
+            results = await transport.send_many([_message(f"user{i}@example.com") for i in range(60)])
+            await transport.close()
+            return results
+
+        results = asyncio.run(run())
+    finally:
+        controller.stop()
+
+    assert results == [True] * 60
+    assert sorted(handler.recipients) == sorted(f"user{i}@example.com" for i in range(60))
+    assert len(handler.sessions) <= 2
+
+
+def test_enqueue_reports_each_delivery():
+    """Queued messages are batched; refused recipients fail without affecting the rest."""
+    handler, controller = _serve()
+    try:
+        transport = _transport(controller, size=2, max_messages=7)
+
+        async def run():
+            futures = [
+                await transport.enqueue(_message("bounce@invalid.test" if i == 5 else f"user{i}@example.com"))
+                for i in range(30)
+            ]
+            await transport.close()
+            return [future.result() for future in futures]
+
+        results = asyncio.run(run())
+    finally:
+        controller.stop()
+
+    assert results == [i != 5 for i in range(30)]
+    assert len(handler.recipients) == 29
+    # Connections are recycled after max_messages
+    assert len(handler.sessions) >= 29 // 7
+
+
+def test_dropped_idle_connections_are_replaced():
+    """A server restart between batches doesn't lose the next batch's first message."""
+    handler, controller = _serve()
+    pool = SMTPConnectionPool(controller.hostname, controller.port, starttls=False, size=1)
+    try:
+        assert pool.send_batch([_message("a@example.com")]) == [True]
+        controller.stop()
+        handler, controller = _serve(controller.port)
+        assert pool.send_batch([_message("b@example.com"), _message("c@example.com")]) == [True, True]
+        assert handler.recipients == ["b@example.com", "c@example.com"]
+    finally:
+        pool.close()
+        controller.stop()
+
+
+def test_unreachable_server_fails_fast():
+    pool = SMTPConnectionPool("127.0.0.1", 1, starttls=False, timeout=1)
+    assert pool.send_batch([_message("a@example.com"), _message("b@example.com")]) == [False, False]
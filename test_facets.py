@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Tests for facet counts under combined listing filters.
+"""
+
+import itertools
+
+import fakeredis
+import numpy as np
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base, get_db, get_redis
+from app.main import app
+from app.models import Category, Product
+from app.search import refresh
+from app.search.facets import PRICE_BUCKET_EDGES, FacetEngine, facet_engine, product_brand
+from app.search.fulltext import FTS_TABLE, install_fulltext_index
+
+engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+CATEGORIES = ["Audio", "Computers", "Kitchen"]
+BRANDS = ["Acme", "Globex", "Initech", ""]
+
+
+def _seed(products=200):
+    """Reset the database to random products; returns (id, category, price, brand) tuples."""
+    Base.metadata.drop_all(engine)
+    with engine.begin() as connection:
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    Base.metadata.create_all(engine)
+    install_fulltext_index(engine)
+    rng = np.random.default_rng(0)
+    db = TestingSession()
+    for category_id, name in enumerate(CATEGORIES, start=1):
+        db.add(Category(id=category_id, name=name, slug=name.lower()))
+    catalog = []
+    for product_id in range(1, products + 1):
+        category = str(rng.choice(CATEGORIES))
+        brand = str(rng.choice(BRANDS))
+        price = float(rng.choice([5.0, 24.99, 25.0, 60.0, 180.0, 300.0, 999.0, 1500.0]))
+        tags = f"{category}, Misc, {brand}" if brand else category
+        name = "Deluxe Gadget" if product_id % 3 == 0 else "Basic Gadget"
+        db.add(Product(id=product_id, name=name, tags=tags, sku=f"SKU-{product_id}", price=price,
+                       category_id=CATEGORIES.index(category) + 1))
+        catalog.append((product_id, category, price, brand, name))
+    db.commit()
+    db.close()
+    return catalog
+
+
+def _snapshot():
+    db = TestingSession()
+    try:
+        return FacetEngine(refresh_interval=3600).build_snapshot(db)
+    finally:
+        db.close()
+
+
+def _expected(catalog, category=None, min_price=None, max_price=None, search_ids=None):
+    """Brute-force facet counts: each facet ignores its own filter."""
+    def matches(product, skip=None):
+        product_id, product_category, price, _, _ = product
+        return (
+            (skip == "category" or category is None or product_category == category)
+            and (skip == "price" or min_price is None or price >= min_price)
+            and (skip == "price" or max_price is None or price <= max_price)
+            and (search_ids is None or product_id in search_ids)
+        )
+
+    def bucket(price):
+        lower = max(edge for edge in PRICE_BUCKET_EDGES if edge <= price)
+        position = PRICE_BUCKET_EDGES.index(lower)
+        return f"{lower}-{PRICE_BUCKET_EDGES[position + 1]}" if position + 1 < len(PRICE_BUCKET_EDGES) else f"{lower}+"
+
+    def tally(values):
+        counts = {}
+        for value in values:
+            counts[value] = counts.get(value, 0) + 1
+        return counts
+
+    return {
+        "total": sum(1 for product in catalog if matches(product)),
+        "category": tally(p[1] for p in catalog if matches(p, "category")),
+        "price": tally(bucket(p[2]) for p in catalog if matches(p, "price")),
+        "brand": tally(p[3] for p in catalog if matches(p) and p[3]),
+    }
+
+
+def _as_dicts(counts):
+    return {
+        "total": counts["total"],
+        **{facet: {value["value"]: value["count"] for value in values} for facet, values in counts["facets"].items()}
+    }
+
+
+def test_counts_match_brute_force_under_combined_filters():
+    catalog = _seed()
+    snapshot = _snapshot()
+    deluxe = np.array([p[0] for p in catalog if p[4] == "Deluxe Gadget"])
+
+    for category, (min_price, max_price), search_ids in itertools.product(
+        [None, "Audio", "Kitchen", "Unknown"],
+        [(None, None), (25.0, None), (None, 100.0), (25.0, 300.0)],
+        [None, deluxe]
+    ):
+        counts = snapshot.counts(category, min_price, max_price, search_ids)
+        expected = _expected(catalog, category, min_price, max_price,
+                             None if search_ids is None else set(search_ids.tolist()))
+        assert _as_dicts(counts) == expected, (category, min_price, max_price, search_ids is not None)
+
+
+def test_facet_values_are_ordered():
+    _seed()
+    counts = _snapshot().counts(min_price=25.0)
+    for facet in ("category", "brand"):
+        values = [value["count"] for value in counts["facets"][facet]]
+        assert values == sorted(values, reverse=True)
+    # Price buckets keep their natural order
+    assert [value["min"] for value in counts["facets"]["price"]] == sorted(value["min"] for value in counts["facets"]["price"])
+    assert sum(value["count"] for value in counts["facets"]["brand"]) <= counts["total"]
+    assert product_brand("Audio, Misc, Acme, extra") == "Acme"
+    assert product_brand("Audio") == product_brand(None) == ""
+
+
+def test_facets_endpoint_applies_search_with_the_other_filters(monkeypatch):
+    catalog = _seed()
+    monkeypatch.setattr(refresh, "SessionLocal", TestingSession)
+    monkeypatch.setattr(facet_engine, "_snapshot", None)
+
+    def override_get_db():
+        db = TestingSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_redis] = lambda: fakeredis.FakeRedis(decode_responses=True)
+    try:
+        response = TestClient(app).get(
+            "/api/v1/products/facets", params={"search": "deluxe", "category": "Audio", "max_price": 250}
+        )
+    finally:
+        app.dependency_overrides.clear()
+
+    deluxe = {p[0] for p in catalog if p[4] == "Deluxe Gadget"}
+    assert _as_dicts(response.json()) == _expected(catalog, "Audio", None, 250.0, deluxe)
+
+
+def test_warmed_snapshot_serves_the_first_request(monkeypatch):
+    """After warm, the first reader doesn't build on the request path."""
+    catalog = _seed(products=20)
+    monkeypatch.setattr(refresh, "SessionLocal", TestingSession)
+    redis = fakeredis.FakeRedis(decode_responses=True)
+    facets = FacetEngine(refresh_interval=3600)
+    facets.warm(redis)
+
+    def fail(*args):
+        raise AssertionError("the snapshot was rebuilt on the request path")
+
+    monkeypatch.setattr(facets, "rebuild", fail)
+    assert _as_dicts(facets.counts(redis)) == _expected(catalog)
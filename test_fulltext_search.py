@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Tests for the database full-text product search (SQLite FTS5, the PostgreSQL query and the ILIKE fallback).
+"""
+
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models import Category, Product
+from app.search.fulltext import FTS_TABLE, apply_search, install_fulltext_index
+
+
+def _session(dialect_name=None):
+    """An in-memory database with three products; optionally posing as another dialect."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    install_fulltext_index(engine)
+    if dialect_name:
+        engine.dialect.name = dialect_name
+    db = sessionmaker(bind=engine)()
+    db.add(Category(id=1, name="Audio", slug="audio"))
+    db.add(Category(id=2, name="Kitchen", slug="kitchen"))
+    db.add(Product(id=1, name="Wireless Headphones", description="Noise cancelling", tags='["bluetooth"]',
+                   sku="HP-1", price=99.0, category_id=1))
+    db.add(Product(id=2, name="Bluetooth Speaker", description="Pairs with wireless headphones",
+                   sku="SP-1", price=49.0, category_id=1))
+    db.add(Product(id=3, name="Coffee Grinder", description="Burr grinder", sku="CG-1", price=39.0, category_id=2))
+    db.commit()
+    return db
+
+
+def _search(db, q, rank=False):
+    return [row.id for row in apply_search(db.query(Product.id), q, rank=rank)]
+
+
+def test_triggers_keep_the_index_in_sync():
+    db = _session()
+    assert _search(db, "grinder") == [3]
+
+    db.add(Product(id=4, name="Espresso Grinder", sku="EG-1", price=199.0, category_id=2))
+    db.commit()
+    assert sorted(_search(db, "grinder")) == [3, 4]
+
+    db.get(Product, 3).name = "Coffee Mill"
+    db.get(Product, 3).description = "Burr mill"
+    db.commit()
+    assert _search(db, "grinder") == [4]
+    assert _search(db, "mill") == [3]
+
+    db.delete(db.get(Product, 4))
+    db.commit()
+    assert _search(db, "grinder") == []
+
+    db.get(Category, 2).name = "Barista"
+    db.commit()
+    assert _search(db, "barista") == [3]
+    db.close()
+
+
+def test_results_are_ranked_and_prefixes_match():
+    db = _session()
+    # Both mention headphones; the product named for them ranks first
+    assert _search(db, "wireless headphones", rank=True) == [1, 2]
+    assert sorted(_search(db, "head")) == [1, 2]
+    assert _search(db, "bluetooth speak") == [2]
+    assert _search(db, "!!!") == []
+    db.close()
+
+
+def test_other_databases_fall_back_to_ilike():
+    db = _session(dialect_name="mysql")
+    assert sorted(_search(db, "Headphones")) == [1, 2]
+    assert _search(db, "KITCHEN") == [3]
+    assert _search(db, "burr grinder") == [3]
+    db.close()
+
+
+def test_category_is_part_of_the_document():
+    """Terms can be split between a product's own fields and its category name."""
+    db = _session()
+    assert sorted(_search(db, "audio wireless")) == [1, 2]
+    assert _search(db, "kitchen burr") == [3]
+
+    # PostgreSQL matches the same single vector, which its triggers build with the category name
+    db.get_bind().dialect.name = "postgresql"
+    sql = str(apply_search(db.query(Product.id), "audio wireless").statement.compile(dialect=postgresql.dialect()))
+    assert "products.search_vector @@ to_tsquery" in sql
+    assert "categories" not in sql
+
+
+def test_postgres_index_is_left_to_the_migrations():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    engine.dialect.name = "postgresql"
+    install_fulltext_index(engine)
+    engine.dialect.name = "sqlite"
+    assert not inspect(engine).has_table(FTS_TABLE)
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Tests for Idempotency-Key handling on checkout.
+
+Redis is pointed at a closed port, so these exercise the database fallback.
+"""
+
+import threading
+import time
+
+from fastapi.testclient import TestClient
+from redis import Redis
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.config import settings
+from app.core.idempotency import DatabaseKeyStore, _keep_claimed, request_fingerprint
+from app.database import Base, get_db, get_redis
+from app.main import app
+from app.models import Cart, CartItem, Category, Order, Product
+
+engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+unreachable_redis = Redis(port=1, socket_connect_timeout=0.1)
+
+
+def _override_get_db():
+    db = TestingSession()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def _client():
+    """Reset the database to a one-item cart for user 1 and get a client."""
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    db = TestingSession()
+    db.add(Category(id=1, name="Electronics", slug="electronics"))
+    db.add(Product(id=1, name="Headphones", sku="HP-1", price=50.0, stock_quantity=5, category_id=1))
+    cart = Cart(user_id=1)
+    db.add(cart)
+    db.flush()
+    db.add(CartItem(cart_id=cart.id, product_id=1, quantity=2))
+    db.commit()
+    db.close()
+
+    app.dependency_overrides[get_db] = _override_get_db
+    app.dependency_overrides[get_redis] = lambda: unreachable_redis
+    return TestClient(app)
+
+
+def _order_count():
+    db = TestingSession()
+    try:
+        return db.query(Order).count()
+    finally:
+        db.close()
+
+
+def teardown_function():
+    app.dependency_overrides.clear()
+
+
+def test_retried_checkout_is_replayed():
+    """A retry with the same key gets the first response and places no second order."""
+    client = _client()
+    headers = {"Idempotency-Key": "checkout-1"}
+
+    first = client.post("/api/v1/cart/checkout", headers=headers)
+    retry = client.post("/api/v1/cart/checkout", headers=headers)
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert _order_count() == 1
+
+    # Without the key (or with a new one) the now empty cart is checked out again
+    assert client.post("/api/v1/cart/checkout", headers={"Idempotency-Key": "checkout-2"}).status_code == 400
+
+
+def test_reused_key_with_different_request_is_rejected():
+    """A key can't be replayed for a request with a different body."""
+    client = _client()
+    headers = {"Idempotency-Key": "checkout-1"}
+    body = {
+        "billing_first_name": "Ada", "billing_last_name": "Lovelace", "billing_email": "ada@example.com",
+        "billing_address": "1 Main St", "billing_city": "London", "billing_state": "LDN",
+        "billing_country": "GB", "billing_postal_code": "N1"
+    }
+
+    assert client.post("/api/v1/cart/checkout", headers=headers).status_code == 200
+    assert client.post("/api/v1/cart/checkout", headers=headers, json=body).status_code == 422
+    assert _order_count() == 1
+
+
+def test_concurrent_duplicate_waits_for_first_response():
+    """A duplicate arriving mid-flight is answered with the first request's response."""
+    client = _client()
+    store = DatabaseKeyStore(TestingSession())
+    key = "payments:stripe:1:pay-1"
+    fingerprint = request_fingerprint("POST", "/api/v1/payments/stripe", b"")
+
+    # Play the first request: claim the key and answer only later
+    assert store.claim(key, fingerprint) is None
+
+    responses = []
+    duplicate = threading.Thread(target=lambda: responses.append(
+        client.post("/api/v1/payments/stripe", headers={"Idempotency-Key": "pay-1"})
+    ))
+    duplicate.start()
+    time.sleep(0.3)
+    assert not responses, "the duplicate must wait for the in-flight request"
+
+    store.complete(key, fingerprint, 200, '{"message":"charged once"}')
+    duplicate.join(timeout=5)
+
+    assert responses[0].status_code == 200
+    assert responses[0].json() == {"message": "charged once"}
+
+
+def test_claim_outlives_lock_ttl_while_handler_runs(monkeypatch):
+    """A handler slower than the lock TTL keeps its key; a retry can't take it over."""
+    _client()
+    monkeypatch.setattr(settings, "IDEMPOTENCY_LOCK_TTL", 1)
+    store = DatabaseKeyStore(TestingSession())
+    key = "checkout:1:slow-1"
+    fingerprint = request_fingerprint("POST", "/api/v1/cart/checkout", b"")
+
+    assert store.claim(key, fingerprint) is None
+    with _keep_claimed(store, key, fingerprint):
+        time.sleep(2)
+        assert store.claim(key, fingerprint) == {"fingerprint": fingerprint, "status_code": None, "body": None}
+
+    # Once the handler is done renewing, an abandoned claim lapses as before
+    time.sleep(1.2)
+    assert store.claim(key, fingerprint) is None
+
+
+def test_key_store_failure_after_checkout_returns_the_order(monkeypatch):
+    """A response that can't be stored doesn't turn a placed order into a 500."""
+    client = _client()
+
+    def fail(self, *args):
+        raise OperationalError("UPDATE idempotency_keys", {}, Exception("database is locked"))
+
+    monkeypatch.setattr(DatabaseKeyStore, "complete", fail)
+    response = client.post("/api/v1/cart/checkout", headers={"Idempotency-Key": "checkout-1"})
+
+    assert response.status_code == 200
+    assert response.json()["order_id"]
+    assert _order_count() == 1
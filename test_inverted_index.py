@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Tests for the in-memory BM25 index and its sync from the product change feed.
+"""
+
+import math
+import os
+import tempfile
+
+import fakeredis
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models import Category, Product
+from app.search import change_feed
+from app.search.inverted_index import InvertedIndex, tokenize
+from app.search.product_index import ProductSearchIndex
+
+DOCUMENTS = {
+    1: {"name": "Wireless Headphones", "description": "Over-ear headphones with noise cancelling"},
+    2: {"name": "Wired Earbuds", "description": "Cheap earbuds, a wireless upgrade is sold separately"},
+    3: {"name": "Headphone Stand", "description": "Aluminium stand"},
+    4: {"name": "Coffee Grinder", "description": "Burr grinder"},
+}
+
+
+def _index():
+    index = InvertedIndex({"name": 3, "description": 1})
+    index.bulk_add(DOCUMENTS.items())
+    return index
+
+
+def _bm25(index, term, doc_id):
+    """Textbook BM25 of one term for one document, computed from DOCUMENTS."""
+    def weighted(fields, count):
+        return sum(weight * count(tokenize(fields.get(field))) for field, weight in index.field_weights.items())
+
+    lengths = {d: weighted(fields, len) for d, fields in DOCUMENTS.items()}
+    matching = sum(1 for fields in DOCUMENTS.values() if weighted(fields, lambda tokens: tokens.count(term)))
+    freq = weighted(DOCUMENTS[doc_id], lambda tokens: tokens.count(term))
+    idf = math.log(1 + (len(DOCUMENTS) - matching + 0.5) / (matching + 0.5))
+    norm = index.k1 * (1 - index.b + index.b * lengths[doc_id] / (sum(lengths.values()) / len(lengths)))
+    return idf * freq * (index.k1 + 1) / (freq + norm)
+
+
+def test_bm25_scores_and_ordering():
+    index = _index()
+
+    ranked = index.search("wireless", prefix=False)
+    # A name match weighs three times a description match
+    assert [doc_id for doc_id, _ in ranked] == [1, 2]
+    for doc_id, score in ranked:
+        assert math.isclose(score, _bm25(index, "wireless", doc_id))
+
+    # Every token must match; scores add up over tokens
+    both = index.search("wireless headphones", prefix=False)
+    assert [doc_id for doc_id, _ in both] == [1]
+    assert math.isclose(both[0][1], _bm25(index, "wireless", 1) + _bm25(index, "headphones", 1))
+    assert index.search("wireless grinder") == []
+
+
+def test_last_token_matches_as_a_prefix():
+    index = _index()
+    assert {doc_id for doc_id, _ in index.search("headph")} == {1, 3}
+    assert index.search("headph", prefix=False) == []
+    assert index.expand_prefix("head") == ["headphone", "headphones"]
+    assert [doc_id for doc_id, _ in index.search("burr gr")] == [4]
+
+
+def test_postings_follow_updates_and_removals():
+    index = _index()
+    # Re-adding a document replaces its old terms
+    index.add(4, {"name": "Espresso Machine", "description": None})
+    assert index.search("grinder") == []
+    assert [doc_id for doc_id, _ in index.search("espresso")] == [4]
+
+    # Ids arriving out of order are inserted in place
+    index.add(0, {"name": "Espresso Cups"})
+    assert {doc_id for doc_id, _ in index.search("espresso")} == {0, 4}
+
+    index.remove(4)
+    index.remove(4)
+    assert [doc_id for doc_id, _ in index.search("espresso")] == [0]
+    assert index.expand_prefix("mach") == []
+    assert len(index) == 4 and 4 not in index
+
+
+def test_snapshot_round_trip():
+    index = _index()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "index.pkl")
+        index.save(path, {"feed_position": "5-0"})
+        loaded, metadata = InvertedIndex.load(path)
+
+    assert metadata == {"feed_position": "5-0"}
+    assert len(loaded) == len(index)
+    for query in ("wireless", "headph", "burr grinder", "stand"):
+        assert loaded.search(query) == index.search(query)
+    loaded.add(5, {"name": "Wireless Charger"})
+    assert {doc_id for doc_id, _ in loaded.search("wireless")} == {1, 2, 5}
+
+
+def test_index_syncs_from_the_change_feed(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    change_feed.register_change_feed(Session)
+    redis = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(change_feed, "redis_client", redis)
+
+    db = Session()
+    db.add(Category(id=1, name="Audio", slug="audio"))
+    db.add(Product(id=1, name="Wireless Headphones", sku="HP-1", price=99.0, category_id=1))
+    db.add(Product(id=2, name="Bluetooth Speaker", sku="SP-1", price=49.0, category_id=1))
+    db.commit()
+
+    with tempfile.TemporaryDirectory() as directory:
+        search_index = ProductSearchIndex(os.path.join(directory, "index.pkl"), sync_interval=3600)
+        search_index.rebuild(db, redis)
+
+        # Another worker's writes only reach this one through the shared stream
+        db.get(Product, 1).name = "Wired Headphones"
+        db.delete(db.get(Product, 2))
+        db.add(Product(id=3, name="Wireless Speaker", sku="SP-2", price=59.0, category_id=1))
+        db.commit()
+        assert search_index.index.search("speaker") != []
+
+        search_index.sync(db, redis, force=True)
+        assert [doc_id for doc_id, _ in search_index.index.search("wireless")] == [3]
+        assert [doc_id for doc_id, _ in search_index.index.search("speaker")] == [3]
+        assert [doc_id for doc_id, _ in search_index.index.search("wired")] == [1]
+
+        # A restarted worker resumes from the snapshot's feed position
+        search_index.save()
+        restarted = ProductSearchIndex(search_index.snapshot_path, sync_interval=3600)
+        assert restarted.load_snapshot()
+        db.get(Product, 3).name = "Portable Speaker"
+        db.commit()
+        restarted.sync(db, redis, force=True)
+        assert restarted.index.search("wireless") == []
+    db.close()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Tests for the item-item similarity model.
+"""
+
+import os
+import tempfile
+
+import numpy as np
+
+from app.ai.interactions import interaction_matrix
+from app.ai.item_similarity import ItemSimilarityModel
+
+
+def _random_interactions(seed=0, users=300, items=80, rows=3000):
+    rng = np.random.default_rng(seed)
+    return interaction_matrix(
+        rng.integers(1, users, rows),
+        rng.integers(100, 100 + items, rows),
+        rng.choice([1.0, 4.0, 8.0], rows).astype(np.float32)
+    )
+
+
+def _dense_cosine(interactions):
+    items = np.log1p(interactions.matrix.toarray().T.astype(np.float64))
+    items /= np.linalg.norm(items, axis=1, keepdims=True)
+    similarities = items @ items.T
+    np.fill_diagonal(similarities, -np.inf)
+    return similarities
+
+
+def test_neighbours_match_brute_force_cosine():
+    interactions = _random_interactions()
+    model = ItemSimilarityModel.build(interactions, top_k=10)
+    expected = _dense_cosine(interactions)
+
+    for position, product_id in enumerate(interactions.item_ids[:20]):
+        neighbours = model.similar(int(product_id), 5)
+        best = np.sort(expected[position])[::-1][:5]
+        assert [product for product, _ in neighbours if product == product_id] == []
+        np.testing.assert_allclose([score for _, score in neighbours], best, rtol=1e-4)
+
+
+def test_recommend_merges_history_and_excludes_it():
+    interactions = _random_interactions()
+    model = ItemSimilarityModel.build(interactions, top_k=10)
+    history = {int(interactions.item_ids[0]): 8.0, int(interactions.item_ids[1]): 1.0}
+
+    ranked = model.recommend(history, 5, exclude=[int(interactions.item_ids[2])])
+    assert len(ranked) == 5
+    assert not {product for product, _ in ranked} & {*history, int(interactions.item_ids[2])}
+    assert [score for _, score in ranked] == sorted((score for _, score in ranked), reverse=True)
+
+    # Scores are the weighted sum of the history items' neighbour scores
+    product, score = ranked[0]
+    expected = sum(
+        np.log1p(weight) * dict(model.similar(item, 10)).get(product, 0.0)
+        for item, weight in history.items()
+    )
+    assert abs(score - expected) < 1e-4
+    assert model.recommend({999999: 1.0}, 5) == []
+
+
+def test_saved_model_is_memory_mapped():
+    model = ItemSimilarityModel.build(_random_interactions(), top_k=10)
+    path = os.path.join(tempfile.mkdtemp(), "item_similarity.bin")
+    model.save(path)
+
+    loaded = ItemSimilarityModel.load(path)
+    assert isinstance(loaded.scores, np.memmap)
+    product_id = int(model.item_ids[3])
+    assert loaded.similar(product_id, 10) == model.similar(product_id, 10)
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Tests for the checkout outbox and its worker.
+"""
+
+import asyncio
+
+import fakeredis
+from redis.exceptions import RedisError
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.cart.redis_store import RedisCartStore, items_key
+from app.cart.store import SqlCartStore
+from app.database import Base
+from app.models import Cart, CartItem, Category, Order, OutboxEvent, Product, UserBehavior
+from app.orders.pipeline import checkout_cart
+from app.outbox import handlers
+from app.outbox.events import CART_CHECKED_OUT, ORDER_CONFIRMATION_EMAIL, PURCHASE_BEHAVIOR, RECOMMENDATIONS_UPDATE
+from app.outbox.worker import OutboxWorker
+
+engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+DETAILS = {
+    "billing_first_name": "Ada", "billing_last_name": "Lovelace", "billing_email": "ada@example.com",
+    "billing_address": "1 Main St", "billing_city": "London", "billing_state": "LDN",
+    "billing_country": "GB", "billing_postal_code": "N1"
+}
+
+
+def _seed_cart():
+    """Reset the database to a two-item cart for user 1."""
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    db = TestingSession()
+    db.add(Category(id=1, name="Electronics", slug="electronics"))
+    cart = Cart(user_id=1)
+    db.add(cart)
+    db.flush()
+    for i in (1, 2):
+        db.add(Product(id=i, name=f"Product {i}", sku=f"SKU-{i}", price=10.0, stock_quantity=5, category_id=1))
+        db.add(CartItem(cart_id=cart.id, product_id=i, quantity=1))
+    db.commit()
+    db.close()
+
+
+def _checkout():
+    """Reset the database and check out a two-item cart for user 1."""
+    _seed_cart()
+    db = TestingSession()
+    order = checkout_cart(db, SqlCartStore(db), 1, DETAILS)
+    order_number = order.order_number
+    db.close()
+    return order_number
+
+
+def _worker():
+    return OutboxWorker(TestingSession, batch_size=10, lease=60, max_attempts=2, retry_delay=0)
+
+
+def test_checkout_records_side_effects_in_the_outbox(monkeypatch):
+    order_number = _checkout()
+    db = TestingSession()
+    topics = {event.topic for event in db.query(OutboxEvent)}
+    assert topics == {ORDER_CONFIRMATION_EMAIL, PURCHASE_BEHAVIOR, RECOMMENDATIONS_UPDATE}
+    db.close()
+
+    sent = []
+
+    async def send_email(to_email, subject, html_content, text_content=None):
+        sent.append((to_email, subject))
+        return True
+
+    monkeypatch.setattr(handlers.email_service, "send_email", send_email)
+    assert asyncio.run(_worker().drain_once()) == 3
+
+    db = TestingSession()
+    assert sent == [("ada@example.com", f"Order Confirmation - {order_number}")]
+    assert sorted(b.product_id for b in db.query(UserBehavior).filter(UserBehavior.behavior_type == "purchase")) == [1, 2]
+    assert db.query(OutboxEvent).count() == 0
+    db.close()
+
+
+def test_failed_events_are_retried_then_parked(monkeypatch):
+    _checkout()
+
+    async def send_email(to_email, subject, html_content, text_content=None):
+        return False
+
+    monkeypatch.setattr(handlers.email_service, "send_email", send_email)
+    worker = _worker()
+    asyncio.run(worker.drain_once())
+
+    db = TestingSession()
+    event = db.query(OutboxEvent).one()
+    assert event.topic == ORDER_CONFIRMATION_EMAIL
+    assert event.attempts == 1 and event.available_at is not None
+    db.close()
+
+    # Retries are due immediately with a zero delay; the second failure parks it
+    asyncio.run(worker.drain_once())
+    db = TestingSession()
+    event = db.query(OutboxEvent).one()
+    assert event.attempts == 2 and event.available_at is None
+    assert "Could not send confirmation" in event.last_error
+    db.close()
+    assert asyncio.run(worker.drain_once()) == 0
+
+
+def test_checkout_empties_the_sql_cart_with_the_order():
+    """The cart lines are deleted in the order's transaction, not after it."""
+    _seed_cart()
+
+    class CrashingStore(SqlCartStore):
+        def after_checkout(self, user_id, quantities):
+            raise RuntimeError("process died after the commit")
+
+    db = TestingSession()
+    try:
+        checkout_cart(db, CrashingStore(db), 1, DETAILS)
+        assert False, "the store should have raised"
+    except RuntimeError:
+        pass
+    db.close()
+
+    db = TestingSession()
+    assert db.query(Order).count() == 1
+    assert db.query(CartItem).count() == 0
+    assert db.query(Cart).one().item_count == 0
+    db.close()
+
+
+def _leased(worker, topic):
+    """Lease the due events and pick the one of ``topic``."""
+    return next(event for event in worker.lease_batch() if event.topic == topic)
+
+
+def test_outbox_empties_a_redis_cart_the_checkout_could_not(monkeypatch):
+    _seed_cart()
+    redis = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(handlers, "redis_client", redis)
+
+    def redis_down(user_id, quantities):
+        raise RedisError("connection lost")
+
+    db = TestingSession()
+    store = RedisCartStore(redis, db)
+    store.get_cart(1)
+    monkeypatch.setattr(store, "remove_lines", redis_down)
+    checkout_cart(db, store, 1, DETAILS)
+    assert redis.hgetall(items_key(1)) == {"1": "1", "2": "1"}
+    db.close()
+
+    # The user changed one line meanwhile; only the checked-out quantities go
+    redis.hset(items_key(1), 2, 3)
+    worker = _worker()
+    assert asyncio.run(worker.run_event(_leased(worker, CART_CHECKED_OUT)))
+    assert redis.hgetall(items_key(1)) == {"2": "3"}
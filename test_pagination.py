@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Tests for keyset cursor pagination of the product listing.
+
+Redis is pointed at a closed port, so listings are never served from cache.
+"""
+
+import base64
+import json
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+from redis import Redis
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api.v1.endpoints import products
+from app.database import Base, get_db, get_redis
+from app.main import app
+from app.models import Category, Product
+from app.utils.pagination import encode_cursor
+
+engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+unreachable_redis = Redis(port=1, socket_connect_timeout=0.1)
+
+
+def _override_get_db():
+    db = TestingSession()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def _client():
+    """Reset the database to 23 products whose prices repeat in 4 tiers."""
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    db = TestingSession()
+    db.add(Category(id=1, name="Electronics", slug="electronics"))
+    for product_id in range(1, 24):
+        db.add(Product(id=product_id, name=f"Product {product_id}", sku=f"SKU-{product_id}",
+                       price=10.0 * (product_id % 4 + 1), category_id=1))
+    db.commit()
+    db.close()
+
+    app.dependency_overrides[get_db] = _override_get_db
+    app.dependency_overrides[get_redis] = lambda: unreachable_redis
+    return TestClient(app)
+
+
+def teardown_function():
+    app.dependency_overrides.clear()
+
+
+def _walk(client, **params):
+    """Follow next_cursor from the first page to the last, collecting products."""
+    products, cursor = [], ""
+    while cursor is not None:
+        page = client.get("/api/v1/products/", params={**params, "cursor": cursor}).json()
+        assert len(page["items"]) <= params["limit"]
+        products.extend(page["items"])
+        cursor = page["next_cursor"]
+    return products
+
+
+def test_pages_through_ties_in_the_sort_column():
+    client = _client()
+
+    ascending = _walk(client, limit=4, sort_by="price", sort_order="asc")
+    assert [(p["price"], p["id"]) for p in ascending] == sorted((p["price"], p["id"]) for p in ascending)
+    assert sorted(p["id"] for p in ascending) == list(range(1, 24))
+
+    descending = _walk(client, limit=5, sort_by="price", sort_order="desc")
+    assert [p["id"] for p in descending] == [p["id"] for p in reversed(ascending)]
+
+    by_id = _walk(client, limit=7, sort_by="id", sort_order="desc")
+    assert [p["id"] for p in by_id] == list(range(23, 0, -1))
+
+
+def test_invalid_cursors_are_rejected():
+    client = _client()
+
+    def forged(payload):
+        return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+    for cursor in ("not-a-cursor!", forged([1, 2]), forged(["price", "asc", [1], 3]),
+                   forged(["price", "asc", {"dt": 5}, 3]), forged(["price", "asc", 10.0, "x"])):
+        response = client.get("/api/v1/products/", params={"cursor": cursor, "sort_by": "price"})
+        assert response.status_code == 400, cursor
+
+
+def test_cursor_of_another_sort_is_rejected():
+    client = _client()
+    cursor = client.get("/api/v1/products/", params={"cursor": "", "limit": 3, "sort_by": "price"}).json()["next_cursor"]
+
+    for params in ({"sort_by": "id"}, {"sort_by": "price", "sort_order": "desc"}):
+        response = client.get("/api/v1/products/", params={"cursor": cursor, **params})
+        assert response.status_code == 400
+        assert "sort" in response.json()["error"]
+    assert client.get("/api/v1/products/", params={"cursor": encode_cursor("id", "asc", 3, 3)}).status_code == 200
+
+
+def test_skip_and_limit_still_work_without_a_cursor():
+    client = _client()
+    response = client.get("/api/v1/products/", params={"skip": 20, "limit": 5})
+
+    assert response.status_code == 200
+    assert [p["id"] for p in response.json()] == [21, 22, 23]
+    assert response.headers["X-Total-Count"] == "23"
+
+
+def test_database_errors_surface_as_500(monkeypatch):
+    """A failing query isn't passed off as an empty page, in either pagination mode."""
+    client = _client()
+
+    def fail(*args, **kwargs):
+        raise OperationalError("SELECT products", {}, Exception("server closed the connection"))
+
+    monkeypatch.setattr(products, "apply_catalog_filters", fail)
+    for params in ({"cursor": ""}, {"skip": 0}):
+        response = client.get("/api/v1/products/", params=params)
+        assert response.status_code == 500
+        assert response.json()["error"] == "Internal server error"
+
+
+def test_created_at_is_never_null():
+    """Keyset pages on (created_at, id) would skip rows with a NULL created_at."""
+    assert Product.__table__.c.created_at.nullable is False
+    client = _client()
+    db = TestingSession()
+    for product in db.query(Product):
+        product.created_at = datetime(2024, 1, 1 + product.id % 5)
+    db.commit()
+    db.close()
+
+    newest_first = _walk(client, sort_by="created_at", sort_order="desc", limit=5)
+    assert [p["id"] for p in newest_first] == sorted(range(1, 24), key=lambda i: (i % 5, i), reverse=True)
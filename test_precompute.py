@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Tests for precomputed recommendation rows.
+"""
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.ai import als as als_module
+from app.ai import precompute
+from app.ai.als import ALSModel
+from app.ai.interactions import interaction_matrix, load_interactions
+from app.ai.item_similarity import ItemSimilarityModel
+from app.ai.recommendation_engine import RecommendationEngine
+from app.database import Base
+from app.models import Category, Product, ProductRecommendation, User, UserBehavior
+
+engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def _seed(users=40, products=60, behaviors=800):
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    db = TestingSession()
+    rng = np.random.default_rng(0)
+    db.add(Category(id=1, name="Electronics", slug="electronics"))
+    for product_id in range(1, products + 1):
+        db.add(Product(id=product_id, name=f"Product {product_id}", sku=f"SKU-{product_id}", price=10.0, category_id=1))
+    for user_id in range(1, users + 2):
+        db.add(User(id=user_id, email=f"user{user_id}@example.com", username=f"user{user_id}",
+                    hashed_password="x", first_name="Test", last_name="User"))
+    db.flush()
+    for _ in range(behaviors):
+        db.add(UserBehavior(
+            user_id=int(rng.integers(1, users + 1)),
+            product_id=int(rng.integers(1, products + 1)),
+            behavior_type=str(rng.choice(["view", "add_to_cart", "purchase"]))
+        ))
+    db.commit()
+    db.close()
+
+
+def _models(monkeypatch):
+    """Train the models on the seeded behavior and hand them to the precompute workers."""
+    db = TestingSession()
+    interactions = load_interactions(db)
+    db.close()
+    als = ALSModel.train(interactions, factors=4, iterations=3)
+    item_similarity = ItemSimilarityModel.build(interactions, top_k=10)
+    monkeypatch.setattr(precompute, "_als", SimpleNamespace(get=lambda: als))
+    monkeypatch.setattr(precompute, "_item_similarity", SimpleNamespace(get=lambda: item_similarity))
+    return als, item_similarity
+
+
+def test_batch_scoring_matches_single_user_scoring(monkeypatch):
+    rng = np.random.default_rng(3)
+    interactions = interaction_matrix(rng.integers(1, 80, 1500), rng.integers(1, 120, 1500), np.ones(1500, np.float32))
+    model = ALSModel.train(interactions, factors=6, iterations=3)
+    user_ids = [1, 5, 9999, 17, 42]
+    exclude = [list(range(1, 20)), [], [], [3, 4], list(range(50, 120))]
+
+    # Blocks of a few users each
+    monkeypatch.setattr(als_module, "SCORE_BLOCK", 3 * len(model.item_ids))
+    batched = model.recommend_users(user_ids, 10, exclude)
+
+    for user_id, excluded, ranked in zip(user_ids, exclude, batched):
+        single = model.recommend(user_id, 10, exclude=excluded)
+        assert [product for product, _ in ranked] == [product for product, _ in single]
+        np.testing.assert_allclose([score for _, score in ranked], [score for _, score in single], rtol=1e-5)
+    assert batched[2] == []
+
+
+def test_precompute_all_stores_rows_for_active_users(monkeypatch):
+    _seed()
+    _models(monkeypatch)
+    db = TestingSession()
+    # A user who is no longer active, with stale rows
+    db.add(UserBehavior(user_id=41, product_id=1, behavior_type="view", created_at=datetime.utcnow() - timedelta(days=90)))
+    db.add(ProductRecommendation(user_id=41, product_id=1, recommended_product_id=2, recommendation_type="collaborative",
+                                 score=1.0, created_at=datetime.utcnow() - timedelta(days=1)))
+    db.commit()
+    db.close()
+
+    users, stored = precompute.precompute_all(limit=5, active_days=30, chunk_size=7, workers=1, session_factory=TestingSession)
+
+    db = TestingSession()
+    assert users == 40
+    rows = db.query(ProductRecommendation).filter(ProductRecommendation.user_id.isnot(None)).all()
+    assert len(rows) == stored == 40 * 5
+    assert {row.user_id for row in rows} == set(range(1, 41))
+    assert all(row.product_id and row.recommended_product_id and row.recommendation_type for row in rows)
+    assert all(0.0 <= row.score <= 1.0 for row in rows)
+
+    # Recommendations skip what the user already interacted with
+    seen = {(behavior.user_id, behavior.product_id) for behavior in db.query(UserBehavior)}
+    assert not any((row.user_id, row.recommended_product_id) in seen for row in rows)
+
+    popular = db.query(ProductRecommendation).filter(ProductRecommendation.user_id.is_(None)).all()
+    assert popular and {row.recommendation_type for row in popular} == {precompute.POPULAR}
+    db.close()
+
+
+def test_stored_recommendations_are_one_read(monkeypatch):
+    _seed()
+    _models(monkeypatch)
+    precompute.precompute_all(limit=5, active_days=30, chunk_size=100, workers=1, session_factory=TestingSession)
+    recommendation_engine = RecommendationEngine()
+
+    db = TestingSession()
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        rows = recommendation_engine.get_stored_recommendations(3, 4, db)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert len(statements) == 1
+    assert len(rows) == 4
+    assert [row.score for row in rows] == sorted((row.score for row in rows), reverse=True)
+    assert rows[0].reason
+
+    # Users without stored rows get nothing personal; popular products are stored without a user
+    assert recommendation_engine.get_stored_recommendations(41, 4, db) == []
+    assert len(recommendation_engine.get_stored_recommendations(None, 4, db)) == 4
+    db.close()
+
+
+def test_refreshing_one_user_replaces_only_their_rows(monkeypatch):
+    _seed()
+    als, item_similarity = _models(monkeypatch)
+    precompute.precompute_all(limit=5, active_days=30, chunk_size=100, workers=1, session_factory=TestingSession)
+
+    db = TestingSession()
+    before = db.query(ProductRecommendation).filter(ProductRecommendation.user_id == 2).count()
+    db.add(UserBehavior(user_id=1, product_id=60, behavior_type="purchase"))
+    db.flush()
+    stored = precompute.precompute_users(db, [1], 8, als, item_similarity)
+    db.commit()
+
+    assert stored == 8
+    assert db.query(ProductRecommendation).filter(ProductRecommendation.user_id == 1).count() == 8
+    assert db.query(ProductRecommendation).filter(ProductRecommendation.user_id == 2).count() == before
+    assert not db.query(ProductRecommendation).filter(
+        ProductRecommendation.user_id == 1, ProductRecommendation.recommended_product_id == 60
+    ).count()
+    db.close()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Query-plan regression tests for the catalog, cart and behavior hot paths.
+
+Each query is explained against an empty SQLite schema built from the
+models. A plan that scans a whole table or a whole covering index, uses an
+index other than the expected one, or sorts in a temporary b-tree when the
+index should provide the order means an index is missing or no longer
+matches the query shape.
+"""
+
+import re
+from datetime import datetime
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+
+from app.ai.interactions import user_histories, user_history
+from app.ai.recommendation_engine import recommendation_engine
+from app.database import Base
+from app.models import Cart, CartItem, OrderItem, Product
+from app.utils.catalog import CatalogFilters, apply_catalog_filters, catalog_query
+from app.utils.pagination import apply_keyset
+
+# A scan of the table, or of an index covering all its columns, reads every row
+FULL_SCAN = re.compile(r"^SCAN (\w+)(?: USING COVERING INDEX \w+)?$")
+
+
+def _session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)()
+
+
+def _plan(db, query):
+    """Get the EXPLAIN QUERY PLAN details of a query."""
+    sql = str(query.statement.compile(db.bind, compile_kwargs={"literal_binds": True}))
+    return [row[3] for row in db.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+
+
+def _issued_plans(db, call):
+    """Run ``call`` and get the EXPLAIN QUERY PLAN details of every statement it issued."""
+    issued = []
+
+    def record(connection, cursor, statement, parameters, context, executemany):
+        issued.append((statement, parameters))
+
+    event.listen(db.bind, "before_cursor_execute", record)
+    try:
+        call()
+    finally:
+        event.remove(db.bind, "before_cursor_execute", record)
+    with db.bind.connect() as connection:
+        return [
+            [row[3] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+            for statement, parameters in issued
+        ]
+
+
+def _check_plan(plan, ordered=False, index=None):
+    scans = [step for step in plan if FULL_SCAN.match(step)]
+    assert not scans, f"full scan in plan: {plan}"
+    if ordered:
+        assert not any("TEMP B-TREE" in step for step in plan), f"sort not served by an index: {plan}"
+    if index:
+        assert any(re.search(rf"INDEX {index}\b", step) for step in plan), f"{index} not used: {plan}"
+
+
+def _assert_indexed(db, query, ordered=False, index=None):
+    _check_plan(_plan(db, query), ordered, index)
+
+
+def _filters(category=None, min_price=None, max_price=None):
+    return CatalogFilters(category=category, search=None, min_price=min_price, max_price=max_price)
+
+
+def test_product_listing_plans():
+    """Category/price filters and keyset pages use the product indexes."""
+    db = _session()
+
+    _assert_indexed(db, apply_catalog_filters(catalog_query(db), _filters("Books", 10, 50)),
+                    index="ix_products_category_id_price")
+    _assert_indexed(db, apply_catalog_filters(catalog_query(db), _filters(min_price=10, max_price=50)),
+                    index="ix_products_price_id")
+
+    by_price = apply_keyset(catalog_query(db), Product.price, Product.id, "asc", (19.99, 100))
+    _assert_indexed(db, by_price.limit(51), ordered=True, index="ix_products_price_id")
+
+    newest = apply_keyset(catalog_query(db), Product.created_at, Product.id, "desc", (datetime(2024, 1, 1), 100))
+    _assert_indexed(db, newest.limit(51), ordered=True, index="ix_products_created_at_id")
+    _assert_indexed(db, db.query(Product).order_by(Product.created_at.desc()).limit(10), ordered=True,
+                    index="ix_products_created_at_id")
+
+
+def test_cart_plans():
+    """Cart lookups use the cart indexes."""
+    db = _session()
+
+    _assert_indexed(db, db.query(Cart).filter(Cart.user_id == 1))
+    _assert_indexed(db, db.query(CartItem).filter(CartItem.cart_id == 1))
+    _assert_indexed(db, db.query(CartItem).filter(CartItem.cart_id == 1, CartItem.product_id == 5))
+    _assert_indexed(db, db.query(CartItem).join(Cart).filter(CartItem.id == 3, Cart.user_id == 1))
+    _assert_indexed(db, db.query(OrderItem).filter(OrderItem.product_id == 5))
+
+
+def test_recommendation_plans():
+    """The behavior histories and stored recommendations are read through their indexes."""
+    db = _session()
+    behavior_index = "ix_user_behaviors_user_id_behavior_type_product_id"
+
+    for plan in _issued_plans(db, lambda: user_history(db, 1)):
+        _check_plan(plan, index=behavior_index)
+    for plan in _issued_plans(db, lambda: user_histories(db, [1, 2, 3])):
+        _check_plan(plan, index=behavior_index)
+
+    stored = _issued_plans(db, lambda: (
+        recommendation_engine.get_stored_recommendations(1, 10, db),
+        recommendation_engine.get_stored_recommendations(None, 10, db)
+    ))
+    assert len(stored) == 2
+    for plan in stored:
+        # The index provides the score order, so the limit stops the read early
+        _check_plan(plan, ordered=True, index="ix_product_recommendations_user_id_score")
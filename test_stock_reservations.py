@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Tests for the stock reservation engine: holds, expiry and concurrent checkouts.
+"""
+
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import fakeredis
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.core.cache import get_catalog_version
+from app.database import Base, get_db, get_redis
+from app.main import app
+from app.search import change_feed
+from app.inventory.reservations import (
+    InsufficientStockError,
+    hold_stock,
+    release_expired,
+    settle_holds,
+)
+from app.models import Category, Product, StockReservation
+
+
+def _database(stock):
+    """Create a file-backed SQLite database with one product of the given stock."""
+    path = os.path.join(tempfile.mkdtemp(), "inventory.db")
+    engine = create_engine(
+        f"sqlite:///{path}",
+        connect_args={"check_same_thread": False, "timeout": 60},
+        pool_size=100,
+        max_overflow=0
+    )
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = Session()
+    db.add(Category(id=1, name="Electronics", slug="electronics"))
+    db.add(Product(id=1, name="Limited Edition", sku="LTD-1", price=99.0, stock_quantity=stock, category_id=1))
+    db.commit()
+    db.close()
+    return Session
+
+
+def _stock(Session):
+    db = Session()
+    try:
+        return db.get(Product, 1).stock_quantity
+    finally:
+        db.close()
+
+
+def test_holds_take_and_return_stock():
+    """Holds take stock up front and expired holds give it back."""
+    Session = _database(stock=10)
+    db = Session()
+
+    hold_stock(db, 1, {1: 4})
+    assert _stock(Session) == 6
+    hold_stock(db, 1, {1: 2})
+    assert _stock(Session) == 8
+
+    try:
+        hold_stock(db, 2, {1: 9})
+        assert False, "hold beyond stock should fail"
+    except InsufficientStockError as e:
+        assert e.product_ids == [1]
+    assert _stock(Session) == 8
+
+    assert release_expired(db, 100, now=datetime.utcnow() + timedelta(days=1)) == 1
+    assert _stock(Session) == 10
+    assert db.query(StockReservation).count() == 0
+    db.close()
+
+
+def test_colliding_first_holds_are_retried():
+    """A first hold that loses the insert race is retried against the winner's hold."""
+    Session = _database(stock=10)
+    db = Session()
+    rival = Session()
+
+    def hold_after_read(orm_execute_state):
+        # The rival creates the same hold right after this session looked for it
+        event.remove(db, "do_orm_execute", hold_after_read)
+        result = orm_execute_state.invoke_statement()
+        hold_stock(rival, 1, {1: 2})
+        return result
+
+    event.listen(db, "do_orm_execute", hold_after_read)
+    hold_stock(db, 1, {1: 3})
+    rival.close()
+
+    assert _stock(Session) == 7
+    assert db.query(StockReservation).one().quantity == 3
+    db.close()
+
+
+def test_concurrent_checkouts_never_oversell():
+    """500 concurrent single-unit checkouts against 100 units sell exactly 100."""
+    Session = _database(stock=100)
+
+    # Some buyers hold stock from their carts, the rest check out without a hold
+    db = Session()
+    for user_id in range(1, 41):
+        hold_stock(db, user_id, {1: 1})
+    db.close()
+    assert _stock(Session) == 60
+
+    def checkout(user_id):
+        db = Session()
+        try:
+            settle_holds(db, user_id, {1: 1})
+            db.commit()
+            return True
+        except InsufficientStockError:
+            return False
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(max_workers=100) as pool:
+        results = list(pool.map(checkout, range(1, 501)))
+
+    assert sum(results) == 100
+    assert all(results[:40]), "buyers holding stock must get it"
+    assert _stock(Session) == 0
+
+    db = Session()
+    assert db.query(StockReservation).count() == 0
+    db.close()
+
+
+def test_cached_catalog_reflects_holds(monkeypatch):
+    """Holds show up in cached listings and product ETags without a new catalog version."""
+    Session = _database(stock=10)
+    change_feed.register_change_feed(Session)
+    redis = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(change_feed, "redis_client", redis)
+
+    def override_get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_redis] = lambda: redis
+    try:
+        client = TestClient(app)
+        listing = client.get("/api/v1/products/")
+        product = client.get("/api/v1/products/1")
+        assert listing.json()[0]["stock"] == product.json()["stock"] == 10
+        # Served from the cache
+        assert client.get("/api/v1/products/").headers["ETag"] == listing.headers["ETag"]
+        cached_keys = set(redis.keys("catalog:v*"))
+
+        assert client.post("/api/v1/cart/add", json={"product_id": 1, "quantity": 3}).status_code == 200
+        assert get_catalog_version(redis) == 0
+        assert set(redis.keys("catalog:v*")) == cached_keys
+
+        # The cached bodies are reused with the live stock and a new ETag
+        held = client.get("/api/v1/products/", headers={"If-None-Match": listing.headers["ETag"]})
+        assert held.status_code == 200
+        assert held.json()[0]["stock"] == 7
+        assert held.headers["X-Total-Count"] == "1"
+        conditional = client.get("/api/v1/products/1", headers={"If-None-Match": product.headers["ETag"]})
+        assert conditional.status_code == 200
+        assert conditional.json()["stock"] == 7
+        assert client.get("/api/v1/products/1", headers={"If-None-Match": conditional.headers["ETag"]}).status_code == 304
+
+        db = Session()
+        release_expired(db, 100, now=datetime.utcnow() + timedelta(days=1))
+        db.close()
+        assert client.get("/api/v1/products/").json()[0]["stock"] == 10
+        assert client.get("/api/v1/products/").headers["ETag"] == listing.headers["ETag"]
+        assert set(redis.keys("catalog:v*")) == cached_keys
+    finally:
+        app.dependency_overrides.clear()
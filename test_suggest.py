@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Tests for typeahead suggestions.
+"""
+
+import fakeredis
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models import Category, Product, User, UserBehavior
+from app.search import refresh
+from app.search.suggest import PRECOMPUTED_TOP_K, SuggestionIndex
+
+engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# name, tags ("category, subcategory, brand, ..."), purchases
+PRODUCTS = [
+    ("Wireless Headphones", "Electronics, Audio, Sony, wireless", 2),
+    ("Wireless Charger", "Electronics, Power, Anker, wireless", 5),
+    ("Sound Bar", "Electronics, Audio, Sonos", 1),
+    ("Wired Earbuds", "Electronics, Audio, Sony", 0),
+    ("Soap Dispenser", "Home, Bathroom", 0),
+]
+
+
+def _index(monkeypatch):
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    db = TestingSession()
+    db.add(Category(id=1, name="Electronics", slug="electronics"))
+    db.add(Category(id=2, name="Home", slug="home"))
+    db.add(User(id=1, email="user@example.com", username="user", hashed_password="x",
+                first_name="Test", last_name="User"))
+    for product_id, (name, tags, purchases) in enumerate(PRODUCTS, start=1):
+        db.add(Product(id=product_id, name=name, tags=tags, sku=f"SKU-{product_id}", price=10.0,
+                       category_id=2 if tags.startswith("Home") else 1))
+        for _ in range(purchases):
+            db.add(UserBehavior(user_id=1, product_id=product_id, behavior_type="purchase"))
+    db.commit()
+    db.close()
+
+    monkeypatch.setattr(refresh, "SessionLocal", TestingSession)
+    return SuggestionIndex(refresh_interval=3600)
+
+
+def _suggest(index, q, limit=8):
+    return [(s["text"], s["type"]) for s in index.suggest(fakeredis.FakeRedis(), q, limit)]
+
+
+def test_prefixes_match_names_brands_and_categories(monkeypatch):
+    index = _index(monkeypatch)
+
+    assert _suggest(index, "so") == [
+        ("Sony", "brand"), ("Sonos", "brand"), ("Sound Bar", "product"), ("Soap Dispenser", "product")
+    ]
+    assert _suggest(index, "ELECTR") == [("Electronics", "category")]
+    # Later words of a label start matches too
+    assert _suggest(index, "head") == [("Wireless Headphones", "product")]
+    assert _suggest(index, "sony ") == [("Sony", "brand")]
+    # Only the brand position of the tags is suggested
+    assert ("Audio", "tag") not in _suggest(index, "au") and _suggest(index, "au") == []
+    assert _suggest(index, "xyz") == [] and _suggest(index, "  ") == []
+
+
+def test_suggestions_are_ranked_by_popularity(monkeypatch):
+    index = _index(monkeypatch)
+
+    # Charger (5 purchases) beats headphones (2); the brand Sony sums its products
+    assert _suggest(index, "wi") == [
+        ("Wireless Charger", "product"), ("Wireless Headphones", "product"), ("Wired Earbuds", "product")
+    ]
+    assert _suggest(index, "s", limit=2) == [("Sony", "brand"), ("Sonos", "brand")]
+
+    # Long prefixes and large limits scan the sorted key slice instead of the precomputed tops
+    assert _suggest(index, "wireless", limit=PRECOMPUTED_TOP_K + 1) == [
+        ("Wireless Charger", "product"), ("Wireless Headphones", "product")
+    ]
+    assert _suggest(index, "w", limit=PRECOMPUTED_TOP_K + 1) == _suggest(index, "w")